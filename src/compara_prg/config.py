@@ -1,4 +1,5 @@
 # src/compara_prg/config.py
+import os
 from pathlib import Path
 
 # Raíz del repo (…/Compara_PRG)
@@ -14,6 +15,9 @@ RESOURCES_DIR = PROJECT_ROOT / "src" / "compara_prg" / "resources"
 GEN_AUXUSE_CSV = RESOURCES_DIR / "Gen_AuxUse.csv"
 BESS_DIC_PATH = RESOURCES_DIR  / 'BESS_dict.xlsx' 
 NEW_BESS_DIC_PATH = RESOURCES_DIR  / 'Dict_new_BESS.xlsx' 
+FLUJOS_DIC_PATH = RESOURCES_DIR / 'Flujo_de_Líneas_MW_dict.xlsx'
+# Categoría PLEXOS → código de tecnología (services/tecnologias.py)
+CATEGORIAS_TEC_CSV = RESOURCES_DIR / 'categorias_tecnologia.csv'
 
 # results/ compartidos: si existe la red, úsala; si no, cae a local del repo
 _shared_results = SHARED_BASE / "data" / "results"
@@ -27,6 +31,29 @@ RESULTS_DIR.mkdir(parents=True, exist_ok=True)
 OUTPUT_DIR = RESULTS_DIR
 COMMENTS_DIR = RESULTS_DIR.parent / "comments"
 COMMENTS_DIR.mkdir(parents=True, exist_ok=True)
+# Almacén histórico (Parquet particionado por tabla/fecha/periodo/variante/solución)
+WAREHOUSE_DIR = RESULTS_DIR.parent / "warehouse"
+# Resultados convertidos a formato columnar (una carpeta por results_*.pkl)
+COLUMNAR_DIR = RESULTS_DIR / "columnar"
+# Caché compartido de extracciones desde los .zip (por contenido, Parquet, LRU por tamaño)
+CACHE_EXTRACCIONES_DIR = RESULTS_DIR.parent / "cache_extracciones"
+USAR_CACHE_EXTRACCIONES = True
+MAX_GB_CACHE_EXTRACCIONES = 20
+# Caché local (SSD) de lectura para zips y resultados que viven en la red
+CACHE_LOCAL_DIR = Path(os.environ.get("LOCALAPPDATA", Path.home() / ".cache")) / "compara_prg" / "archivos"
+USAR_CACHE_LOCAL = True
+MAX_GB_CACHE_LOCAL = 30
+RAICES_RED = (SHARED_BASE,)      # además de rutas UNC y unidades de red mapeadas
+# Descubrimiento de zips en la red: vigencia de los listados de carpeta y hilos
+DESCUBRIMIENTO_TTL_S = 30
+MAX_HILOS_DESCUBRIMIENTO = 16
+# Drill-down a los .zip de solución: series en memoria por zip y zips retenidos
+MAX_ENTIDADES_DRILLDOWN = 500
+MAX_ZIPS_DRILLDOWN = 8
+# Perfil de almacenamiento columnar: "compacto" (Float32/Enum/UInt16) o "estandar"
+PERFIL_ALMACENAMIENTO = "compacto"
+# Error absoluto máximo aceptado al pasar una tabla a Float32 (si no, queda en Float64)
+TOL_FLOAT32 = 1e-3
 
 
 # Nombres por defecto de carpetas (PCP/PID)
@@ -34,7 +61,6 @@ DEFAULT_PCP_FOLDER = "Model PRGdia_Full_Definitivo Solution"
 DEFAULT_PID_FOLDER = "Model Test15d Solution"
 DEFAULT_NAME_BASE   = 'DBSEN_PRGDIARIO_PID.xml'
 
-
 # (opcional) constantes que ya usas en la app
 COLOR = [
     "#0072B2", "#E69F00", "#009E73", "#CC79A7",
@@ -49,3 +75,15 @@ CATEGORY_LABELS = [
 ]
 THERMAL_IDX = 2
 THRESHOLD = 0.5
+
+# Tope (MB) del cache de HTML renderizado de tablas (compartido entre sesiones)
+MAX_MB_CACHE_HTML = 64
+# Tabla térmica paginada: filas por página al activar la vista por ventanas
+FILAS_POR_PAGINA = 40
+
+# CMG: nodo de referencia para el spread y horas de punta (hora del día, 1-24)
+NODO_REFERENCIA_CMG = "Quillota220"
+HORAS_PUNTA_CMG = tuple(range(19, 24))
+
+# Flujos: una línea se considera congestionada con |flujo| ≥ TOL_CONGESTION × límite
+TOL_CONGESTION = 0.99
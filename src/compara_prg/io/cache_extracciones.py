@@ -0,0 +1,227 @@
+# src/compara_prg/io/cache_extracciones.py
+"""
+Caché compartido (por contenido) de extracciones desde los .zip de solución.
+
+Cada extracción de `query_solution` se guarda como Parquet bajo una clave que
+identifica el zip (tamaño, mtime y hash parcial) y la consulta (collection,
+property, fase, ventana, columnas, nombres). Si dos analistas comparan el mismo
+PID contra PCP distintos, el PID se extrae una sola vez.
+
+- Escrituras atómicas (tmp + os.replace): un lector nunca ve un Parquet a medias.
+- Un lockfile por clave: si dos procesos piden lo mismo a la vez, uno extrae y
+  el otro espera y lee el resultado.
+- Tope de tamaño con expulsión LRU (la lectura "toca" el mtime del archivo).
+  El tamaño total se lleva en `_tamano.json`: cada escritura suma lo suyo y el
+  recorrido completo de la carpeta (glob + stat, caro en la red) sólo ocurre al
+  pasar el tope o cada RECUENTO_CADA escrituras, para corregir la deriva.
+
+Funciona sobre la carpeta de red (sólo usa operaciones de archivo portables).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import polars as pl
+
+from compara_prg.config import CACHE_EXTRACCIONES_DIR, MAX_GB_CACHE_EXTRACCIONES
+
+BLOQUE_HASH = 1 << 20          # se hashean el primer y el último MB del zip
+ESPERA_LOCK_S = 600            # tiempo máximo esperando a otro extractor
+LOCK_VENCIDO_S = 1800          # un lock más viejo que esto se considera huérfano
+RECUENTO_CADA = 200            # escrituras entre recorridos completos del caché
+ARCHIVO_TAMANO = "_tamano.json"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Claves
+# ─────────────────────────────────────────────────────────────────────────────
+def huella_zip(zip_path: Path | str) -> Dict[str, Any]:
+    """Tamaño + mtime + sha256 de los extremos del archivo (barato incluso en red)."""
+    p = Path(zip_path)
+    st_zip = p.stat()
+    h = hashlib.sha256()
+    with p.open("rb") as fh:
+        h.update(fh.read(BLOQUE_HASH))
+        if st_zip.st_size > 2 * BLOQUE_HASH:
+            fh.seek(-BLOQUE_HASH, os.SEEK_END)
+            h.update(fh.read(BLOQUE_HASH))
+    return {"size": st_zip.st_size, "mtime": st_zip.st_mtime_ns, "hash": h.hexdigest()[:32]}
+
+
+def clave_extraccion(zip_path: Path | str, **consulta: Any) -> str:
+    """sha256 de la huella del zip + parámetros de la consulta (orden estable)."""
+    payload = {"zip": huella_zip(zip_path), "consulta": consulta}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def ruta_clave(clave: str, raiz: Path = CACHE_EXTRACCIONES_DIR) -> Path:
+    return Path(raiz) / clave[:2] / f"{clave}.parquet"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Lock por archivo (O_CREAT | O_EXCL funciona igual en Windows y en red)
+# ─────────────────────────────────────────────────────────────────────────────
+class LockArchivo:
+    def __init__(self, path: Path, espera_s: float = ESPERA_LOCK_S, vencido_s: float = LOCK_VENCIDO_S):
+        self.path = Path(path)
+        self.espera_s = espera_s
+        self.vencido_s = vencido_s
+
+    def __enter__(self) -> "LockArchivo":
+        limite = time.monotonic() + self.espera_s
+        pausa = 0.05
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, f"{os.getpid()}@{os.environ.get('COMPUTERNAME', '')}".encode())
+                os.close(fd)
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - self.path.stat().st_mtime > self.vencido_s:
+                        self.path.unlink(missing_ok=True)   # dueño murió sin liberar
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.monotonic() > limite:
+                    raise TimeoutError(f"Lock ocupado: {self.path}")
+                time.sleep(pausa)
+                pausa = min(pausa * 2, 1.0)
+
+    def __exit__(self, *exc) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Lectura / escritura
+# ─────────────────────────────────────────────────────────────────────────────
+def _leer(destino: Path) -> Optional[pl.DataFrame]:
+    try:
+        df = pl.read_parquet(destino)
+    except (OSError, pl.exceptions.ComputeError):
+        return None
+    try:
+        os.utime(destino)          # marca de uso para el LRU
+    except OSError:
+        pass
+    return df
+
+
+def _escribir(df: pl.DataFrame, destino: Path) -> None:
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    tmp = destino.with_suffix(f".{os.getpid()}.tmp")
+    df.write_parquet(tmp, compression="zstd")
+    os.replace(tmp, destino)
+
+
+def obtener_o_extraer(
+    clave: str,
+    extraer: Callable[[], pl.DataFrame],
+    raiz: Path = CACHE_EXTRACCIONES_DIR,
+    max_bytes: Optional[int] = None,
+) -> pl.DataFrame:
+    """
+    Devuelve la extracción cacheada para `clave`; si no existe la produce con
+    `extraer()` (una sola vez aunque haya varios procesos pidiéndola) y la guarda.
+
+    Args:
+        clave (str): resultado de `clave_extraccion`
+        extraer (callable): función sin argumentos que consulta la solución
+        raiz (Path): carpeta del caché compartido
+        max_bytes (int): tope del caché (por defecto MAX_GB_CACHE_EXTRACCIONES)
+
+    Returns:
+        DataFrame extraído
+    """
+    destino = ruta_clave(clave, raiz)
+    df = _leer(destino) if destino.exists() else None
+    if df is not None:
+        return df
+
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    with LockArchivo(destino.with_suffix(".lock")):
+        # Otro proceso pudo haberla escrito mientras esperábamos el lock
+        df = _leer(destino) if destino.exists() else None
+        if df is not None:
+            return df
+        df = extraer()
+        _escribir(df, destino)
+
+    if max_bytes is None:
+        max_bytes = int(MAX_GB_CACHE_EXTRACCIONES * 1024 ** 3)
+    try:
+        estado = _sumar_escritura(raiz, destino.stat().st_size)
+        if estado is None or estado["bytes"] > max_bytes or estado["escrituras"] % RECUENTO_CADA == 0:
+            expulsar(raiz, max_bytes)
+    except (OSError, TimeoutError) as e:
+        print(f"[WARN] caché de extracciones – expulsión: {e}")
+    return df
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Tamaño total y expulsión
+# ─────────────────────────────────────────────────────────────────────────────
+def _leer_tamano(raiz: Path) -> Optional[Dict[str, int]]:
+    try:
+        estado = json.loads((raiz / ARCHIVO_TAMANO).read_text(encoding="utf-8"))
+        return {"bytes": int(estado["bytes"]), "escrituras": int(estado["escrituras"])}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _guardar_tamano(raiz: Path, estado: Dict[str, int]) -> None:
+    tmp = raiz / f"{ARCHIVO_TAMANO}.{os.getpid()}.tmp"
+    tmp.write_text(json.dumps(estado), encoding="utf-8")
+    os.replace(tmp, raiz / ARCHIVO_TAMANO)
+
+
+def _sumar_escritura(raiz: Path, size: int) -> Optional[Dict[str, int]]:
+    """Suma una escritura al total; None si aún no hay total (hay que recontar)."""
+    raiz = Path(raiz)
+    with LockArchivo(raiz / "_tamano.lock", espera_s=5):
+        estado = _leer_tamano(raiz)
+        if estado is None:
+            return None
+        estado = {"bytes": estado["bytes"] + size, "escrituras": estado["escrituras"] + 1}
+        _guardar_tamano(raiz, estado)
+    return estado
+
+
+def expulsar(raiz: Path = CACHE_EXTRACCIONES_DIR, max_bytes: int = 0) -> int:
+    """
+    Borra los Parquet menos usados hasta quedar bajo `max_bytes` y deja el
+    total exacto en `_tamano.json`.
+
+    Returns:
+        bytes liberados
+    """
+    raiz = Path(raiz)
+    with LockArchivo(raiz / "_expulsion.lock", espera_s=5):
+        archivos = []
+        for p in raiz.glob("*/*.parquet"):
+            try:
+                st_p = p.stat()
+            except FileNotFoundError:
+                continue
+            archivos.append((st_p.st_mtime, st_p.st_size, p))
+        total = sum(a[1] for a in archivos)
+        liberado = 0
+        for _, size, p in sorted(archivos):
+            if total - liberado <= max_bytes:
+                break
+            try:
+                p.unlink()
+                liberado += size
+            except OSError:
+                continue                 # en uso por otro lector (Windows): se intenta la próxima vez
+        # Recuento exacto: las escrituras siguientes suman sobre este total
+        with LockArchivo(raiz / "_tamano.lock", espera_s=5):
+            previo = _leer_tamano(raiz)
+            _guardar_tamano(raiz, {"bytes": total - liberado,
+                                   "escrituras": previo["escrituras"] if previo else 0})
+    return liberado
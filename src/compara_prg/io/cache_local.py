@@ -0,0 +1,217 @@
+# src/compara_prg/io/cache_local.py
+"""
+Caché local (disco de la máquina) de lectura para archivos en la carpeta de red.
+
+Los .zip de solución y los results_* viven en \\\\nas-cen1\\...; cada lectura paga
+la latencia SMB y varios hilos leen el mismo zip a la vez. `ruta_local(path)`
+devuelve una copia local validada por tamaño + mtime (la copia conserva el mtime
+del original), copiándola una sola vez aunque la pidan varios hilos o procesos.
+Las rutas que ya son locales se devuelven tal cual.
+
+- `prefetch(paths)` copia en segundo plano (p. ej. los zips de una corrida
+  pendiente) para que la consulta los encuentre ya en disco.
+- Tope de tamaño con expulsión LRU (cada acierto "toca" el mtime de la marca).
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from compara_prg.config import CACHE_LOCAL_DIR, MAX_GB_CACHE_LOCAL, RAICES_RED, USAR_CACHE_LOCAL
+from compara_prg.io.cache_extracciones import LockArchivo
+
+MARCA = ".origen"               # archivo con (tamaño, mtime) del original, junto a la copia
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+_pool: Optional[ThreadPoolExecutor] = None
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ¿Ruta de red?
+# ─────────────────────────────────────────────────────────────────────────────
+def _unidad_remota(p: Path) -> bool:
+    """Unidad de red mapeada (Windows); en otros sistemas siempre False."""
+    if os.name != "nt" or not p.drive:
+        return False
+    try:
+        import ctypes
+        return ctypes.windll.kernel32.GetDriveTypeW(p.drive + "\\") == 4   # DRIVE_REMOTE
+    except Exception:
+        return False
+
+
+def es_ruta_red(path: Path | str) -> bool:
+    s = str(path)
+    if s.startswith("\\\\") or s.startswith("//"):
+        return True
+    p = Path(path)
+    for raiz in RAICES_RED:
+        try:
+            p.relative_to(raiz)
+            return True
+        except ValueError:
+            continue
+    return _unidad_remota(p)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Copia validada
+# ─────────────────────────────────────────────────────────────────────────────
+def _firma(path: Path) -> Tuple[int, int]:
+    """(tamaño, mtime) de un archivo; para carpetas, del manifest.json (o la carpeta)."""
+    ref = path / "manifest.json" if path.is_dir() and (path / "manifest.json").exists() else path
+    st_p = ref.stat()
+    size = st_p.st_size if not path.is_dir() else sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+    return size, st_p.st_mtime_ns
+
+
+def _slot(path: Path, raiz: Path) -> Path:
+    """Carpeta de la copia: un hash de la ruta original (distintas rutas, distintas copias)."""
+    h = hashlib.sha1(str(path).encode("utf-8")).hexdigest()[:16]
+    return raiz / h
+
+
+def _lock_hilo(clave: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(clave, threading.Lock())
+
+
+def _vigente(slot: Path, destino: Path, firma: Tuple[int, int]) -> bool:
+    try:
+        size, mtime = (int(x) for x in (slot / MARCA).read_text().split())
+    except (OSError, ValueError):
+        return False
+    return destino.exists() and (size, mtime) == firma
+
+
+def _copiar(origen: Path, slot: Path, destino: Path, firma: Tuple[int, int]) -> None:
+    tmp = slot / f"{destino.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    if origen.is_dir():
+        shutil.copytree(origen, tmp)
+        if destino.exists():
+            shutil.rmtree(destino)
+        os.replace(tmp, destino)
+    else:
+        shutil.copy2(origen, tmp)
+        os.replace(tmp, destino)
+    (slot / MARCA).write_text(f"{firma[0]} {firma[1]}")
+
+
+def ruta_local(
+    path: Path | str,
+    raiz: Path = CACHE_LOCAL_DIR,
+    max_bytes: Optional[int] = None,
+    forzar: bool = False,
+) -> Path:
+    """
+    Ruta local equivalente a `path` (archivo o carpeta columnar).
+
+    Args:
+        path: ruta original (red o local)
+        raiz (Path): carpeta del caché local
+        max_bytes (int): tope del caché (por defecto MAX_GB_CACHE_LOCAL)
+        forzar (bool): copia aunque la ruta no parezca de red
+
+    Returns:
+        Path: la copia local vigente; el original si es local, si el caché está
+        desactivado o si la copia falla (p. ej. disco lleno)
+    """
+    origen = Path(path)
+    if not USAR_CACHE_LOCAL or not origen.exists() or not (forzar or es_ruta_red(origen)):
+        return origen
+
+    raiz = Path(raiz)
+    slot = _slot(origen, raiz)
+    destino = slot / origen.name
+    try:
+        firma = _firma(origen)
+        if _vigente(slot, destino, firma):
+            os.utime(slot / MARCA)               # marca de uso para el LRU
+            return destino
+
+        with _lock_hilo(str(slot)):
+            slot.mkdir(parents=True, exist_ok=True)
+            with LockArchivo(slot / "_copia.lock"):
+                if not _vigente(slot, destino, firma):
+                    _copiar(origen, slot, destino, firma)
+    except (OSError, TimeoutError) as e:
+        print(f"[WARN] caché local – {origen.name}: {e}; se lee desde la red")
+        return origen
+
+    if max_bytes is None:
+        max_bytes = int(MAX_GB_CACHE_LOCAL * 1024 ** 3)
+    try:
+        expulsar(raiz, max_bytes, proteger=slot)
+    except (OSError, TimeoutError) as e:
+        print(f"[WARN] caché local – expulsión: {e}")
+    return destino
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Prefetch en segundo plano
+# ─────────────────────────────────────────────────────────────────────────────
+def prefetch(paths: Iterable[Path | str], raiz: Path = CACHE_LOCAL_DIR) -> List[Future]:
+    """
+    Copia en segundo plano los archivos de red indicados. Las consultas que
+    lleguen antes de terminar esperan la copia en curso (mismo lock) en vez de
+    leer en paralelo desde la red.
+    """
+    global _pool
+    if not USAR_CACHE_LOCAL:
+        return []
+    with _locks_guard:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+    return [_pool.submit(ruta_local, p, raiz) for p in dict.fromkeys(map(str, paths)) if es_ruta_red(p)]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Expulsión por tamaño
+# ─────────────────────────────────────────────────────────────────────────────
+def _tamano(slot: Path) -> int:
+    total = 0
+    for dirpath, _, files in os.walk(slot):
+        for f in files:
+            try:
+                total += os.stat(os.path.join(dirpath, f)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def expulsar(raiz: Path = CACHE_LOCAL_DIR, max_bytes: int = 0, proteger: Optional[Path] = None) -> int:
+    """
+    Borra las copias menos usadas hasta quedar bajo `max_bytes`.
+
+    Returns:
+        bytes liberados
+    """
+    raiz = Path(raiz)
+    with LockArchivo(raiz / "_expulsion.lock", espera_s=5):
+        slots = []
+        for slot in raiz.iterdir():
+            if not slot.is_dir():
+                continue
+            try:
+                uso = (slot / MARCA).stat().st_mtime
+            except OSError:
+                uso = 0.0                         # copia a medias o huérfana: primera en salir
+            slots.append((uso, _tamano(slot), slot))
+        total = sum(s[1] for s in slots)
+        liberado = 0
+        for _, size, slot in sorted(slots, key=lambda s: s[0]):
+            if total - liberado <= max_bytes:
+                break
+            if proteger is not None and slot == proteger:
+                continue
+            if (slot / "_copia.lock").exists():
+                continue                          # copia en curso
+            shutil.rmtree(slot, ignore_errors=True)
+            liberado += size
+    return liberado
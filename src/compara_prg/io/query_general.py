@@ -2,7 +2,9 @@
 import polars as pl
 import pandas as pd
 import os, sys, clr
+import threading
 import time
+from typing import Iterable, Optional
 
 sys.path.append('C:/Program Files/Energy Exemplar/PLEXOS 10.0 API')
 clr.AddReference('PLEXOS_NET.Core')
@@ -13,6 +15,10 @@ from PLEXOS_NET.Core import *
 from EEUTILITY.Enums import *
 from EnergyExemplar.PLEXOS.Utility.Enums import *
 
+from compara_prg.config import USAR_CACHE_EXTRACCIONES
+from compara_prg.io.cache_extracciones import clave_extraccion, obtener_o_extraer
+from compara_prg.io.cache_local import ruta_local
+
 def generar_propiedades(sol_file: str, campos: list, collection:str, prefix: int='System') -> str:
     """
     Función auxiliar que permite concatenar strings de manera que se puedan ingresar
@@ -47,6 +53,56 @@ def generar_propiedades(sol_file: str, campos: list, collection:str, prefix: int
 
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Extracción: QueryToCSV a un temporal, leído de forma perezosa y filtrada
+# ─────────────────────────────────────────────────────────────────────────────
+# Tipos de las columnas que entrega PLEXOS; el resto se lee como texto
+_TIPOS_COLUMNA = {"value": pl.Float64, "period_id": pl.Int64, "interval_id": pl.Int64}
+
+
+def _child_name(nombres: Optional[Iterable[str]]) -> str:
+    """Lista de objetos para el argumento ChildName de PLEXOS ('' = todos)."""
+    return ",".join(dict.fromkeys(nombres)) if nombres else ''
+
+
+def _extraer_csv(sol, fase, coleccion, propiedad, columns: list[str], name: str,
+                 hini: int, hfin: int, nombres: Optional[Iterable[str]] = None) -> pl.DataFrame:
+    """QueryToCSV → lectura perezosa filtrada → borrar temporal."""
+    # Temporal propio de la llamada: consultas simultáneas con el mismo `name`
+    # (p. ej. GENTABLES y GENC de una solución, o varias sesiones) no se pisan
+    base, ext = os.path.splitext(name)
+    name = f"{base}.{os.getpid()}.{threading.get_ident()}{ext}"
+    sol.QueryToCSV(name,
+                   False,
+                   fase, \
+                   coleccion, \
+                   'SEN', \
+                   _child_name(nombres), \
+                   PeriodEnum.Interval, \
+                   SeriesTypeEnum.Values, \
+                   propiedad)
+    time.sleep(1)
+    # Cargar sólo las filas y columnas pedidas del CSV
+    lf = (
+        pl.scan_csv(name, schema_overrides={"value": pl.Float64})
+        .filter(pl.col("period_id").is_between(hini, hfin))
+    )
+    if nombres:
+        lf = lf.filter(pl.col("child_name").is_in(list(nombres)))
+    df = lf.select(columns).collect()
+
+    # Se intenta eliminar el temporal
+    for _ in range(2):
+        try:
+            os.remove(name)
+            break
+        except PermissionError:
+            time.sleep(0.1)
+    else:
+        print(f"Advertencia: No se pudo eliminar {name}")
+    return df
+
+
 def query_solution(name, 
                    label: str,
                    sol_file: str,
@@ -58,7 +114,9 @@ def query_solution(name,
                    hini: int=1,
                    hfin: int=48,
                    multiple: bool=False,
-                   prefix: str='System') -> pl.DataFrame:
+                   prefix: str='System',
+                   nombres: Optional[Iterable[str]]=None,
+                   usar_cache: bool=USAR_CACHE_EXTRACCIONES) -> pl.DataFrame:
     """
     Query o consulta general que permite obtener información para la collection 
     y property especificada
@@ -75,29 +133,19 @@ def query_solution(name,
         hfin (int): hora de fin de la consulta
         multiple (bool): indica si se requieren consultar varias propiedades para la misma collection
         prefix (str): define el prefijo al cual se realizara la consulta de PLEXOS (lo que va antes de collection)
+        nombres (list): objetos (child_name) a extraer; None extrae toda la collection.
+            Tanto el rango de horas como los nombres se aplican durante la extracción
+        usar_cache (bool): reutiliza/alimenta el caché compartido de extracciones
 
     Returns:
 
-        dataframe: dataframe con los datos solicitados sin filtrar
+        dataframe: dataframe con los datos solicitados, ya acotado a horas y nombres
     """
     
-    # Create a PLEXOS solution file object and load the solution
-    sol = Solution()
-
-    if not os.path.exists(sol_file):
-        print(sol_file)
-        print('No such file')
-        #exit()
-        
-    sol.Connection(sol_file)
-
-    collections = sol.FetchAllCollectionIds()
-    properties = sol.FetchAllPropertyEnums()
-    
-    if multiple:
-        propiedad = generar_propiedades(sol_file,property,collection)
-    else:
-        propiedad = str(properties[f"{prefix}{collection}.{property}"])
+    if nombres is not None:
+        nombres = [n for n in dict.fromkeys(nombres) if n and n != "-"]
+        if not nombres:
+            return pl.DataFrame(schema={r: _TIPOS_COLUMNA.get(c, pl.Utf8) for c, r in zip(columns, rename)})
 
     rename_map = {"gentotal.csv": f"gentotal{label}.csv",
                   "gencost.csv":  f"gencost{label}.csv",
@@ -110,48 +158,139 @@ def query_solution(name,
                   "GeneratorPumpLoad.csv":        f"GeneratorPumpLoad{label}.csv",
                   "carga_bateria.csv":            f"carga_bateria{label}.csv",
                   "inyeccion_generador.csv":      f"inyeccion_generador{label}.csv",
-                  "flujo.csv":                    f"flujo{label}.csv", }
+                  "flujo.csv":                    f"flujo{label}.csv",
+                  "generadores.csv":              f"generadores{label}.csv", }
     name = rename_map.get(name, name)
+
+    def _extraer() -> pl.DataFrame:
+        # Zip en la red → copia local validada (sólo si hay que extraer; una
+        # sola copia aunque consulten varios hilos)
+        local = str(ruta_local(sol_file))
+
+        # Create a PLEXOS solution file object and load the solution
+        sol = Solution()
+
+        if not os.path.exists(local):
+            print(local)
+            print('No such file')
+            #exit()
+            
+        sol.Connection(local)
+
+        collections = sol.FetchAllCollectionIds()
+        properties = sol.FetchAllPropertyEnums()
         
-    if st_schedule:
-        results = sol.QueryToCSV(name,
-                            False
-                            ,SimulationPhaseEnum.STSchedule, \
-                        collections[f"{prefix}{collection}"], \
-                        'SEN', \
-                        '', \
-                        PeriodEnum.Interval, \
-                        SeriesTypeEnum.Values, \
-                        propiedad)
+        if multiple:
+            propiedad = generar_propiedades(local,property,collection)
+        else:
+            propiedad = str(properties[f"{prefix}{collection}.{property}"])
 
-    else:
-        results = sol.QueryToCSV(name,
-                                 False,
-                                 SimulationPhaseEnum.MTSchedule, \
-                        collections[f"{prefix}{collection}"], \
-                        'SEN', \
-                        '', \
-                        PeriodEnum.Interval, \
-                        SeriesTypeEnum.Values, \
-                        propiedad)
-    time.sleep(1)
-    # Cargar, filtrar y renombrar columnas del CSV
-    df = pl.read_csv(name, schema_overrides={"value": pl.Float64}).select(columns)
+        fase = SimulationPhaseEnum.STSchedule if st_schedule else SimulationPhaseEnum.MTSchedule
+        coleccion = collections[f"{prefix}{collection}"]
 
-    # Se intenta eliminar el temporal
-    for _ in range(2):
-        try:
-            os.remove(name)
-            break
-        except PermissionError:
-            time.sleep(0.1)
+        t0 = time.perf_counter()
+        df = _extraer_csv(sol, fase, coleccion, propiedad, columns, name, hini, hfin, nombres)
+        print(f"[query] {name} {collection}.{property}: {df.height} filas en {time.perf_counter() - t0:.2f} s")
+        return df
+
+    if usar_cache and os.path.exists(sol_file):
+        # La misma extracción (mismo zip y misma consulta) se hace una sola vez entre todos los usuarios.
+        # La huella se toma del zip original (sólo lee sus extremos): un acierto no copia nada
+        clave = clave_extraccion(
+            sol_file,
+            collection=f"{prefix}{collection}",
+            property=list(property) if multiple else property,
+            st_schedule=bool(st_schedule),
+            hini=int(hini), hfin=int(hfin),
+            columns=list(columns),
+            nombres=sorted(nombres) if nombres is not None else None,
+        )
+        df = obtener_o_extraer(clave, _extraer)
     else:
-        print("Advertencia: No se pudo eliminar temporal.csv")
+        df = _extraer()
 
     new_names = dict(zip(columns, rename))
-    df = df.rename(new_names)
+    return df.rename(new_names)
+
+
+# Propiedades de Generators que comparten GENTABLES, GENT y GENC (una sola extracción)
+PROPIEDADES_GENERADORES = ['Generation', 'GenerationCost', 'Start&ShutdownCost', 'TotalGenerationCost']
+
+def query_generadores(sol_file: str, tipo_solucion: str, st_schedule: bool=True, hini: int=1, hfin: int=48) -> pl.DataFrame:
+    """
+    Generación y costos por central en una sola consulta multi-propiedad.
+    GENTABLES, GENT y GENC la piden con los mismos parámetros, así que el caché
+    de extracciones la resuelve una vez por solución aunque corran en paralelo.
+
+    Args:
+        sol_file (str): ruta al archivo de solución
+        tipo_solucion (str): etiqueta de la solución
+        st_schedule (bool): ST o MT
+        hini (int): hora de inicio
+        hfin (int): hora de fin
+
+    Returns:
+        DataFrame largo ['Categoría','Propiedad','Nombre_PLEXOS','Valor','Hora']
+        (Propiedad con el nombre de PLEXOS: 'Generation', 'Generation Cost'…)
+    """
+    return query_solution(
+        name='generadores.csv',
+        label=tipo_solucion,
+        sol_file=sol_file,
+        collection='Generators',
+        property=PROPIEDADES_GENERADORES,
+        columns=['category_name', 'property_name', 'child_name', 'value', 'period_id'],
+        rename=['Categoría', 'Propiedad', 'Nombre_PLEXOS', 'Valor', 'Hora'],
+        st_schedule=st_schedule,
+        hini=hini,
+        hfin=hfin,
+        multiple=True
+    )
+
+
+def pivote_horas(df: pl.DataFrame, index, on: str, values: str, columnas: Iterable) -> pl.DataFrame:
+    """
+    `DataFrame.pivot(..., aggregate_function='first')` con columnas fijas: las
+    columnas son los valores de `columnas` (como str y en ese orden) aunque no
+    aparezcan en `df`, y las combinaciones ausentes son null. Es el pivote nativo
+    (una pasada); lo perezoso es lo de antes, que se junta en un `pl.collect_all`.
+
+    Args:
+        df (DataFrame): tabla larga
+        index (str | list): columna(s) índice (filas en orden de aparición)
+        on (str): columna cuyos valores pasan a columnas (p. ej. 'Hora')
+        values (str): columna de valores
+        columnas (iterable): valores de `on` a generar
+
+    Returns:
+        DataFrame ancho: index + una columna por valor de `columnas`
+    """
+    index = [index] if isinstance(index, str) else list(index)
+    columnas = list(columnas)
+    nombres = [str(c) for c in columnas]
+    tipo = df.schema[values]
+    ancho = (
+        df.filter(pl.col(on).is_in(columnas))
+        .pivot(on=on, index=index, values=values, aggregate_function="first", maintain_order=True)
+    )
+    faltan = [c for c in nombres if c not in ancho.columns]
+    return (
+        ancho.with_columns(pl.lit(None, dtype=tipo).alias(c) for c in faltan)
+        .select(*index, *(pl.col(c).cast(tipo) for c in nombres))
+    )
+
+
+def nombres_diccionario(path, columna: str, sheet_name=0) -> list[str]:
+    """
+    Nombres PLEXOS de un diccionario Excel, listos para `query_solution(nombres=...)`.
 
-    # Filtrar por rango de horas
-    df = df.filter((df["Hora"] >= hini) & (df["Hora"] <= hfin))
+    Args:
+        path: ruta al Excel (p. ej. FLUJOS_DIC_PATH, NEW_BESS_DIC_PATH)
+        columna (str): columna con los nombres PLEXOS
+        sheet_name: hoja a leer
 
-    return df
\ No newline at end of file
+    Returns:
+        list: nombres sin vacíos, '-' ni duplicados (orden original)
+    """
+    serie = pd.read_excel(path, sheet_name=sheet_name, dtype=str)[columna].dropna().str.strip()
+    return [n for n in dict.fromkeys(serie) if n and n != "-"]
@@ -5,6 +5,9 @@ import re
 import polars as pl
 import streamlit as st
 import pickle
+from compara_prg.config import COLUMNAR_DIR
+from compara_prg.io.resultados_columnar import es_columnar, cargar_columnar
+from compara_prg.io.cache_local import ruta_local
 warnings.filterwarnings("ignore", category=RuntimeWarning)
 
 # -----------------------------------------------------------------------------
@@ -38,11 +41,20 @@ def ruta_por_defecto(RESULTADOS_DIR) -> Path:
 # CARGA DE DATOS
 # -----------------------------------------------------------------------------
 
+def columnar_vigente(path: Path) -> Path | None:
+    """Carpeta columnar de un .pkl si existe y no es más antigua que el pickle."""
+    carpeta = COLUMNAR_DIR / path.stem
+    if es_columnar(carpeta) and (carpeta / "manifest.json").stat().st_mtime >= path.stat().st_mtime:
+        return carpeta
+    return None
+
+
 @st.cache_resource(show_spinner=True)
 def load_results(path: Path | str) -> dict:
-    """Carga un archivo de resultados (.pkl o .parquet).
+    """Carga un archivo de resultados (.pkl, .parquet o carpeta columnar).
        - Devuelve {} si algo sale mal.
        - Valida que el pickle deserializado sea dict.
+       - Si el .pkl ya fue convertido (services.backfill), lee la versión columnar.
     """
     # Aceptar string o Path
     path = Path(path)
@@ -51,15 +63,21 @@ def load_results(path: Path | str) -> dict:
         st.warning(f"⚠️  No se encontró {path}. Se devuelve {{}}.")
         return {}
     try:
-        # 2) Pickle binario
+        # 2) Carpeta columnar (directa o convertida desde el .pkl)
+        #    (si está en la red se lee desde la copia local validada)
+        if es_columnar(path):
+            return cargar_columnar(ruta_local(path))
+        if path.suffix.lower() == ".pkl" and (carpeta := columnar_vigente(path)) is not None:
+            return cargar_columnar(ruta_local(carpeta))
+        # 3) Pickle binario
         if path.suffix.lower() == ".pkl":
-            with path.open("rb") as fh:
+            with ruta_local(path).open("rb") as fh:
                 data = pickle.load(fh)
             if not isinstance(data, dict):
                 st.error(f"❌ {path.name} no contiene un dict válido.")
                 return {}
             return data
-        # 3) Parquet
+        # 4) Parquet
         elif path.suffix.lower() == ".parquet":
             return pl.read_parquet(path).to_dict(False)
         else:
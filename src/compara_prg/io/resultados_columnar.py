@@ -0,0 +1,362 @@
+# src/compara_prg/io/resultados_columnar.py
+"""
+Resultados en formato columnar: una carpeta por archivo de resultados con un
+archivo Arrow IPC (sin comprimir) por tabla y un `manifest.json` que describe
+cómo rearmar el dict {solución: {tabla: ...}} que usa la app (tuplas de
+GENTABLES, dict de GENT).
+
+Los .arrow se abren con memory-map: los buffers de las columnas son páginas del
+archivo en el page-cache del SO, compartidas entre sesiones/procesos que abren
+la misma fecha, en vez de copias en el heap como con `pickle.load`.
+
+También concentra la reparación de esquemas de pickles antiguos, para que
+lo que se escribe en columnar ya venga normalizado.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import polars as pl
+
+from compara_prg.config import PERFIL_ALMACENAMIENTO, TOL_FLOAT32
+from compara_prg.utils.funciones import coerce_schema, infer_hours, _coerce_gent_payload
+from compara_prg.services.rollups import CLAVE_ROLLUPS, agregar_rollups
+from compara_prg.services.costos import CLAVE_COSTOS, payload_costos
+
+FORMATO_VERSION = 4          # 1: Parquet por tabla · 2: Arrow IPC mapeable · 3: + perfil · 4: + ROLLUPS
+EXT = ".arrow"
+MANIFEST = "manifest.json"
+
+# Tablas que deben traer 'Nombre_PLEXOS' como primera columna
+_CON_NOMBRE = {"CMG", "BESS", "COTAS", "FLUJOS"}
+# Claves que guardan un dict {parte: DataFrame} (tipo "tablas" en el manifiesto)
+_DICTS_TABLAS = (CLAVE_ROLLUPS, CLAVE_COSTOS)
+# Tablas que la app suma y redondea a entero (generación a 0.1 MW deja muchos
+# totales justo en .5): el error de Float32 cambia el redondeo, quedan en Float64
+_SOLO_FLOAT64 = ("GENTABLES", CLAVE_COSTOS, CLAVE_ROLLUPS)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Reparación de esquemas
+# ─────────────────────────────────────────────────────────────────────────────
+def _horas_a_str(df: pl.DataFrame) -> pl.DataFrame:
+    ren = {c: str(c) for c in df.columns if not isinstance(c, str)}
+    return df.rename(ren) if ren else df
+
+
+def normalizar_resultados(results: Dict[str, Any]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """
+    Repara un dict de resultados (posiblemente antiguo) con la misma lógica que
+    usa la app al leer (`coerce_schema`, `_coerce_gent_payload`).
+
+    Returns:
+        (results_normalizado, problemas) — problemas es una lista de avisos
+        legibles (tablas descartadas, formatos antiguos reparados…)
+    """
+    problemas: List[str] = []
+    if not isinstance(results, dict):
+        return {}, [f"contenido no es dict ({type(results).__name__})"]
+
+    hours_full = infer_hours(results)
+    out: Dict[str, Dict[str, Any]] = {}
+
+    for sol, data in results.items():
+        if not isinstance(data, dict):
+            problemas.append(f"{sol}: solución no es dict ({type(data).__name__}), se omite")
+            continue
+        limpio: Dict[str, Any] = {}
+        for key, obj in data.items():
+            if key == "GENTABLES":
+                if not isinstance(obj, (tuple, list)):
+                    problemas.append(f"{sol}/GENTABLES: tipo {type(obj).__name__}, se omite")
+                    continue
+                partes = []
+                for i, df in enumerate(obj):
+                    if isinstance(df, pl.DataFrame):
+                        partes.append(coerce_schema(df, hours_full))
+                    else:
+                        problemas.append(f"{sol}/GENTABLES[{i}]: no es DataFrame, queda vacío")
+                        partes.append(pl.DataFrame({"Nombre_PLEXOS": []}, schema={"Nombre_PLEXOS": pl.Utf8}))
+                limpio[key] = tuple(partes)
+            elif key == "GENT":
+                gent = _coerce_gent_payload(obj)
+                if gent is None:
+                    problemas.append(f"{sol}/GENT: formato no reconocido ({type(obj).__name__}), se omite")
+                    continue
+                if isinstance(obj, pl.DataFrame):
+                    problemas.append(f"{sol}/GENT: formato antiguo (DataFrame suelto), sin pérdidas por línea")
+                limpio[key] = {
+                    "tabla": _horas_a_str(gent["tabla"]) if isinstance(gent.get("tabla"), pl.DataFrame) else None,
+                    "losses": gent.get("losses") if isinstance(gent.get("losses"), pl.DataFrame) else None,
+                }
+            elif key == CLAVE_COSTOS:
+                genc = payload_costos(obj)
+                if genc is None:
+                    problemas.append(f"{sol}/{key}: formato no reconocido ({type(obj).__name__}), se omite")
+                    continue
+                if isinstance(obj, pl.DataFrame):
+                    problemas.append(f"{sol}/{key}: formato antiguo (DataFrame suelto), sin detalle por central")
+                limpio[key] = {parte: (_horas_a_str(df) if parte == "tabla" else df)
+                               for parte, df in genc.items() if df is not None}
+            elif key == CLAVE_ROLLUPS:
+                if isinstance(obj, dict) and all(isinstance(v, pl.DataFrame) for v in obj.values()):
+                    limpio[key] = dict(obj)
+                else:
+                    problemas.append(f"{sol}/{key}: formato no reconocido, se recalcula")
+            elif isinstance(obj, pl.DataFrame):
+                limpio[key] = coerce_schema(obj, hours_full) if key in _CON_NOMBRE else _horas_a_str(obj)
+            else:
+                problemas.append(f"{sol}/{key}: tipo {type(obj).__name__} no soportado, se omite")
+        out[sol] = limpio
+    # Archivos anteriores a los agregados precalculados: se calculan aquí
+    agregar_rollups(out)
+    return out, problemas
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Perfil compacto (Float32 / Enum / UInt16)
+# ─────────────────────────────────────────────────────────────────────────────
+def _tablas(results: Dict[str, Dict[str, Any]]):
+    """(sol, tipo, ubicación, df) de todas las tablas; ubicación = clave o (clave, i|parte)."""
+    for sol, data in results.items():
+        for key, obj in data.items():
+            if key == "GENTABLES":
+                for i, df in enumerate(obj):
+                    yield sol, key, (key, i), df
+            elif key == "GENT":
+                for parte in ("tabla", "losses"):
+                    if obj.get(parte) is not None:
+                        yield sol, f"GENT.{parte}", (key, parte), obj[parte]
+            elif key in _DICTS_TABLAS:
+                for parte, df in obj.items():
+                    yield sol, f"{key}.{parte}", (key, parte), df
+            else:
+                yield sol, key, key, obj
+
+
+def enums_nombres(results: Dict[str, Dict[str, Any]]) -> Dict[str, pl.Enum]:
+    """
+    Un Enum de Nombre_PLEXOS por tipo de tabla (centrales, nodos, líneas, BESS),
+    común a todas las soluciones. Por tipo y no global: cada archivo IPC guarda
+    su diccionario y una tabla chica no debe cargar todos los nombres del archivo.
+    """
+    nombres: Dict[str, set] = {}
+    for _, tipo, _, df in _tablas(results):
+        if "Nombre_PLEXOS" in df.columns:
+            nombres.setdefault(tipo, set()).update(
+                df.get_column("Nombre_PLEXOS").cast(pl.Utf8).drop_nulls().unique().to_list()
+            )
+    return {tipo: pl.Enum(sorted(n)) for tipo, n in nombres.items()}
+
+
+def _compactar_df(df: pl.DataFrame, enum: pl.Enum | None, tol: float | None) -> Tuple[pl.DataFrame, float | None]:
+    """
+    Devuelve (df_compacto, error_max_float32). Las columnas Float64 pasan a Float32
+    sólo si el error de ida y vuelta de la tabla completa es ≤ tol; si no (o si
+    tol es None), quedan en Float64 y error_max_float32 es None.
+    """
+    exprs = []
+    if enum is not None and "Nombre_PLEXOS" in df.columns:
+        exprs.append(pl.col("Nombre_PLEXOS").cast(pl.Utf8).cast(enum))
+    if "Hora" in df.columns and df.schema["Hora"].is_integer():
+        if df.is_empty() or (df["Hora"].min() >= 0 and df["Hora"].max() <= 65535):
+            exprs.append(pl.col("Hora").cast(pl.UInt16))
+
+    floats = [c for c, t in df.schema.items() if t == pl.Float64]
+    err = None
+    if floats and tol is not None:
+        err = df.select(
+            pl.max_horizontal(
+                [(pl.col(c).cast(pl.Float32).cast(pl.Float64) - pl.col(c)).abs().max() for c in floats]
+            )
+        ).item() or 0.0
+        if err <= tol:
+            exprs += [pl.col(c).cast(pl.Float32) for c in floats]
+        else:
+            err = None
+    return (df.with_columns(exprs) if exprs else df), err
+
+
+def compactar_resultados(
+    results: Dict[str, Dict[str, Any]],
+    tol: float = TOL_FLOAT32,
+) -> Tuple[Dict[str, Dict[str, Any]], pl.DataFrame]:
+    """
+    Perfil compacto de un dict de resultados normalizado.
+
+    Returns:
+        (results_compacto, reporte) — reporte por tabla: sol, tipo, bytes_antes,
+        bytes_despues, float32 (bool) y err_max (error de ida y vuelta)
+    """
+    enums = enums_nombres(results)
+    out: Dict[str, Dict[str, Any]] = {
+        sol: {k: (list(v) if k == "GENTABLES" else dict(v) if k in ("GENT", *_DICTS_TABLAS) else v)
+              for k, v in data.items()}
+        for sol, data in results.items()
+    }
+    filas = []
+    for sol, tipo, ubic, df in _tablas(results):
+        tol_tabla = None if tipo.split(".")[0] in _SOLO_FLOAT64 else tol
+        comp, err = _compactar_df(df, enums.get(tipo), tol_tabla)
+        if isinstance(ubic, tuple):
+            out[sol][ubic[0]][ubic[1]] = comp
+        else:
+            out[sol][ubic] = comp
+        filas.append({
+            "sol": sol, "tipo": tipo,
+            "bytes_antes": df.estimated_size(), "bytes_despues": comp.estimated_size(),
+            "float32": err is not None, "err_max": err,
+        })
+    for data in out.values():
+        if "GENTABLES" in data:
+            data["GENTABLES"] = tuple(data["GENTABLES"])
+    return out, pl.DataFrame(filas)
+
+
+def resumen_tamanos(reporte: pl.DataFrame) -> pl.DataFrame:
+    """Reducción de tamaño por tipo de tabla (suma sobre soluciones)."""
+    return (
+        reporte.group_by("tipo")
+        .agg(
+            pl.col("bytes_antes").sum(),
+            pl.col("bytes_despues").sum(),
+            pl.col("float32").all(),
+            pl.col("err_max").max(),
+        )
+        .with_columns((pl.col("bytes_antes") / pl.col("bytes_despues")).round(2).alias("factor"))
+        .sort("tipo")
+    )
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Escritura / lectura
+# ─────────────────────────────────────────────────────────────────────────────
+def _escribir_tabla(df: pl.DataFrame, destino: Path) -> None:
+    # Sin compresión y en un solo chunk: condición para leer sin copiar (mmap)
+    df.rechunk().write_ipc(destino, compression="uncompressed")
+
+
+def _leer_tabla(origen: Path) -> pl.DataFrame:
+    if origen.suffix == ".parquet":          # carpetas v1
+        return pl.read_parquet(origen)
+    df = pl.read_ipc(origen, memory_map=True, rechunk=False)
+    # El Enum de nombres es por tipo de tabla (sólo ahorra espacio en disco): se
+    # entrega como Utf8 para que joins entre tablas y filtros por nombres que no
+    # están en el Enum (p. ej. una línea sin límite) no fallen
+    if isinstance(df.schema.get("Nombre_PLEXOS"), pl.Enum):
+        df = df.with_columns(pl.col("Nombre_PLEXOS").cast(pl.Utf8))
+    return df
+
+
+def guardar_columnar(
+    results: Dict[str, Dict[str, Any]],
+    destino: Path,
+    perfil: str = PERFIL_ALMACENAMIENTO,
+) -> Path:
+    """
+    Escribe `results` (ya normalizado) en la carpeta `destino`. Se arma en una
+    carpeta temporal y se renombra al final: la carpeta final o está completa
+    o no existe.
+
+    Args:
+        results (dict): resultados normalizados (`normalizar_resultados`)
+        destino (Path): carpeta de salida
+        perfil (str): 'estandar' (tipos tal cual) o 'compacto' (Float32 si la
+            tolerancia lo permite, nombres Enum, horas UInt16); la reducción por
+            tipo de tabla queda en el manifiesto
+
+    Returns:
+        Path de la carpeta escrita
+    """
+    destino = Path(destino)
+    tamanos = None
+    if perfil == "compacto":
+        results, reporte = compactar_resultados(results)
+        tamanos = resumen_tamanos(reporte).to_dicts()
+    tmp = destino.with_name(destino.name + ".tmp")
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+
+    manifest: Dict[str, Any] = {"version": FORMATO_VERSION, "perfil": perfil, "soluciones": {}}
+    if tamanos is not None:
+        manifest["tamanos"] = tamanos
+    for sol, data in results.items():
+        entradas: Dict[str, Any] = {}
+        for key, obj in data.items():
+            base = f"{sol}__{key}"
+            if key == "GENTABLES":
+                archivos = []
+                for i, df in enumerate(obj):
+                    nombre = f"{base}__{i}{EXT}"
+                    _escribir_tabla(df, tmp / nombre)
+                    archivos.append(nombre)
+                entradas[key] = {"tipo": "tupla", "archivos": archivos}
+            elif key == "GENT":
+                archivos = {}
+                for parte in ("tabla", "losses"):
+                    if obj.get(parte) is not None:
+                        nombre = f"{base}__{parte}{EXT}"
+                        _escribir_tabla(obj[parte], tmp / nombre)
+                        archivos[parte] = nombre
+                    else:
+                        archivos[parte] = None
+                entradas[key] = {"tipo": "gent", "archivos": archivos}
+            elif key in _DICTS_TABLAS:
+                archivos = {}
+                for parte, df in obj.items():
+                    nombre = f"{base}__{parte}{EXT}"
+                    _escribir_tabla(df, tmp / nombre)
+                    archivos[parte] = nombre
+                entradas[key] = {"tipo": "tablas", "archivos": archivos}
+            else:
+                nombre = f"{base}{EXT}"
+                _escribir_tabla(obj, tmp / nombre)
+                entradas[key] = {"tipo": "tabla", "archivos": nombre}
+        manifest["soluciones"][sol] = entradas
+
+    (tmp / MANIFEST).write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    if destino.exists():
+        shutil.rmtree(destino)
+    os.replace(tmp, destino)
+    return destino
+
+
+def es_columnar(path: Path | str) -> bool:
+    p = Path(path)
+    return p.is_dir() and (p / MANIFEST).exists()
+
+
+def version_columnar(path: Path | str) -> int | None:
+    try:
+        return json.loads((Path(path) / MANIFEST).read_text(encoding="utf-8")).get("version", 1)
+    except (OSError, ValueError):
+        return None
+
+
+def cargar_columnar(carpeta: Path | str) -> Dict[str, Dict[str, Any]]:
+    """Rearma el dict de resultados desde una carpeta escrita por `guardar_columnar`."""
+    carpeta = Path(carpeta)
+    manifest = json.loads((carpeta / MANIFEST).read_text(encoding="utf-8"))
+    results: Dict[str, Dict[str, Any]] = {}
+    for sol, entradas in manifest["soluciones"].items():
+        data: Dict[str, Any] = {}
+        for key, ent in entradas.items():
+            if ent["tipo"] == "tupla":
+                data[key] = tuple(_leer_tabla(carpeta / a) for a in ent["archivos"])
+            elif ent["tipo"] == "gent":
+                data[key] = {
+                    parte: (_leer_tabla(carpeta / a) if a else None)
+                    for parte, a in ent["archivos"].items()
+                }
+            elif ent["tipo"] == "tablas":
+                data[key] = {parte: _leer_tabla(carpeta / a) for parte, a in ent["archivos"].items()}
+            else:
+                data[key] = _leer_tabla(carpeta / ent["archivos"])
+        results[sol] = data
+    return results
@@ -0,0 +1,177 @@
+# src/compara_prg/io/topologia.py
+"""
+Topología de la red (nodos con coordenadas + líneas con extremos) persistida en
+Parquet junto a la base PLEXOS.
+
+La extracción desde la base (API PLEXOS) es lenta; se hace una vez por versión
+del XML y se guarda en `_data_intermedia/topologia/` con el hash del XML en el
+nombre. Un manifiesto (tamaño + mtime → hash) evita re-hashear el XML si no
+cambió, así que la carga normal es leer dos Parquet pequeños.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+import pandas as pd
+
+from compara_prg.config import _data_intermedia, DEFAULT_NAME_BASE
+
+# Subir si cambia el esquema o la lógica de extracción (invalida lo persistido)
+TOPOLOGIA_VERSION = 1
+TOPOLOGIA_DIR = _data_intermedia / "topologia"
+
+LAT_MIN, LAT_MAX = -56, -17
+LON_MIN, LON_MAX = -76, -66
+
+Extractor = Callable[[Path], Tuple[pd.DataFrame, pd.DataFrame]]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Extracción desde la base PLEXOS
+# ─────────────────────────────────────────────────────────────────────────────
+def _parse_mships_line(mships, col_nodo: str) -> pd.DataFrame:
+    # Formato: "<Línea> (<nombre>) ... (<nodo>)"
+    rows = []
+    for mem in mships:
+        op1 = mem.find('('); cp1 = mem.find(')')
+        op2 = mem.find('(', op1+1); cp2 = mem.find(')', op2+1)
+        rows.append({"Linea": mem[op1+2:cp1-1], col_nodo: mem[op2+2:cp2-1]})
+    return pd.DataFrame(rows, columns=["Linea", col_nodo])
+
+
+def extraer_topologia_plexos(xml_path: Path) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Nodos (Nodo, Lat, Lon) y líneas (Linea, NodoFrom, NodoTo) desde la base PLEXOS.
+    """
+    from compara_prg.io.query_base import query_read_base  # requiere API PLEXOS (clr)
+
+    db, collections, attributes, classes = query_read_base(str(xml_path))  # pasar a str, no Path
+
+    rows = []
+    for nod in db.GetChildMembers(collections['SystemNodes'], 'SEN'):
+        lat = db.GetAttributeValue(classes['Node'], nod, attributes['Node.Latitude'], 0)[1]
+        lon = db.GetAttributeValue(classes['Node'], nod, attributes['Node.Longitude'], 0)[1]
+        rows.append({"Nodo": nod, "Lat": float(lat) if lat else None, "Lon": float(lon) if lon else None})
+    df_nodes = pd.DataFrame(rows, columns=["Nodo", "Lat", "Lon"])
+
+    df_from = _parse_mships_line(db.GetMemberships(collections['LineNodeFrom']), "NodoFrom")
+    df_to   = _parse_mships_line(db.GetMemberships(collections['LineNodeTo']),   "NodoTo")
+    df_lines = pd.merge(df_from, df_to, on="Linea", how="outer")
+    return df_nodes, df_lines
+
+
+def armar_topologia(df_nodes: pd.DataFrame, df_lines: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Limpia y junta coordenadas: nodos y líneas recortados a Chile continental.
+
+    Returns:
+        (nodos: Nodo, Lat, Lon ; líneas: Linea, NodoFrom, NodoTo, LatFrom, LonFrom, LatTo, LonTo)
+    """
+    df_nodes = df_nodes.drop_duplicates(subset=["Nodo"]).reset_index(drop=True)
+    df_lines = (
+        df_lines
+        .dropna(subset=["NodoFrom","NodoTo"], how="any")
+        .drop_duplicates(subset=["Linea","NodoFrom","NodoTo"])
+        .reset_index(drop=True)
+    )
+
+    df_lines_xy = df_lines.merge(
+        df_nodes.rename(columns={"Nodo": "NodoFrom", "Lat": "LatFrom", "Lon": "LonFrom"}),
+        on="NodoFrom", how="left"
+    ).merge(
+        df_nodes.rename(columns={"Nodo": "NodoTo", "Lat": "LatTo", "Lon": "LonTo"}),
+        on="NodoTo", how="left"
+    ).dropna(subset=["LatFrom","LonFrom","LatTo","LonTo"])
+
+    df_lines_xy = df_lines_xy.query(
+        "@LAT_MIN <= LatFrom <= @LAT_MAX and @LON_MIN <= LonFrom <= @LON_MAX and \
+         @LAT_MIN <= LatTo   <= @LAT_MAX and @LON_MIN <= LonTo   <= @LON_MAX"
+    ).reset_index(drop=True)
+
+    df_nodes_cl = df_nodes.dropna().query(
+        "@LAT_MIN <= Lat <= @LAT_MAX and @LON_MIN <= Lon <= @LON_MAX"
+    ).reset_index(drop=True)
+
+    return df_nodes_cl, df_lines_xy
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Persistencia
+# ─────────────────────────────────────────────────────────────────────────────
+def hash_archivo(path: Path, bloque: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(bloque), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _tmp(destino: Path) -> Path:
+    # Temporal por proceso e hilo: varias sesiones pueden escribir la misma carpeta
+    return destino.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _hash_con_manifiesto(xml_path: Path, cache_dir: Path) -> str:
+    """Hash del XML; se reutiliza el del manifiesto si tamaño y mtime no cambiaron."""
+    st_xml = xml_path.stat()
+    manifiesto = cache_dir / "manifest.json"
+    try:
+        man = json.loads(manifiesto.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        man = {}
+    ent = man.get(str(xml_path.resolve()))
+    if ent and ent.get("size") == st_xml.st_size and ent.get("mtime") == st_xml.st_mtime_ns:
+        return ent["sha256"]
+
+    sha = hash_archivo(xml_path)
+    man[str(xml_path.resolve())] = {"size": st_xml.st_size, "mtime": st_xml.st_mtime_ns, "sha256": sha}
+    tmp = _tmp(manifiesto)
+    tmp.write_text(json.dumps(man, indent=2), encoding="utf-8")
+    os.replace(tmp, manifiesto)
+    return sha
+
+
+def _escribir_parquet(df: pd.DataFrame, destino: Path) -> None:
+    tmp = _tmp(destino)
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, destino)   # atómico: nunca queda un Parquet a medio escribir
+
+
+def cargar_topologia(
+    xml_path: Optional[Path] = None,
+    extractor: Extractor = extraer_topologia_plexos,
+    cache_dir: Path = TOPOLOGIA_DIR,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Topología lista para graficar, desde Parquet si existe para este XML.
+
+    Args:
+        xml_path (Path): base PLEXOS (por defecto `_data_intermedia / DEFAULT_NAME_BASE`)
+        extractor (callable): xml_path -> (nodos, líneas) crudos; reemplazable
+            (p. ej. una topología de prueba sin API PLEXOS)
+        cache_dir (Path): carpeta de los Parquet + manifiesto
+
+    Returns:
+        (df_nodes, df_lines) como en `armar_topologia`
+    """
+    xml_path = Path(xml_path or _data_intermedia / DEFAULT_NAME_BASE)
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    sha = _hash_con_manifiesto(xml_path, cache_dir)
+    tag = f"{sha[:16]}_v{TOPOLOGIA_VERSION}"
+    p_nodos = cache_dir / f"nodos_{tag}.parquet"
+    p_lineas = cache_dir / f"lineas_{tag}.parquet"
+
+    if p_nodos.exists() and p_lineas.exists():
+        return pd.read_parquet(p_nodos), pd.read_parquet(p_lineas)
+
+    df_nodes, df_lines = armar_topologia(*extractor(xml_path))
+    _escribir_parquet(df_nodes, p_nodos)
+    _escribir_parquet(df_lines, p_lineas)
+    return df_nodes, df_lines
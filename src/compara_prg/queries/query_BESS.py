@@ -1,12 +1,13 @@
 from compara_prg.io.query_general import *
-from compara_prg.config import BESS_DIC_PATH, NEW_BESS_DIC_PATH
+from compara_prg.config import BESS_DIC_PATH, NEW_BESS_DIC_PATH, FLUJOS_DIC_PATH
+from compara_prg.services.tecnologias import Tecnologia, con_tecnologia
 
 
 dict_bess = pd.read_excel(NEW_BESS_DIC_PATH, sheet_name="Hoja1")
 dict_bess = dict_bess.astype(str)
 dict_bess = pl.from_pandas(dict_bess)
 
-def get_bess(sol_file: str, tipo_solucion: str, directorio_salida: str, st_schedule: bool=True, hini: int=1, hfin: int=4) -> None:
+def get_bess(sol_file: str, tipo_solucion: str, directorio_salida: str, st_schedule: bool=True, hini: int=1, hfin: int=4, con_flujos: bool=False) -> None:
     """
     Función para obtener y procesar los valores de carga/descarga de baterías a partir de una solución Plexos,
     usando un diccionario con nombres de baterías.
@@ -19,14 +20,13 @@ def get_bess(sol_file: str, tipo_solucion: str, directorio_salida: str, st_sched
         hfin (int): Periodo final
         output_filename (str): Nombre del archivo de salida
         bess_dict_path (str): Ruta al archivo BESS_dict.xlsx
+        con_flujos (bool): entrega además el flujo por línea (Lines.Flow) que ya se
+            extrae para clasificar la carga de las BESS, sin consultas adicionales
 
     Returns:
-        None
+        DataFrame con el perfil BESS; (perfil, flujo_largo) si con_flujos
     """
 
-    #Obtengo los datos de los nuevos BESS
-    inyeccion_datos, df_charge_gen, df_charge_grid, perfil_completo = Query_new_BESS(sol_file, tipo_solucion, st_schedule, hini, hfin)
-
     # 1. Cargar diccionario
     bess_dict = pd.read_excel(BESS_DIC_PATH, dtype=str).fillna("")
     
@@ -47,31 +47,34 @@ def get_bess(sol_file: str, tipo_solucion: str, directorio_salida: str, st_sched
     normal_names = [x for x in normal_names if x != '']
     standalone_names = [x for x in standalone_names if x != '']
 
+    #Generadores que realmente se usan: baterías del diccionario + centrales renovables asociadas
+    generadores = csfrs_names + load_names + normal_names + standalone_names + dict_bess["Central renovable"].to_list()
+
+    #Obtengo los datos de los nuevos BESS
+    inyeccion_datos, df_charge_gen, df_charge_grid, perfil_completo, flujo = Query_new_BESS(
+        sol_file, tipo_solucion, st_schedule, hini, hfin, generadores=generadores
+    )
+
     # 2. Cargar query desde solución
     columns = ['category_name', 'child_name', 'value', 'period_id']
     rename = ['Categoría', 'Nombre_PLEXOS', 'Valor', 'Hora']
-    
-    # query = query_solution(sol_file, 'Generators', 'Generation', columns, rename, st_schedule, hini, hfin)
-    df_pivot = inyeccion_datos.pivot(
-        values='Valor',
-        index=['Categoría', 'Nombre_PLEXOS'],
-        on='Hora',
-        aggregate_function='first'
-    ).fill_null(0)
 
-    df_bat = df_pivot.filter(
-        pl.col('Categoría').str.contains(r'Hydro Ficticias'),
-    ).drop('Categoría')
+    # Horas comunes a los pivotes (se conocen antes de armar el grafo)
+    horas_int = inyeccion_datos['Hora'].unique().sort().to_list()
+    horas = [str(h) for h in horas_int]
 
+    def _baterias(df: pl.DataFrame) -> pl.LazyFrame:
+        return (
+            df.lazy()
+            .pipe(con_tecnologia, categorias=df['Categoría'])
+            .filter(pl.col('codigo') == Tecnologia.ALMACENAMIENTO)
+        )
 
-    # Detectar columnas de hora automáticamente
-    horas = [col for col in df_bat.columns if col != "Nombre_PLEXOS"]
+    def _pivote_baterias(df: pl.DataFrame) -> pl.DataFrame:
+        return pivote_horas(df, index='Nombre_PLEXOS', on='Hora', values='Valor', columnas=horas_int).fill_null(0)
 
     #Se intenta encontrar los datos de pumpload en caso de que existan, caso contrario es un archivo vacío
-
-    # Inicializar df_bat_pumpload vacío con las mismas columnas que df_bat
-    df_bat_pumpload = pl.DataFrame(schema={"Nombre_PLEXOS": pl.Utf8, **{h: pl.Float64 for h in horas}})
-
+    query_pumpload = None
     try:
         # query_pumpload = query_solution(sol_file,'Generators','PumpLoad',columns,rename,st_schedule,hini,hfin)
         query_pumpload = query_solution(
@@ -84,23 +87,19 @@ def get_bess(sol_file: str, tipo_solucion: str, directorio_salida: str, st_sched
             rename=rename,
             st_schedule=st_schedule,
             hini=hini,
-            hfin=hfin
+            hfin=hfin,
+            nombres=standalone_names
         )
-
-        df_pivot_pumpload = query_pumpload.pivot(
-            values='Valor',
-            index=['Categoría', 'Nombre_PLEXOS'],
-            on='Hora',
-            aggregate_function='first'
-        ).fill_null(0)
-
-        df_bat_pumpload = df_pivot_pumpload.filter(
-            pl.col('Categoría').str.contains(r'Hydro Ficticias'),
-        ).drop('Categoría')
-
     except Exception:
         print('No se encontraron datos de PumpLoad para baterías stand alone en ST')
 
+    # Filtros de generación y PumpLoad: independientes, se resuelven juntos
+    if query_pumpload is not None:
+        df_bat, df_bat_pumpload = map(_pivote_baterias, pl.collect_all([_baterias(inyeccion_datos), _baterias(query_pumpload)]))
+    else:
+        df_bat = _pivote_baterias(_baterias(inyeccion_datos).collect())
+        df_bat_pumpload = pl.DataFrame(schema={"Nombre_PLEXOS": pl.Utf8, **{h: pl.Float64 for h in horas}})
+
 
     # 3. CSFRS
     normal_names_csfrs = [name for name in normal_names if "VR1" in name]
@@ -179,13 +178,15 @@ def get_bess(sol_file: str, tipo_solucion: str, directorio_salida: str, st_sched
     df_final = df_pumps.vstack(df_csfrs).vstack(df_resultado)
     df_final = df_final.vstack(perfil_completo)
 
+    if con_flujos:
+        return df_final, flujo
     return df_final
 
 
 
 
 
-def obtener_datos(sol_file, tipo_solucion: str, st_schedule, hini, hfin):
+def obtener_datos(sol_file, tipo_solucion: str, st_schedule, hini, hfin, generadores=None):
 
     # Query carga
     columns_carga = ['category_name', 'child_name', 'property_name','value', 'period_id']
@@ -201,7 +202,8 @@ def obtener_datos(sol_file, tipo_solucion: str, st_schedule, hini, hfin):
         rename=rename_carga,
         st_schedule=st_schedule,
         hini=hini,
-        hfin=hfin
+        hfin=hfin,
+        nombres=dict_bess["Nombre"].to_list()
     )
 
 
@@ -220,11 +222,12 @@ def obtener_datos(sol_file, tipo_solucion: str, st_schedule, hini, hfin):
         rename=rename_inyeccion,
         st_schedule=st_schedule,
         hini=hini,
-        hfin=hfin
+        hfin=hfin,
+        nombres=generadores
     )
 
 
-    # Query flujos
+    # Query flujos: líneas de las BESS + líneas del diccionario de flujos (se guardan en FLUJOS)
     columns_flujos = ['category_name', 'child_name', 'property_name','value', 'period_id']
     rename_flujos = ['Categoría', 'Nombre_PLEXOS', 'Propiedad' ,'Valor', 'Hora']
     # flujo = query_solution(sol_file, 'Lines', 'Flow', columns_flujos, rename_flujos, st_schedule, hini, hfin)
@@ -239,70 +242,59 @@ def obtener_datos(sol_file, tipo_solucion: str, st_schedule, hini, hfin):
         rename=rename_flujos,
         st_schedule=st_schedule,
         hini=hini,
-        hfin=hfin
+        hfin=hfin,
+        nombres=dict_bess["Linea"].to_list() + nombres_diccionario(FLUJOS_DIC_PATH, "Nombre_Plexos")
     )
 
 
+    # Los filtros y joins de las tres tablas se resuelven juntos; luego se pivotean
+    # con las horas de la carga y se completan con ceros para las baterías/horas faltantes
+    horas = carga_bateria.filter(pl.col("Propiedad") == "Charging")["Hora"].unique().sort().to_list()
+    baterias = dict_bess.select(pl.col("Nombre").alias("Nombre bateria"))
+
+    def _por_bateria(largo: pl.DataFrame, index: str) -> pl.DataFrame:
+        pivote = (
+            pivote_horas(largo, index=index, on="Hora", values="Valor", columnas=horas)
+            .rename({index: "Nombre bateria"})
+        )
+        # Asegurar que todas las baterías del diccionario estén presentes
+        return baterias.join(pivote, on="Nombre bateria", how="left").fill_null(0)
+
     #### 1. CARGA BATERÍA
     nombres_baterias = dict_bess["Nombre"]
-    df_carga_bateria = (
-        carga_bateria
+    carga = (
+        carga_bateria.lazy()
         .filter(pl.col("Propiedad") == "Charging")
         .filter(pl.col("Nombre_PLEXOS").is_in(nombres_baterias))
-        .pivot(index="Nombre_PLEXOS", on="Hora", values="Valor", aggregate_function="first")
-        .rename({"Nombre_PLEXOS": "Nombre bateria"})
     )
-    # Asegurar que todas las baterías del diccionario estén presentes
-    df_carga_bateria = dict_bess.select(pl.col("Nombre").alias("Nombre bateria")).join(
-        df_carga_bateria, on="Nombre bateria", how="left"
-    ).fill_null(0)
 
     #### 2. INYECCIÓN PARQUE
     # Filtrar solo nombres válidos desde el diccionario
-    inyeccion_dict = dict_bess.select(["Nombre", "Central renovable"]).filter(pl.col("Central renovable") != "-")
+    inyeccion_dict = dict_bess.lazy().select(["Nombre", "Central renovable"]).filter(pl.col("Central renovable") != "-")
 
     # Unir con datos de inyección
-    df_inyeccion_parque = (
-        inyeccion_generador
+    inyeccion = (
+        inyeccion_generador.lazy()
         .filter(pl.col("Propiedad") == "Generation")
         .join(inyeccion_dict, left_on="Nombre_PLEXOS", right_on="Central renovable", how="inner")
-        .pivot(index="Nombre", on="Hora", values="Valor", aggregate_function="first")
-        .rename({"Nombre": "Nombre bateria"})
     )
 
-    # Detectar columnas de hora automáticamente
-    horas = [c for c in df_carga_bateria.columns if c != "Nombre bateria"]
-    df_inyeccion_parque = dict_bess.select(pl.col("Nombre").alias("Nombre bateria")).join(
-        df_inyeccion_parque, on="Nombre bateria", how="left"
-    )
-    for h in horas:
-        if h not in df_inyeccion_parque.columns:
-            df_inyeccion_parque = df_inyeccion_parque.with_columns(pl.lit(0).alias(h))
-    df_inyeccion_parque = df_inyeccion_parque.fill_null(0)
-
-
     #### 3. FLUJO LÍNEAS
-    lineas_dict = dict_bess.select(["Nombre", "Linea"]).filter(pl.col("Linea") != "-")
+    lineas_dict = dict_bess.lazy().select(["Nombre", "Linea"]).filter(pl.col("Linea") != "-")
 
     # Unir con datos de flujo
-    df_flujo_linea = (
-        flujo
+    flujo_linea = (
+        flujo.lazy()
         .filter(pl.col("Propiedad") == "Flow")
         .join(lineas_dict, left_on="Nombre_PLEXOS", right_on="Linea", how="inner")
-        .pivot(index="Nombre", on="Hora", values="Valor", aggregate_function="first")
-        .rename({"Nombre": "Nombre bateria"})
     )
 
-    # Rellenar con ceros para las baterías faltantes y asegurar todas las horas
-    df_flujo_linea = dict_bess.select(pl.col("Nombre").alias("Nombre bateria")).join(
-        df_flujo_linea, on="Nombre bateria", how="left"
-    )
-    for h in horas:
-        if h not in df_flujo_linea.columns:
-            df_flujo_linea = df_flujo_linea.with_columns(pl.lit(0).alias(h))
-    df_flujo_linea = df_flujo_linea.fill_null(0)
+    carga, inyeccion, flujo_linea = pl.collect_all([carga, inyeccion, flujo_linea])
+    df_carga_bateria = _por_bateria(carga, "Nombre_PLEXOS")
+    df_inyeccion_parque = _por_bateria(inyeccion, "Nombre")
+    df_flujo_linea = _por_bateria(flujo_linea, "Nombre")
 
-    return inyeccion_generador,df_carga_bateria, df_inyeccion_parque, df_flujo_linea
+    return inyeccion_generador,df_carga_bateria, df_inyeccion_parque, df_flujo_linea, flujo
 
 
 
@@ -370,20 +362,20 @@ def charge_gen_grid(df_carga, df_inyeccion, df_flujo):
     return df_charge_gen, df_charge_grid
 
 
-def obtener_carga_gen_grid(sol_file, tipo_solucion: str, st_schedule, hini, hfin):
+def obtener_carga_gen_grid(sol_file, tipo_solucion: str, st_schedule, hini, hfin, generadores=None):
     #Primero se llama a la función que hace las consultas
-    inyeccion_datos,df_carga_bateria, df_inyeccion_parque, df_flujo_linea = obtener_datos(sol_file, tipo_solucion, st_schedule, hini, hfin)
+    inyeccion_datos,df_carga_bateria, df_inyeccion_parque, df_flujo_linea, flujo = obtener_datos(sol_file, tipo_solucion, st_schedule, hini, hfin, generadores)
 
     #Luego se generan los archivo charge_gen y charge_grid según las reglas
     df_charge_gen, df_charge_grid = charge_gen_grid(df_carga_bateria, df_inyeccion_parque, df_flujo_linea)
 
-    return inyeccion_datos, df_charge_gen, df_charge_grid
+    return inyeccion_datos, df_charge_gen, df_charge_grid, flujo
 
 
-def Query_new_BESS(sol_file, tipo_solucion: str,st_schedule, hini, hfin):
+def Query_new_BESS(sol_file, tipo_solucion: str,st_schedule, hini, hfin, generadores=None):
 
     #Primero se obtienen los dos dataframes: carga de red y carga de generador
-    inyeccion_datos, df_charge_gen, df_charge_grid = obtener_carga_gen_grid(sol_file, tipo_solucion, st_schedule, hini, hfin)
+    inyeccion_datos, df_charge_gen, df_charge_grid, flujo = obtener_carga_gen_grid(sol_file, tipo_solucion, st_schedule, hini, hfin, generadores)
 
     #Ahora se debe de obtener el perfil de generación de las bess
     columns = ['child_name', 'value', 'period_id']
@@ -399,7 +391,8 @@ def Query_new_BESS(sol_file, tipo_solucion: str,st_schedule, hini, hfin):
         rename=rename,
         st_schedule=st_schedule,
         hini=hini,
-        hfin=hfin
+        hfin=hfin,
+        nombres=dict_bess["Nombre"].to_list()
     )
 
     #Se pivotea la tabla
@@ -454,4 +447,4 @@ def Query_new_BESS(sol_file, tipo_solucion: str,st_schedule, hini, hfin):
     df_charge_grid = renombrar_baterias(df_charge_grid, dict_bess)
     perfil_completo = renombrar_baterias(perfil_completo, dict_bess)
 
-    return inyeccion_datos, df_charge_gen, df_charge_grid, perfil_completo
\ No newline at end of file
+    return inyeccion_datos, df_charge_gen, df_charge_grid, perfil_completo, flujo
\ No newline at end of file
@@ -1,7 +1,6 @@
-import polars as pl
 from compara_prg.io.query_general import *
 
-def get_cmg(sol_file: str, tipo_solucion: str, directorio_salida: str, st_schedule: bool=True, hini: int=1, hfin: int=48) -> None:
+def get_cmg(sol_file: str, tipo_solucion: str, directorio_salida: str, st_schedule: bool=True, hini: int=1, hfin: int=48, nodos: list[str]=None) -> None:
     """
     Función query que se encarga de obtener los valores de los costos marginales las líneas de trasnmisión
     del modelo Plexos y entregarlos en el archivo Nod_CMg.xlsx que se genera en la carpeta de resultados
@@ -13,6 +12,7 @@ def get_cmg(sol_file: str, tipo_solucion: str, directorio_salida: str, st_schedu
         st_schedule (boolean): Booleano que indica si es tipo st_schedule o no
         hini (int): Número entero que indica el periodo inicial del cuál se desean extraer los datos
         hfin (int): Número entero que indica el periodo final del cual se desean extraer los datos
+        nodos (list): Nodos a extraer; None extrae todos los nodos de la solución
 
     Returns:
     
@@ -32,7 +32,8 @@ def get_cmg(sol_file: str, tipo_solucion: str, directorio_salida: str, st_schedu
         rename=rename,
         st_schedule=st_schedule,
         hini=hini,
-        hfin=hfin
+        hfin=hfin,
+        nombres=nodos
     )
 
     #Se pivotea la tabla
@@ -42,12 +43,4 @@ def get_cmg(sol_file: str, tipo_solucion: str, directorio_salida: str, st_schedu
         on="Hora"
     ).fill_null(0)
 
-    quillota = pivoted.filter(pl.col('Nombre_PLEXOS') == 'Quillota220')
-
-    quillota = quillota.with_columns(
-        pl.when(pl.col("Nombre_PLEXOS") == "Quillota220")
-        .then(pl.lit("Costo Marginal Quillota 220 kV"))
-        .otherwise(pl.col("Nombre_PLEXOS"))
-        .alias("Nombre_PLEXOS")
-    )
     return pivoted
\ No newline at end of file
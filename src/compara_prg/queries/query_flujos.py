@@ -0,0 +1,49 @@
+from __future__ import annotations
+import polars as pl
+from typing import Iterable, Optional
+from compara_prg.io.query_general import *
+
+def get_limites_lineas(
+    sol_file: str,
+    tipo_solucion: str,
+    lineas: Iterable[str],
+    st_schedule: bool = True,
+    hini: int = 1,
+    hfin: int = 48,
+) -> Optional[pl.DataFrame]:
+    """
+    Límites de transmisión (Export/Import Limit) de las líneas indicadas, para
+    calcular carga y horas de congestión de los flujos ya extraídos.
+
+    Args:
+        sol_file (str): archivo de solución .zip de Plexos
+        tipo_solucion (str): etiqueta de la solución
+        lineas (list): líneas a consultar (las mismas de FLUJOS)
+        st_schedule (bool): si es tipo st_schedule
+        hini (int): periodo inicial
+        hfin (int): periodo final
+
+    Returns:
+        DataFrame largo ['Nombre_PLEXOS','Propiedad','Valor','Hora'] o None si la
+        solución no reporta límites
+    """
+    columns = ["child_name", "property_name", "value", "period_id"]
+    rename = ["Nombre_PLEXOS", "Propiedad", "Valor", "Hora"]
+    try:
+        return query_solution(
+            name="limites_lineas.csv",
+            label=tipo_solucion,
+            sol_file=sol_file,
+            collection="Lines",
+            property=["ExportLimit", "ImportLimit"],
+            columns=columns,
+            rename=rename,
+            st_schedule=st_schedule,
+            hini=hini,
+            hfin=hfin,
+            multiple=True,
+            nombres=list(lineas),
+        )
+    except Exception as e:
+        print(f"[WARN] {tipo_solucion}: sin límites de líneas ({e})")
+        return None
@@ -1,11 +1,10 @@
-import polars as pl
 from compara_prg.io.query_general import *
+from compara_prg.services.costos import tablas_costos
 
-def get_gen_costs(sol_file: str,  tipo_solucion: str,directorio_salida: str, st_schedule: bool=True, hini: int=1, hfin: int=48, output_filename: str='Gen_costs.xlsx') -> None:
+def get_gen_costs(sol_file: str,  tipo_solucion: str,directorio_salida: str, st_schedule: bool=True, hini: int=1, hfin: int=48, output_filename: str='Gen_costs.xlsx') -> dict:
     """
     Función query que se encarga de obtener los valores de los costos de operación, costos de encendido/detención
-     y los costos totales de la operación del modelo Plexos y entregarlos en el archivo Gen_costs.xlsx que se 
-     genera en la carpeta de resultados
+     y los costos totales de la operación del modelo Plexos, por sistema y por central
     
     Args:
 
@@ -18,45 +17,10 @@ def get_gen_costs(sol_file: str,  tipo_solucion: str,directorio_salida: str, st_
 
     Returns:
     
-        None: El código no posee ningun return
+        dict: {"tabla": costos de sistema por propiedad y hora [kUSD],
+               "detalle": costos por central en formato largo (ver services/costos.py)}
     """
-    columns = ['property_name','child_name','value','period_id']
-    rename = ['Propiedad','Nombre_PLEXOS','Costo','Hora']
-    query = query_solution(
-        name='gencost.csv',
-        label=tipo_solucion,
-        sol_file=sol_file,
-        collection='Generators',
-        property=['GenerationCost', 'Start&ShutdownCost', 'TotalGenerationCost'],
-        columns=columns,
-        rename=rename,
-        st_schedule=st_schedule,
-        hini=hini,
-        hfin=hfin,
-        multiple=True
-    )
+    # Misma extracción que GENTABLES y GENT (ver query_generadores)
+    query = query_generadores(sol_file, tipo_solucion, st_schedule, hini, hfin)
 
-    query = query.with_columns(
-    (pl.col('Costo') / 1000).alias('Costo')
-    )
-
-    df_pivot = query.pivot(
-    values="Costo",
-    index="Propiedad",
-    on="Hora",
-    aggregate_function="sum"
-    )
-
-        # Diccionario de reemplazo
-    reemplazos = {
-        "Generation Cost": "Costos Operación",
-        "Start & Shutdown Cost": "Costos Encendido/Detención",
-        "Total Generation Cost": "Costos Totales [kUSD]"
-    }
-
-    # Aplicar reemplazo
-    df_pivot = df_pivot.with_columns(
-        pl.col("Propiedad").replace(reemplazos).alias("Propiedad")
-    )
-
-    return df_pivot
\ No newline at end of file
+    return tablas_costos(query)
@@ -1,6 +1,7 @@
 import polars as pl
 from compara_prg.io.query_general import *
 from compara_prg.config import GEN_AUXUSE_CSV
+from compara_prg.services.tecnologias import Tecnologia, con_tecnologia
 
 
 def get_generation_tables(sol_file: str, tipo_solucion: str, directorio_salida: str, directorio_fecha: str, st_schedule: bool=True, hini: int=1, hfin: int=48) -> None:
@@ -19,89 +20,40 @@ def get_generation_tables(sol_file: str, tipo_solucion: str, directorio_salida:
 
     Returns:
 
-        None: El código no posee ningun return
+        tuple: (hydro, bess, thermal, solar, wind), una tabla ancha por categoría
     """
-        
-    columns = ['category_name','child_name','value','period_id']
-    rename = ['Categoría','Nombre_PLEXOS','Gen_Neta','Hora']
 
-   
-    query = query_solution(
-        name='tables.csv',
-        label=tipo_solucion,
-        sol_file=sol_file,
-        collection='Generators',
-        property='Generation',
-        columns=columns,
-        rename=rename,
-        st_schedule=st_schedule,
-        hini=hini,
-        hfin=hfin
-    )
-    # 1. Leer archivo
-    auxuse = pl.read_csv(GEN_AUXUSE_CSV)
+    # Misma extracción que GENT y GENC (ver query_generadores)
+    query = query_generadores(sol_file, tipo_solucion, st_schedule, hini, hfin)
 
-    # 2. Renombrar columnas archivo Gen_AuxUse
-    auxuse = auxuse.rename({
+    # 1. Leer archivo y renombrar columnas de Gen_AuxUse
+    auxuse = pl.scan_csv(GEN_AUXUSE_CSV).rename({
         'Name': 'Nombre_PLEXOS',
         'Value': 'Gen_Aux_Use'
     })
 
-    # 3. Hacer join
-    df = query.join(auxuse, on='Nombre_PLEXOS', how='left')
-
-    # 4. Rellenar nulos en 'Gen_Aux_Use' con 0
-    df = df.with_columns(
-        pl.col('Gen_Aux_Use').fill_null(0)
+    # 2. Grafo de la solución: filtro, código de tecnología (join con la tabla de
+    #    categorías, ver services/tecnologias.py), Gen_AuxUse, Gen_Bruta y un solo pivote
+    df_pivot = (
+        query.lazy()
+        .filter(pl.col('Propiedad') == 'Generation')
+        .pipe(con_tecnologia, categorias=query['Categoría'])
+        .join(auxuse, on='Nombre_PLEXOS', how='left')
+        .with_columns(
+            (pl.col('Valor') + pl.col('Gen_Aux_Use').fill_null(0) * (pl.col('Valor') != 0))
+            .round(1).alias('Gen_Bruta')
+        )
+        .select('codigo', 'Nombre_PLEXOS', 'Hora', 'Gen_Bruta')
+        .collect()
+        .pivot(values='Gen_Bruta', index=['codigo', 'Nombre_PLEXOS'], on='Hora', aggregate_function='first')
+        .fill_null(0)
     )
 
-    # 5. Crear columna 'Gen_Bruta' como suma condicional
-    df = df.with_columns(
-        (pl.col('Gen_Neta') + pl.col('Gen_Aux_Use') * (pl.col('Gen_Neta') != 0)).alias('Gen_Bruta')
+    # 3. Una tabla por tecnología (orden de CATEGORY_LABELS) con un solo partition_by
+    partes = df_pivot.partition_by('codigo', as_dict=True, include_key=False, maintain_order=True)
+    vacia = df_pivot.clear().drop('codigo')
+    df_hydro, df_bess, df_thermal, df_solar, df_wind = (
+        partes.get((int(t),), vacia) for t in Tecnologia
     )
 
-    # 6. Filtrar columnas
-    df = df.select(['Categoría', 'Nombre_PLEXOS', 'Gen_Bruta', 'Hora'])
-
-    # 7. Redondear
-    df = df.with_columns(
-        pl.col('Gen_Bruta').round(1)
-    )
-
-    # 8. Pivot table (reshape)
-    df_pivot = df.pivot(
-        values='Gen_Bruta',
-        index=['Categoría', 'Nombre_PLEXOS'],
-        on='Hora',
-        aggregate_function='first'  # ya que no hay agregación real
-    ).fill_null(0)
-
-    # 9. Se filtran las centrales por su categoría
-
-    #Centrales Hydro
-    df_hydro = df_pivot.filter(
-    pl.col('Categoría').str.contains(r'Hydro Gen Group A')
-    ).drop('Categoría')
-
-    #Baterías
-    df_bess = df_pivot.filter(
-    pl.col('Categoría').str.contains(r'Hydro Ficticias')
-    ).drop('Categoría')
-
-    #Térmicas
-    df_thermal = df_pivot.filter(
-    pl.col('Categoría').str.contains(r'Thermal')
-    ).drop('Categoría')
-
-    #Solares
-    df_solar = df_pivot.filter(
-    pl.col('Categoría').str.contains(r'Solar')
-    ).drop('Categoría')
-
-    #Eólicas
-    df_wind = df_pivot.filter(
-    pl.col('Categoría').str.contains(r'Wind')
-    ).drop('Categoría')
-
     return df_hydro, df_bess, df_thermal, df_solar, df_wind
-
@@ -34,20 +34,14 @@ def get_total_generation(sol_file: str,
     """
     auxuse = pl.read_csv(GEN_AUXUSE_CSV)
     columns = ['child_name','value','period_id']
-    rename_generation = ['Nombre_PLEXOS','Gen_Neta','Hora']
     rename_loss = ['Nombre_PLEXOS', 'Loss', 'Hora']
 
-    query_generation = query_solution(
-            name='gentotal.csv',
-            label=tipo_solucion,
-            sol_file=sol_file,
-            collection='Generators',
-            property='Generation',
-            columns=columns,
-            rename=rename_generation,
-            st_schedule=st_schedule,
-            hini=hini,
-            hfin=hfin)
+    # Misma extracción que GENTABLES y GENC (ver query_generadores)
+    query_generation = (
+        query_generadores(sol_file, tipo_solucion, st_schedule, hini, hfin)
+        .filter(pl.col('Propiedad') == 'Generation')
+        .select(pl.col('Nombre_PLEXOS'), pl.col('Valor').alias('Gen_Neta'), pl.col('Hora'))
+    )
 
 
     query_loss = query_solution(
@@ -0,0 +1,187 @@
+# src/compara_prg/services/backfill.py
+"""
+Conversión masiva de results_*.pkl antiguos a formato columnar (+ almacén).
+
+Cada pickle se repara con `normalizar_resultados`, se escribe como carpeta
+columnar en COLUMNAR_DIR y, opcionalmente, se agrega al almacén histórico.
+Corre en paralelo (un proceso por archivo) y lleva un manifiesto con el
+estado de cada archivo: volver a correrlo sólo procesa lo nuevo, lo que cambió
+o lo que falló.
+
+Uso:
+    python -m compara_prg.services.backfill [--workers 4] [--forzar] [--sin-almacen]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from compara_prg.config import RESULTS_DIR, COLUMNAR_DIR, WAREHOUSE_DIR
+from compara_prg.io.resultados_columnar import (
+    FORMATO_VERSION, guardar_columnar, normalizar_resultados, version_columnar,
+)
+from compara_prg.services.warehouse import escribir_resultados, partes_desde_nombre
+
+MANIFEST_BACKFILL = "backfill_manifest.json"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Trabajo por archivo (corre en un proceso hijo)
+# ─────────────────────────────────────────────────────────────────────────────
+def convertir_archivo(pkl: str, destino_dir: str, almacen_dir: Optional[str]) -> Dict[str, Any]:
+    """
+    Convierte un pickle. Nunca levanta excepción: el error queda en el registro.
+
+    Returns:
+        dict con archivo, estado ('ok' | 'error'), problemas, salida y segundos
+    """
+    t0 = time.perf_counter()
+    pkl_p = Path(pkl)
+    reg: Dict[str, Any] = {"archivo": pkl_p.name, "estado": "error", "problemas": [], "salida": None}
+    try:
+        with pkl_p.open("rb") as fh:
+            raw = pickle.load(fh)
+    except Exception as e:
+        reg["problemas"].append(f"no se pudo leer el pickle: {type(e).__name__}: {e}")
+        reg["segundos"] = round(time.perf_counter() - t0, 2)
+        return reg
+
+    results, problemas = normalizar_resultados(raw)
+    reg["problemas"].extend(problemas)
+    if not results:
+        reg["problemas"].append("sin soluciones utilizables")
+        reg["segundos"] = round(time.perf_counter() - t0, 2)
+        return reg
+
+    try:
+        salida = guardar_columnar(results, Path(destino_dir) / pkl_p.stem)
+        reg["salida"] = str(salida)
+        if almacen_dir:
+            partes = partes_desde_nombre(pkl_p)
+            if partes is None:
+                reg["problemas"].append("nombre no reconocido: no se agrega al almacén")
+            else:
+                escribir_resultados(results, *partes, raiz=Path(almacen_dir))
+        reg["estado"] = "ok"
+    except Exception as e:
+        reg["problemas"].append(f"error al escribir: {type(e).__name__}: {e}")
+    reg["segundos"] = round(time.perf_counter() - t0, 2)
+    return reg
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Manifiesto
+# ─────────────────────────────────────────────────────────────────────────────
+def leer_manifiesto(destino_dir: Path) -> Dict[str, Any]:
+    try:
+        return json.loads((Path(destino_dir) / MANIFEST_BACKFILL).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _guardar_manifiesto(destino_dir: Path, man: Dict[str, Any]) -> None:
+    p = Path(destino_dir) / MANIFEST_BACKFILL
+    tmp = p.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(man, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, p)
+
+
+def _al_dia(ent: Optional[Dict[str, Any]], pkl: Path) -> bool:
+    if not ent or ent.get("estado") != "ok":
+        return False
+    st_pkl = pkl.stat()
+    return (
+        ent.get("size") == st_pkl.st_size
+        and ent.get("mtime") == st_pkl.st_mtime_ns
+        and ent.get("salida") is not None
+        and version_columnar(ent["salida"]) == FORMATO_VERSION   # carpetas de formato viejo se regeneran
+    )
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Orquestación
+# ─────────────────────────────────────────────────────────────────────────────
+def backfill(
+    results_dir: Path = RESULTS_DIR,
+    destino_dir: Path = COLUMNAR_DIR,
+    almacen_dir: Optional[Path] = WAREHOUSE_DIR,
+    workers: Optional[int] = None,
+    forzar: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Convierte todos los results_*.pkl de `results_dir`.
+
+    Args:
+        results_dir (Path): carpeta con los pickles
+        destino_dir (Path): carpeta de salida columnar (+ manifiesto)
+        almacen_dir (Path): raíz del almacén histórico; None para no alimentarlo
+        workers (int): procesos (por defecto os.cpu_count())
+        forzar (bool): re-convierte aunque el manifiesto diga que está al día
+
+    Returns:
+        Registros de los archivos procesados en esta corrida
+    """
+    destino_dir = Path(destino_dir)
+    destino_dir.mkdir(parents=True, exist_ok=True)
+    man = leer_manifiesto(destino_dir)
+
+    pendientes = [
+        p for p in sorted(Path(results_dir).glob("results_*.pkl"))
+        if forzar or not _al_dia(man.get(p.name), p)
+    ]
+    print(f"[backfill] {len(pendientes)} archivo(s) por convertir "
+          f"({len(man)} en manifiesto) → {destino_dir}")
+
+    registros: List[Dict[str, Any]] = []
+    if not pendientes:
+        return registros
+
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futures = {
+            ex.submit(convertir_archivo, str(p), str(destino_dir), str(almacen_dir) if almacen_dir else None): p
+            for p in pendientes
+        }
+        for fut in as_completed(futures):
+            p = futures[fut]
+            try:
+                reg = fut.result()
+            except Exception as e:            # el proceso hijo murió
+                reg = {"archivo": p.name, "estado": "error", "salida": None,
+                       "problemas": [f"proceso falló: {type(e).__name__}: {e}"]}
+            st_pkl = p.stat()
+            reg["size"], reg["mtime"] = st_pkl.st_size, st_pkl.st_mtime_ns
+            man[p.name] = reg
+            _guardar_manifiesto(destino_dir, man)   # se guarda por archivo: corrida reanudable
+            registros.append(reg)
+
+            marca = "✓" if reg["estado"] == "ok" else "✗"
+            print(f"  {marca} {reg['archivo']} ({reg.get('segundos', '-')} s)")
+            for prob in reg["problemas"]:
+                print(f"      · {prob}")
+
+    n_ok = sum(r["estado"] == "ok" for r in registros)
+    print(f"[backfill] {n_ok}/{len(registros)} convertidos sin error")
+    return registros
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Convierte results_*.pkl a formato columnar.")
+    ap.add_argument("--origen", type=Path, default=RESULTS_DIR)
+    ap.add_argument("--destino", type=Path, default=COLUMNAR_DIR)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--forzar", action="store_true")
+    ap.add_argument("--sin-almacen", action="store_true", help="no alimentar el almacén histórico")
+    args = ap.parse_args()
+    backfill(
+        results_dir=args.origen,
+        destino_dir=args.destino,
+        almacen_dir=None if args.sin_almacen else WAREHOUSE_DIR,
+        workers=args.workers,
+        forzar=args.forzar,
+    )
@@ -0,0 +1,155 @@
+# src/compara_prg/services/costos.py
+"""
+Costos de generación (GENC) por central y por sistema.
+
+results[sol]["GENC"] es un dict:
+
+    tabla:   Propiedad + columnas de horas (Σ centrales, kUSD) — la tabla de siempre
+    detalle: Nombre_PLEXOS, Propiedad, Hora, Costo (largo, sin ceros)
+
+Ambas salen de la misma extracción de Generators que usan GENTABLES y GENT
+(`query_generadores`). El detalle largo sin ceros ocupa una fracción de una
+tabla ancha por central (las renovables no tienen costo) y es lo que permite
+ver qué centrales explican la diferencia de costo entre soluciones.
+
+Los archivos antiguos traen GENC como DataFrame suelto (sólo la tabla):
+`payload_costos` los lleva al formato dict con detalle=None.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import polars as pl
+
+CLAVE_COSTOS = "GENC"
+
+# Nombre PLEXOS (property_name) → etiqueta de la app
+PROPIEDADES_COSTO = {
+    "Generation Cost": "Costos Operación",
+    "Start & Shutdown Cost": "Costos Encendido/Detención",
+    "Total Generation Cost": "Costos Totales [kUSD]",
+}
+PROPIEDAD_TOTAL = "Costos Totales [kUSD]"
+ENUM_PROPIEDAD = pl.Enum(list(PROPIEDADES_COSTO.values()))
+
+
+def tablas_costos(generadores: pl.DataFrame) -> Dict[str, pl.DataFrame]:
+    """
+    Tabla de sistema y detalle por central desde la consulta de Generators.
+
+    Args:
+        generadores (DataFrame): salida de `query_generadores`
+            (Categoría, Propiedad, Nombre_PLEXOS, Valor, Hora)
+
+    Returns:
+        {"tabla": Propiedad × horas (kUSD), "detalle": largo por central}
+    """
+    costos = (
+        generadores.lazy()
+        .filter(pl.col("Propiedad").is_in(list(PROPIEDADES_COSTO)))
+        .select(
+            pl.col("Nombre_PLEXOS").cast(pl.Utf8),
+            pl.col("Propiedad").replace_strict(PROPIEDADES_COSTO, return_dtype=ENUM_PROPIEDAD),
+            pl.col("Hora").cast(pl.Int32),
+            (pl.col("Valor") / 1000).alias("Costo"),
+        )
+    )
+    sistema = costos.group_by("Propiedad", "Hora").agg(pl.col("Costo").sum()).sort("Propiedad", "Hora")
+    detalle = (
+        costos.filter(pl.col("Costo") != 0)
+        .sort("Nombre_PLEXOS", "Propiedad", "Hora")
+    )
+    # Ambas ramas comparten el scan y el filtro
+    sistema, detalle = pl.collect_all([sistema, detalle])
+
+    tabla = (
+        sistema.with_columns(pl.col("Propiedad").cast(pl.Utf8))
+        .pivot(values="Costo", index="Propiedad", on="Hora", aggregate_function="sum")
+    )
+    return {"tabla": tabla, "detalle": detalle}
+
+
+def payload_costos(obj: Any) -> Optional[Dict[str, Optional[pl.DataFrame]]]:
+    """GENC en formato dict {"tabla", "detalle"} (acepta el DataFrame suelto antiguo)."""
+    if isinstance(obj, pl.DataFrame):
+        return {"tabla": obj, "detalle": None}
+    if isinstance(obj, dict):
+        tabla, detalle = obj.get("tabla"), obj.get("detalle")
+        return {
+            "tabla": tabla if isinstance(tabla, pl.DataFrame) else None,
+            "detalle": detalle if isinstance(detalle, pl.DataFrame) else None,
+        }
+    return None
+
+
+def _detalle(results: Dict[str, Any], sol: str) -> Optional[pl.DataFrame]:
+    genc = payload_costos(results.get(sol, {}).get(CLAVE_COSTOS))
+    return genc["detalle"] if genc else None
+
+
+def soluciones_con_detalle(results: Dict[str, Any], solutions: Sequence[str]) -> List[str]:
+    return [s for s in solutions if _detalle(results, s) is not None]
+
+
+def comparar_costos(
+    results: Dict[str, Any],
+    soluciones: Sequence[str],
+    referencia: str,
+    propiedad: str = PROPIEDAD_TOTAL,
+    horas: Optional[Tuple[int, int]] = None,
+) -> Tuple[pl.DataFrame, pl.DataFrame]:
+    """
+    Totales de sistema y Δ por central contra `referencia` en una sola agregación.
+
+    Se agrupa una vez por (Solución, Propiedad, Nombre_PLEXOS) sobre el detalle de
+    todas las soluciones; los totales de sistema salen de sumar ese agregado
+    (unos miles de filas) y los Δ de pivotearlo por solución.
+
+    Args:
+        results (dict): resultados
+        soluciones (list): soluciones a comparar (con detalle)
+        referencia (str): solución contra la que se calculan los Δ
+        propiedad (str): etiqueta de costo para los Δ por central
+        horas (tuple): rango (h1, h2) inclusive; None = todas
+
+    Returns:
+        (totales, deltas):
+            totales: Solución, Propiedad, Costo (kUSD)
+            deltas:  Nombre_PLEXOS, una columna por solución y 'Δ <sol>' por
+                     cada solución distinta de la referencia
+    """
+    sols = [s for s in dict.fromkeys([referencia, *soluciones]) if _detalle(results, s) is not None]
+    if not sols:
+        return pl.DataFrame(), pl.DataFrame()
+    enum_sol = pl.Enum(sols)
+    largo = pl.concat([
+        _detalle(results, s).lazy().with_columns(pl.lit(s).cast(enum_sol).alias("Solución"))
+        for s in sols
+    ])
+    if horas is not None:
+        largo = largo.filter(pl.col("Hora").is_between(horas[0], horas[1]))
+
+    por_central = (
+        largo.group_by("Solución", "Propiedad", "Nombre_PLEXOS")
+        .agg(pl.col("Costo").cast(pl.Float64).sum())
+        .collect()
+    )
+    totales = (
+        por_central.group_by("Solución", "Propiedad").agg(pl.col("Costo").sum())
+        .sort("Solución", "Propiedad")
+    )
+
+    ancho = (
+        por_central.filter(pl.col("Propiedad") == propiedad)
+        .with_columns(pl.col("Solución").cast(pl.Utf8))
+        .pivot(values="Costo", index="Nombre_PLEXOS", on="Solución")
+    )
+    for s in sols:
+        if s not in ancho.columns:
+            ancho = ancho.with_columns(pl.lit(0.0).alias(s))
+    ancho = ancho.select("Nombre_PLEXOS", *sols).fill_null(0.0)
+    if referencia in sols:
+        ancho = ancho.with_columns(
+            (pl.col(s) - pl.col(referencia)).alias(f"Δ {s}") for s in sols if s != referencia
+        )
+    return totales, ancho.sort("Nombre_PLEXOS")
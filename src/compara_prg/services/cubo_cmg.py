@@ -0,0 +1,156 @@
+# src/compara_prg/services/cubo_cmg.py
+"""
+Cubo de costos marginales (solución × nodo × hora) en Float32.
+
+Las tablas CMG de todas las soluciones se alinean una vez por archivo de
+resultados sobre el mismo universo de nodos y horas. Con el índice
+nodo → fila, la serie de un nodo (o de varios) es un slice del arreglo, sin
+normalizar ni filtrar tablas anchas en cada rerun.
+
+Métricas derivadas (vectorizadas sobre todo el cubo):
+  - spread contra el nodo de referencia (Quillota220),
+  - promedio diario,
+  - promedio en horas de punta y fuera de punta.
+
+10 soluciones × 1.500 nodos × 168 horas ≈ 10 MB en Float32.
+"""
+from __future__ import annotations
+
+import warnings
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import polars as pl
+
+from compara_prg.config import HORAS_PUNTA_CMG, NODO_REFERENCIA_CMG
+from compara_prg.services.cubo_soluciones import construir_cubo
+
+HORAS_DIA = 24
+
+
+@dataclass
+class CuboCMG:
+    soluciones: List[str]
+    nodos: List[str]
+    horas: List[str]
+    valores: np.ndarray        # (S, N, H) float32 — nodos ausentes como NaN
+    idx_nodo: Dict[str, int] = field(repr=False)
+    _cache: Dict[tuple, np.ndarray] = field(default_factory=dict, repr=False)
+
+    # ── acceso ───────────────────────────────────────────────────────────────
+    def idx_sol(self, sol: str) -> int:
+        return self.soluciones.index(sol)
+
+    def filas(self, nodos: Sequence[str]) -> np.ndarray:
+        """Filas de los nodos pedidos que existen en el cubo (mismo orden)."""
+        return np.array([self.idx_nodo[n] for n in nodos if n in self.idx_nodo], dtype=np.int64)
+
+    def serie(self, sol: str, nodo: str) -> Optional[np.ndarray]:
+        """CMG horario (H,) de un nodo; None si el nodo no está en la solución."""
+        i = self.idx_nodo.get(nodo)
+        if i is None:
+            return None
+        y = self.valores[self.idx_sol(sol), i]
+        return None if np.isnan(y).all() else y
+
+    def series(self, nodos: Sequence[str]) -> np.ndarray:
+        """(S, len(nodos), H) para superponer varios nodos de todas las soluciones."""
+        return self.valores[:, self.filas(nodos), :]
+
+    def diferencia(self, sol_a: str, sol_b: str) -> np.ndarray:
+        """
+        CMG(sol_b) − CMG(sol_a) por nodo y hora, forma (N, H). Se calcula una vez
+        por par; el par inverso se obtiene cambiando el signo.
+        """
+        key = ("dif", sol_a, sol_b)
+        if key not in self._cache:
+            inv = self._cache.get(("dif", sol_b, sol_a))
+            self._cache[key] = -inv if inv is not None else (
+                self.valores[self.idx_sol(sol_b)] - self.valores[self.idx_sol(sol_a)]
+            )
+        return self._cache[key]
+
+    # ── métricas ─────────────────────────────────────────────────────────────
+    def spread(self, referencia: str = NODO_REFERENCIA_CMG) -> Optional[np.ndarray]:
+        """CMG(nodo) − CMG(referencia), forma (S, N, H). None si falta la referencia."""
+        r = self.idx_nodo.get(referencia)
+        if r is None:
+            return None
+        key = ("spread", referencia)
+        if key not in self._cache:
+            self._cache[key] = self.valores - self.valores[:, r:r + 1, :]
+        return self._cache[key]
+
+    def dias(self) -> List[int]:
+        return sorted({(int(h) - 1) // HORAS_DIA + 1 for h in self.horas})
+
+    def promedio_diario(self) -> np.ndarray:
+        """Promedio por día, forma (S, N, D) con D = len(self.dias())."""
+        key = ("diario",)
+        if key not in self._cache:
+            dia = np.array([(int(h) - 1) // HORAS_DIA + 1 for h in self.horas])
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                self._cache[key] = np.stack(
+                    [np.nanmean(self.valores[:, :, dia == d], axis=2) for d in self.dias()], axis=2
+                ).astype(np.float32)
+        return self._cache[key]
+
+    def punta_fuera_punta(self, horas_punta: Tuple[int, ...] = HORAS_PUNTA_CMG) -> Tuple[np.ndarray, np.ndarray]:
+        """Promedio en punta y fuera de punta, cada uno de forma (S, N)."""
+        key = ("punta", tuple(horas_punta))
+        if key not in self._cache:
+            hora_dia = np.array([(int(h) - 1) % HORAS_DIA + 1 for h in self.horas])
+            es_punta = np.isin(hora_dia, horas_punta)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)     # nodo sin datos → NaN
+                punta = np.nanmean(self.valores[:, :, es_punta], axis=2)
+                fuera = np.nanmean(self.valores[:, :, ~es_punta], axis=2)
+            self._cache[key] = np.stack([punta, fuera]).astype(np.float32)
+        punta, fuera = self._cache[key]
+        return punta, fuera
+
+    def resumen(self, nodos: Sequence[str], referencia: str = NODO_REFERENCIA_CMG) -> pl.DataFrame:
+        """Una fila por (solución, nodo): promedio, punta, fuera de punta y spread medio."""
+        filas = self.filas(nodos)
+        punta, fuera = self.punta_fuera_punta()
+        sp = self.spread(referencia)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            prom = np.nanmean(self.valores[:, filas, :], axis=2)
+            sp_prom = np.nanmean(sp[:, filas, :], axis=2) if sp is not None else np.full_like(prom, np.nan)
+        S, F = len(self.soluciones), len(filas)
+        return pl.DataFrame({
+            "Solución": np.repeat(self.soluciones, F),
+            "Nodo": np.tile([self.nodos[i] for i in filas], S),
+            "Promedio": prom.ravel(),
+            "Punta": punta[:, filas].ravel(),
+            "Fuera de punta": fuera[:, filas].ravel(),
+            f"Spread vs {referencia}": sp_prom.ravel(),
+        })
+
+
+def construir_cubo_cmg(tablas: Dict[str, pl.DataFrame], hours_full: Sequence[str]) -> Optional[CuboCMG]:
+    """
+    Alinea las tablas CMG (ya normalizadas, `Nombre_PLEXOS` + horas) en un CuboCMG.
+
+    Args:
+        tablas (dict): {solución: DataFrame ancho de CMG}
+        hours_full (list): horas (str) que forman el eje del cubo
+
+    Returns:
+        CuboCMG o None si ninguna tabla es utilizable
+    """
+    base = construir_cubo(tablas, hours_full, dtype=np.float32)
+    if base is None:
+        return None
+    # Nodo ausente en una solución ≠ precio 0
+    valores = np.where(base.presente[:, :, None], base.valores, np.float32(np.nan))
+    return CuboCMG(
+        soluciones=base.soluciones,
+        nodos=base.entidades,
+        horas=base.horas,
+        valores=valores,
+        idx_nodo={n: i for i, n in enumerate(base.entidades)},
+    )
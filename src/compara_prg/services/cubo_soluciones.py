@@ -0,0 +1,241 @@
+# src/compara_prg/services/cubo_soluciones.py
+"""
+Cubo de soluciones alineadas (solución × entidad × hora).
+
+Alinea las tablas anchas de varias soluciones (una fila por central/nodo/línea y
+una columna por hora) sobre un mismo universo de entidades y horas, y guarda
+sumas acumuladas por hora. Con eso:
+  - el total de cualquier ventana horaria sale en O(entidades) por solución,
+  - las diferencias hora-a-hora de un par se calculan una sola vez y se reutilizan,
+  - la comparación de TODAS las soluciones contra una referencia (deltas,
+    ranking y dispersión) sale en una sola pasada vectorizada (`comparar`).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import polars as pl
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Estructura
+# ─────────────────────────────────────────────────────────────────────────────
+@dataclass
+class CuboSoluciones:
+    soluciones: List[str]
+    entidades: List[str]
+    horas: List[str]
+    valores: np.ndarray        # (S, E, H) — nulos y entidades ausentes como 0
+    presente: np.ndarray       # (S, E) bool — la entidad existe en la tabla de la solución
+    acumulado: np.ndarray      # (S, E, H+1) — sumas prefijas sobre horas
+    _deltas: Dict[Tuple[str, str], np.ndarray] = field(default_factory=dict, repr=False)
+    _comparaciones: Dict[tuple, "ComparacionN"] = field(default_factory=dict, repr=False)
+
+    def idx_sol(self, sol: str) -> int:
+        return self.soluciones.index(sol)
+
+    def posiciones(self, horas: Sequence[str]) -> np.ndarray:
+        """Índices (en self.horas) de las horas pedidas que existen en el cubo."""
+        mapa = {h: i for i, h in enumerate(self.horas)}
+        return np.array([mapa[str(h)] for h in horas if str(h) in mapa], dtype=np.int64)
+
+    def suma_ventana(self, sol: str, pos: np.ndarray) -> np.ndarray:
+        """
+        Total por entidad en la ventana `pos`. Si la ventana es contigua se
+        resuelve con las sumas prefijas (sin recorrer las horas).
+        """
+        i = self.idx_sol(sol)
+        if len(pos) == 0:
+            return np.zeros(len(self.entidades))
+        if pos[-1] - pos[0] + 1 == len(pos):
+            return self.acumulado[i, :, pos[-1] + 1] - self.acumulado[i, :, pos[0]]
+        return self.valores[i][:, pos].sum(axis=1)
+
+    def delta(self, sol_a: str, sol_b: str) -> np.ndarray:
+        """
+        Diferencia hora-a-hora (sol_b − sol_a), forma (E, H). Se calcula una vez
+        por par; el par inverso se obtiene cambiando el signo.
+        """
+        key = (sol_a, sol_b)
+        if key not in self._deltas:
+            inv = self._deltas.get((sol_b, sol_a))
+            if inv is not None:
+                self._deltas[key] = -inv
+            else:
+                d = self.valores[self.idx_sol(sol_b)] - self.valores[self.idx_sol(sol_a)]
+                d[np.abs(d) < 1e-9] = 0.0
+                self._deltas[key] = d
+        return self._deltas[key]
+
+
+    def comparar(self, referencia: str, pos: np.ndarray, umbral: float = 0.0) -> "ComparacionN":
+        """
+        Todas las soluciones contra `referencia` en la ventana `pos`: deltas de
+        total y hora-a-hora, dispersión entre soluciones y ranking de entidades
+        por máxima desviación. Se calcula una vez por (referencia, ventana, umbral).
+        """
+        key = (referencia, np.asarray(pos, dtype=np.int64).tobytes(), float(umbral))
+        hit = self._comparaciones.get(key)
+        if hit is not None:
+            return hit
+
+        r = self.idx_sol(referencia)
+        otras = [i for i in range(len(self.soluciones)) if i != r]
+        pos = np.asarray(pos, dtype=np.int64)
+
+        # Totales de la ventana para todas las soluciones (S, E)
+        if len(pos) and pos[-1] - pos[0] + 1 == len(pos):
+            totales = self.acumulado[:, :, pos[-1] + 1] - self.acumulado[:, :, pos[0]]
+        else:
+            totales = self.valores[:, :, pos].sum(axis=2)
+        totales = totales.astype(np.float64)
+
+        # Sólo cuentan las entidades presentes en la referencia y en la solución comparada
+        valido = self.presente[otras] & self.presente[r][None, :]              # (S', E)
+        delta_total = np.where(valido, totales[otras] - totales[r][None, :], 0.0)
+        delta_hora = self.valores[otras][:, :, pos] - self.valores[r][None, :, pos]
+        max_abs_hora = np.where(valido, np.abs(delta_hora).max(axis=2, initial=0.0), 0.0)
+
+        # Dispersión entre soluciones (incluida la referencia), ignorando ausentes
+        tot_nan = np.where(self.presente, totales, np.nan)
+        with np.errstate(invalid="ignore"):
+            media = np.nanmean(tot_nan, axis=0)
+            desvio = np.nanstd(tot_nan, axis=0)
+            rango = np.nanmax(tot_nan, axis=0) - np.nanmin(tot_nan, axis=0)
+
+        abs_dt = np.abs(delta_total)
+        peor = abs_dt.argmax(axis=0) if otras else np.zeros(len(self.entidades), dtype=np.int64)
+        max_abs = abs_dt.max(axis=0, initial=0.0)
+        orden = np.argsort(-max_abs, kind="stable")
+
+        comp = ComparacionN(
+            referencia=referencia,
+            soluciones=[self.soluciones[i] for i in otras],
+            entidades=self.entidades,
+            total_ref=totales[r],
+            delta_total=delta_total,
+            max_abs_hora=max_abs_hora,
+            media=np.nan_to_num(media),
+            desvio=np.nan_to_num(desvio),
+            rango=np.nan_to_num(rango),
+            n_desvian=(abs_dt > umbral).sum(axis=0),
+            peor=peor,
+            max_abs=max_abs,
+            orden=orden,
+        )
+        self._comparaciones[key] = comp
+        return comp
+
+
+@dataclass
+class ComparacionN:
+    """Resultado de `CuboSoluciones.comparar` (S' = soluciones sin la referencia)."""
+    referencia: str
+    soluciones: List[str]
+    entidades: List[str]
+    total_ref: np.ndarray      # (E,)
+    delta_total: np.ndarray    # (S', E) total(sol) − total(ref) en la ventana
+    max_abs_hora: np.ndarray   # (S', E) máximo |Δ| hora-a-hora
+    media: np.ndarray          # (E,) media de los totales entre soluciones
+    desvio: np.ndarray         # (E,) desviación estándar de los totales
+    rango: np.ndarray          # (E,) máx − mín de los totales
+    n_desvian: np.ndarray      # (E,) soluciones con |Δ total| > umbral
+    peor: np.ndarray           # (E,) índice (en `soluciones`) de la mayor |Δ total|
+    max_abs: np.ndarray        # (E,) mayor |Δ total| entre soluciones
+    orden: np.ndarray          # (E,) entidades de mayor a menor `max_abs`
+
+    def tabla(self, top: Optional[int] = None, solo_desvios: bool = True) -> pl.DataFrame:
+        """
+        Una fila por entidad (ordenada por máxima desviación): total de la
+        referencia, Δ por solución y estadísticas de dispersión.
+        """
+        idx = self.orden
+        if solo_desvios:
+            idx = idx[self.n_desvian[idx] > 0]
+        if top is not None:
+            idx = idx[:top]
+        cols = {
+            "Nombre_PLEXOS": [self.entidades[i] for i in idx],
+            f"Total {self.referencia}": self.total_ref[idx],
+        }
+        for j, sol in enumerate(self.soluciones):
+            cols[f"Δ {sol}"] = self.delta_total[j, idx]
+        cols["Máx |Δ|"] = self.max_abs[idx]
+        cols["Solución más desviada"] = [self.soluciones[self.peor[i]] if self.soluciones else None for i in idx]
+        cols["N° soluciones desviadas"] = self.n_desvian[idx]
+        cols["Desv. estándar"] = self.desvio[idx]
+        cols["Rango"] = self.rango[idx]
+        return pl.DataFrame(cols)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Construcción
+# ─────────────────────────────────────────────────────────────────────────────
+def construir_cubo(
+    tablas: Dict[str, pl.DataFrame],
+    hours_full: Sequence[str],
+    name_col: str = "Nombre_PLEXOS",
+    dtype=np.float64,
+) -> Optional[CuboSoluciones]:
+    """
+    Alinea tablas anchas (ya normalizadas) en un cubo común.
+
+    Args:
+        tablas (dict): {solución: DataFrame ancho con `name_col` + columnas de horas}
+        hours_full (list): horas (str) que forman el eje del cubo
+        name_col (str): columna con el nombre de la entidad
+        dtype: tipo numpy del cubo
+
+    Returns:
+        CuboSoluciones o None si ninguna tabla es utilizable
+    """
+    horas = [str(h) for h in hours_full]
+    limpias: Dict[str, pl.DataFrame] = {}
+    for sol, df in tablas.items():
+        if df is None or df.is_empty() or name_col not in df.columns:
+            continue
+        cols = [h for h in horas if h in df.columns]
+        limpias[sol] = (
+            df.select(
+                pl.col(name_col).cast(pl.Utf8),
+                *[pl.col(h).cast(pl.Float64, strict=False).fill_null(0) for h in cols],
+            )
+            .unique(subset=name_col, keep="first", maintain_order=True)
+        )
+    if not limpias:
+        return None
+
+    # Universo de entidades en orden de aparición
+    entidades: List[str] = []
+    idx_ent: Dict[str, int] = {}
+    for df in limpias.values():
+        for n in df.get_column(name_col).to_list():
+            if n not in idx_ent:
+                idx_ent[n] = len(entidades)
+                entidades.append(n)
+
+    soluciones = list(limpias.keys())
+    idx_hora = {h: i for i, h in enumerate(horas)}
+    valores = np.zeros((len(soluciones), len(entidades), len(horas)), dtype=dtype)
+    presente = np.zeros((len(soluciones), len(entidades)), dtype=bool)
+
+    for s, (sol, df) in enumerate(limpias.items()):
+        filas = np.fromiter((idx_ent[n] for n in df.get_column(name_col).to_list()), dtype=np.int64)
+        cols = [h for h in df.columns if h != name_col]
+        if cols:
+            valores[s][np.ix_(filas, [idx_hora[h] for h in cols])] = df.select(cols).to_numpy()
+        presente[s, filas] = True
+
+    acumulado = np.zeros((len(soluciones), len(entidades), len(horas) + 1), dtype=dtype)
+    np.cumsum(valores, axis=2, out=acumulado[:, :, 1:])
+
+    return CuboSoluciones(
+        soluciones=soluciones,
+        entidades=entidades,
+        horas=horas,
+        valores=valores,
+        presente=presente,
+        acumulado=acumulado,
+    )
@@ -0,0 +1,175 @@
+# src/compara_prg/services/descubrimiento.py
+"""
+Descubrimiento de los .zip de solución para todas las entradas de una corrida.
+
+En la carpeta de red cada `glob("*.zip")` + `stat()` es un viaje SMB. Aquí:
+  - cada carpeta se lista una sola vez con `os.scandir` (trae tamaño y mtime
+    en la misma pasada) y el listado se reutiliza durante DESCUBRIMIENTO_TTL_S,
+  - las entradas (y las subcarpetas de una base al auto-detectar) se recorren
+    en paralelo con un pool de hilos,
+  - una sola pasada entrega por entrada: zip, tamaño, mtime, fecha y periodo.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from compara_prg.config import DESCUBRIMIENTO_TTL_S, MAX_HILOS_DESCUBRIMIENTO
+
+
+@dataclass(frozen=True)
+class Item:
+    nombre: str
+    ruta: Path
+    es_dir: bool
+    size: int
+    mtime: float
+
+
+@dataclass
+class Descubierta:
+    base: str
+    carpeta: Optional[str]              # subcarpeta usada ("" = la base misma)
+    zip: Optional[Path] = None
+    size: Optional[int] = None
+    mtime: Optional[float] = None
+    fecha: Optional[str] = None         # AAAAMMDD detectada en la ruta base
+    periodo: Optional[int] = None
+    auto: bool = False                  # la carpeta se detectó automáticamente
+    error: Optional[str] = None
+    avisos: List[str] = field(default_factory=list)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Listados con TTL
+# ─────────────────────────────────────────────────────────────────────────────
+_listados: Dict[str, Tuple[float, Optional[List[Item]]]] = {}
+_lock = threading.Lock()
+
+
+def listar(carpeta: Path | str, ttl: float = DESCUBRIMIENTO_TTL_S) -> Optional[List[Item]]:
+    """
+    Contenido de `carpeta` (una llamada a scandir). None si no existe o no es
+    carpeta. El resultado se cachea `ttl` segundos, salvo que la carpeta no
+    exista o no tenga zips ni subcarpetas: así un zip recién copiado o una ruta
+    corregida se ven en el siguiente intento.
+    """
+    clave = str(Path(carpeta).expanduser())
+    ahora = time.monotonic()
+    with _lock:
+        hit = _listados.get(clave)
+        if hit is not None and ahora - hit[0] < ttl:
+            return hit[1]
+
+    items: Optional[List[Item]] = []
+    try:
+        with os.scandir(clave) as it:
+            for e in it:
+                try:
+                    es_dir = e.is_dir()
+                    st_e = e.stat() if not es_dir else None
+                except OSError:
+                    continue
+                items.append(Item(e.name, Path(e.path), es_dir,
+                                  st_e.st_size if st_e else 0, st_e.st_mtime if st_e else 0.0))
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        items = None
+
+    util = items is not None and any(i.es_dir or i.nombre.lower().endswith(".zip") for i in items)
+    with _lock:
+        if util:
+            _listados[clave] = (ahora, items)
+        else:
+            _listados.pop(clave, None)
+    return items
+
+
+def limpiar_listados() -> None:
+    with _lock:
+        _listados.clear()
+
+
+def zips_en(carpeta: Path | str) -> Optional[List[Item]]:
+    """Zips de la carpeta ordenados por nombre; None si la carpeta no existe."""
+    items = listar(carpeta)
+    if items is None:
+        return None
+    return sorted((i for i in items if not i.es_dir and i.nombre.lower().endswith(".zip")),
+                  key=lambda i: i.nombre)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Detección
+# ─────────────────────────────────────────────────────────────────────────────
+def detectar_subcarpeta(base: Path | str, pool: Optional[ThreadPoolExecutor] = None) -> Optional[str]:
+    """
+    Subcarpeta de `base` con el .zip más reciente ("" si los zips están en la
+    base; None si no hay ninguno). Las subcarpetas se listan en paralelo.
+    """
+    items = listar(base)
+    if items is None:
+        return None
+    subdirs = [i for i in items if i.es_dir]
+
+    propio = pool is None
+    pool = pool or ThreadPoolExecutor(max_workers=MAX_HILOS_DESCUBRIMIENTO)
+    try:
+        listados = list(pool.map(lambda d: (d.nombre, zips_en(d.ruta)), subdirs))
+    finally:
+        if propio:
+            pool.shutdown(wait=False)
+
+    candidatos = [(max(z.mtime for z in zs), nombre) for nombre, zs in listados if zs]
+    if candidatos:
+        return max(candidatos)[1]
+    if zips_en(base):
+        return ""
+    return None
+
+
+def descubrir(base: str, carpeta: Optional[str], pool: Optional[ThreadPoolExecutor] = None) -> Descubierta:
+    """
+    Resuelve el zip de una entrada: primero `base/carpeta`; si no existe o no
+    tiene zips, la subcarpeta más reciente de `base`.
+    """
+    from compara_prg.utils.funciones import extraer_fecha_y_hora_desde_ruta
+
+    base_p = Path(base).expanduser().resolve()
+    d = Descubierta(base=base, carpeta=carpeta)
+    try:
+        d.fecha, d.periodo = extraer_fecha_y_hora_desde_ruta(str(base))
+    except ValueError:
+        pass
+
+    zs = zips_en(base_p / (carpeta or ""))
+    if not zs:
+        motivo = "no encontrada" if zs is None else "sin .zip"
+        sub = detectar_subcarpeta(base_p, pool)
+        if sub is None:
+            d.error = f"No se encontró ningún .zip dentro de {base_p}"
+            return d
+        d.avisos.append(
+            f"carpeta '{carpeta}' {motivo}. Usando detección automática: '{sub or '.'}'."
+        )
+        d.carpeta, d.auto = sub, True
+        zs = zips_en(base_p / sub)
+
+    z = zs[0]
+    d.zip, d.size, d.mtime = z.ruta, z.size, z.mtime
+    return d
+
+
+def descubrir_todas(entradas: Sequence[Tuple[str, Optional[str]]]) -> List[Descubierta]:
+    """
+    `descubrir` para todas las entradas (base, carpeta) en paralelo; mismo orden
+    que la entrada. Bases repetidas comparten el listado cacheado.
+    """
+    with ThreadPoolExecutor(max_workers=MAX_HILOS_DESCUBRIMIENTO) as pool:
+        # Un pool aparte para las subcarpetas: evita que descubrir() espere a su propio pool
+        with ThreadPoolExecutor(max_workers=MAX_HILOS_DESCUBRIMIENTO) as pool_sub:
+            return list(pool.map(lambda e: descubrir(e[0], e[1], pool_sub), entradas))
@@ -0,0 +1,214 @@
+# src/compara_prg/services/drilldown.py
+"""
+Consultas puntuales (drill-down) contra los .zip de solución originales.
+
+En vez de pre-extraer toda una collection "por si acaso", una vista pide sólo
+las entidades que va a mostrar: (solución, collection, property, nombres,
+ventana). Las series se guardan en un LRU por zip, a nivel de entidad, así que
+agregar un nodo al gráfico sólo consulta ese nodo.
+
+Para saber de qué zip salió cada solución, `obtener_resultados` deja junto al
+results_*.pkl un archivo `<stem>.fuentes.json` con la ruta del zip, la fase y
+la ventana horaria de cada etiqueta.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import polars as pl
+
+from compara_prg.config import RESULTS_DIR, MAX_ENTIDADES_DRILLDOWN, MAX_ZIPS_DRILLDOWN
+
+SUFIJO_FUENTES = ".fuentes.json"
+
+# Serie larga por entidad: Nombre_PLEXOS, Hora, Valor
+_ESQUEMA = {"Nombre_PLEXOS": pl.Utf8, "Hora": pl.Int64, "Valor": pl.Float64}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Archivo de fuentes (zip por solución)
+# ─────────────────────────────────────────────────────────────────────────────
+def ruta_fuentes(results_path: Path | str) -> Path:
+    """Sidecar de un archivo de resultados (.pkl o carpeta columnar)."""
+    p = Path(results_path)
+    return p.with_name(p.stem + SUFIJO_FUENTES) if p.suffix else p.parent / (p.name + SUFIJO_FUENTES)
+
+
+def guardar_fuentes(results_path: Path | str, fuentes: Dict[str, Dict[str, Any]]) -> Path:
+    """
+    Escribe (atómico) el sidecar con
+    {etiqueta: {zip, tipo, st_schedule, hini, hfin, categorias_version}}.
+    """
+    destino = ruta_fuentes(results_path)
+    # Temporal por proceso e hilo: las sesiones de Streamlit son hilos del mismo proceso
+    tmp = destino.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(fuentes, indent=2, ensure_ascii=False, default=str), encoding="utf-8")
+    os.replace(tmp, destino)
+    return destino
+
+
+def leer_fuentes(results_path: Path | str) -> Dict[str, Dict[str, Any]]:
+    """
+    Fuentes de un archivo de resultados; busca junto al archivo y en RESULTS_DIR
+    (las carpetas columnares viven en RESULTS_DIR/columnar/<stem>).
+    """
+    p = Path(results_path)
+    for cand in (ruta_fuentes(p), RESULTS_DIR / (p.stem + SUFIJO_FUENTES)):
+        try:
+            return json.loads(cand.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+    return {}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# LRU por zip
+# ─────────────────────────────────────────────────────────────────────────────
+Clave = Tuple[str, str, bool, int, int, str]   # collection, property, st, hini, hfin, entidad
+
+
+class CacheZip:
+    """
+    Un LRU de series por zip (tope de entidades) y un LRU de zips (tope de zips).
+    El zip se identifica por ruta + tamaño + mtime: si se regenera, se invalida.
+    """
+
+    def __init__(self, max_entidades: int, max_zips: int):
+        self.max_entidades = max_entidades
+        self.max_zips = max_zips
+        self._zips: "OrderedDict[Tuple[str, int, int], OrderedDict[Clave, pl.DataFrame]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def id_zip(zip_path: Path | str) -> Tuple[str, int, int]:
+        st_zip = os.stat(zip_path)
+        return str(Path(zip_path).resolve()), st_zip.st_size, st_zip.st_mtime_ns
+
+    def _lru(self, zid) -> "OrderedDict[Clave, pl.DataFrame]":
+        lru = self._zips.get(zid)
+        if lru is None:
+            lru = self._zips[zid] = OrderedDict()
+            while len(self._zips) > self.max_zips:
+                self._zips.popitem(last=False)
+        self._zips.move_to_end(zid)
+        return lru
+
+    def get_muchos(self, zid, claves: Iterable[Clave]) -> Dict[Clave, pl.DataFrame]:
+        with self._lock:
+            lru = self._lru(zid)
+            out = {}
+            for k in claves:
+                df = lru.get(k)
+                if df is not None:
+                    lru.move_to_end(k)
+                    out[k] = df
+            return out
+
+    def put_muchos(self, zid, series: Dict[Clave, pl.DataFrame]) -> None:
+        with self._lock:
+            lru = self._lru(zid)
+            for k, df in series.items():
+                lru[k] = df
+                lru.move_to_end(k)
+            while len(lru) > self.max_entidades:
+                lru.popitem(last=False)
+
+
+_CACHE = CacheZip(MAX_ENTIDADES_DRILLDOWN, MAX_ZIPS_DRILLDOWN)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Consulta
+# ─────────────────────────────────────────────────────────────────────────────
+def consultar_entidades(
+    zip_path: Path | str,
+    collection: str,
+    property: str,
+    nombres: Iterable[str],
+    hini: int,
+    hfin: int,
+    st_schedule: bool = True,
+    cache: CacheZip = _CACHE,
+) -> pl.DataFrame:
+    """
+    Series de `nombres` para collection.property en [hini, hfin], desde el zip.
+    Sólo se consulta a PLEXOS lo que no esté en el LRU del zip.
+
+    Returns:
+        DataFrame largo (Nombre_PLEXOS, Hora, Valor); entidades sin datos no aparecen
+    """
+    nombres = [n for n in dict.fromkeys(nombres) if n]
+    if not nombres:
+        return pl.DataFrame(schema=_ESQUEMA)
+
+    zid = cache.id_zip(zip_path)
+    claves = {n: (collection, property, bool(st_schedule), int(hini), int(hfin), n) for n in nombres}
+    en_cache = cache.get_muchos(zid, claves.values())
+    faltan = [n for n, k in claves.items() if k not in en_cache]
+
+    if faltan:
+        from compara_prg.io.query_general import query_solution  # requiere API PLEXOS (clr)
+
+        df = query_solution(
+            name=f"drill_{collection}_{property}.csv",
+            label="",
+            sol_file=str(zip_path),
+            collection=collection,
+            property=property,
+            columns=['child_name', 'value', 'period_id'],
+            rename=['Nombre_PLEXOS', 'Valor', 'Hora'],
+            st_schedule=st_schedule,
+            hini=hini,
+            hfin=hfin,
+            nombres=faltan,
+        ).select(pl.col(c).cast(t) for c, t in _ESQUEMA.items())
+
+        nuevos = {k: pl.DataFrame(schema=_ESQUEMA) for n, k in claves.items() if n in faltan}
+        for (n,), parte in df.partition_by("Nombre_PLEXOS", as_dict=True, maintain_order=True).items():
+            nuevos[claves[n]] = parte.sort("Hora")
+        cache.put_muchos(zid, nuevos)
+        en_cache.update(nuevos)
+
+    partes = [en_cache[claves[n]] for n in nombres if not en_cache[claves[n]].is_empty()]
+    return pl.concat(partes) if partes else pl.DataFrame(schema=_ESQUEMA)
+
+
+def consultar_solucion(
+    results_path: Path | str,
+    solucion: str,
+    collection: str,
+    property: str,
+    nombres: Iterable[str],
+    hini: Optional[int] = None,
+    hfin: Optional[int] = None,
+) -> pl.DataFrame:
+    """
+    Igual que `consultar_entidades`, resolviendo el zip, la fase y la ventana
+    (por defecto la de la corrida) desde el sidecar de fuentes.
+
+    Raises:
+        KeyError: si el archivo de resultados no registra la solución
+        FileNotFoundError: si el zip ya no está disponible
+    """
+    fuente = leer_fuentes(results_path).get(solucion)
+    if not fuente:
+        raise KeyError(f"Sin fuente registrada para '{solucion}' en {Path(results_path).name}")
+    zip_path = Path(fuente["zip"])
+    if not zip_path.exists():
+        raise FileNotFoundError(zip_path)
+    return consultar_entidades(
+        zip_path, collection, property, nombres,
+        hini=int(fuente["hini"]) if hini is None else hini,
+        hfin=int(fuente["hfin"]) if hfin is None else hfin,
+        st_schedule=bool(fuente.get("st_schedule", True)),
+    )
+
+
+def soluciones_consultables(results_path: Path | str) -> List[str]:
+    """Etiquetas cuyo zip sigue accesible."""
+    return [s for s, f in leer_fuentes(results_path).items() if Path(f.get("zip", "")).exists()]
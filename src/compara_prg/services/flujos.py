@@ -0,0 +1,162 @@
+# src/compara_prg/services/flujos.py
+"""
+Flujos por línea (Lines.Flow) y congestión.
+
+El flujo ya se extrae en la consulta BESS (clasificación de la carga de las
+baterías); aquí se reutiliza ese mismo frame, sin consultas adicionales, y se
+guarda compacto junto a las pérdidas:
+
+    results[sol]["FLUJOS"]          ancho: Nombre_PLEXOS + horas (Float32, MW)
+    results[sol]["LIMITES_LINEAS"]  largo: Nombre_PLEXOS, Hora, Export, Import (MW)
+
+Sobre eso: carga (|flujo| / límite en el sentido del flujo), horas de
+congestión por línea y ranking de las líneas cuyo flujo más se desvía entre
+soluciones (vía el cubo de soluciones).
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import polars as pl
+
+from compara_prg.config import FLUJOS_DIC_PATH, TOL_CONGESTION
+from compara_prg.services.cubo_soluciones import CuboSoluciones, construir_cubo
+from compara_prg.services.ranking import top_filas
+
+CLAVE_FLUJOS = "FLUJOS"
+CLAVE_LIMITES = "LIMITES_LINEAS"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Tablas a guardar
+# ─────────────────────────────────────────────────────────────────────────────
+def tabla_flujos(flujo: Optional[pl.DataFrame]) -> Optional[pl.DataFrame]:
+    """
+    Flujo largo de la consulta (Nombre_PLEXOS, [Propiedad], Valor, Hora) → tabla
+    ancha Nombre_PLEXOS + horas en Float32.
+    """
+    if flujo is None or flujo.is_empty():
+        return None
+    if "Propiedad" in flujo.columns:
+        flujo = flujo.filter(pl.col("Propiedad") == "Flow")
+    ancho = (
+        flujo.select("Nombre_PLEXOS", pl.col("Hora").cast(pl.Int64), pl.col("Valor").cast(pl.Float32))
+        .sort("Hora")
+        .pivot(index="Nombre_PLEXOS", on="Hora", values="Valor", aggregate_function="first")
+        .fill_null(0)
+        .sort("Nombre_PLEXOS")
+    )
+    return ancho.rename({c: str(c) for c in ancho.columns})
+
+
+def tabla_limites(limites: Optional[pl.DataFrame]) -> Optional[pl.DataFrame]:
+    """
+    Límites largos (Nombre_PLEXOS, Propiedad, Valor, Hora) → una fila por
+    (línea, hora) con columnas Export e Import (MW, positivos).
+    """
+    if limites is None or limites.is_empty():
+        return None
+    sentido = (
+        pl.when(pl.col("Propiedad").str.contains("(?i)export")).then(pl.lit("Export"))
+        .when(pl.col("Propiedad").str.contains("(?i)import")).then(pl.lit("Import"))
+    )
+    return (
+        limites.with_columns(sentido.alias("Sentido"))
+        .drop_nulls("Sentido")
+        .select("Nombre_PLEXOS", pl.col("Hora").cast(pl.Int32), "Sentido", pl.col("Valor").abs().cast(pl.Float32))
+        .pivot(index=["Nombre_PLEXOS", "Hora"], on="Sentido", values="Valor", aggregate_function="first")
+        .sort("Nombre_PLEXOS", "Hora")
+    )
+
+
+def nombres_politica(path=FLUJOS_DIC_PATH) -> Dict[str, str]:
+    """{nombre PLEXOS: nombre de política} del diccionario de flujos."""
+    try:
+        d = pd.read_excel(path, dtype=str).dropna()
+    except (OSError, ValueError):
+        return {}
+    return dict(zip(d["Nombre_Plexos"].str.strip(), d["Nombre_Pol"].str.strip()))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Carga y congestión
+# ─────────────────────────────────────────────────────────────────────────────
+def carga_lineas(flujos: pl.DataFrame, limites: Optional[pl.DataFrame]) -> Optional[pl.DataFrame]:
+    """
+    Carga por línea y hora: |flujo| / límite del sentido del flujo (Export si
+    flujo ≥ 0, Import si < 0).
+
+    Returns:
+        DataFrame largo Nombre_PLEXOS, Hora, Flujo, Limite, Carga; None sin límites
+    """
+    if limites is None or limites.is_empty() or flujos is None or flujos.is_empty():
+        return None
+    horas = [c for c in flujos.columns if c.isdigit()]
+    # En el perfil compacto FLUJOS y LIMITES_LINEAS pueden traer Enums distintos
+    largo = (
+        flujos.unpivot(index="Nombre_PLEXOS", on=horas, variable_name="Hora", value_name="Flujo")
+        .with_columns(pl.col("Nombre_PLEXOS").cast(pl.Utf8), pl.col("Hora").cast(pl.Int32))
+    )
+    limites = limites.with_columns(pl.col("Nombre_PLEXOS").cast(pl.Utf8), pl.col("Hora").cast(pl.Int32))
+    for col in ("Export", "Import"):
+        if col not in limites.columns:
+            limites = limites.with_columns(pl.lit(None, dtype=pl.Float32).alias(col))
+    limite = pl.when(pl.col("Flujo") >= 0).then(pl.col("Export")).otherwise(pl.col("Import"))
+    return (
+        largo.join(limites, on=["Nombre_PLEXOS", "Hora"], how="inner")
+        .with_columns(limite.alias("Limite"))
+        .with_columns(
+            pl.when(pl.col("Limite") > 0).then(pl.col("Flujo").abs() / pl.col("Limite")).alias("Carga")
+        )
+        .select("Nombre_PLEXOS", "Hora", "Flujo", "Limite", "Carga")
+    )
+
+
+def resumen_congestion(carga: Optional[pl.DataFrame], tol: float = TOL_CONGESTION) -> Optional[pl.DataFrame]:
+    """Una fila por línea: horas congestionadas, carga máxima y media (%), ordenadas."""
+    if carga is None or carga.is_empty():
+        return None
+    return (
+        carga.group_by("Nombre_PLEXOS")
+        .agg(
+            (pl.col("Carga") >= tol).sum().alias("Horas congestionadas"),
+            (pl.col("Carga").max() * 100).alias("Carga máx [%]"),
+            (pl.col("Carga").mean() * 100).alias("Carga media [%]"),
+            pl.col("Flujo").abs().max().alias("|Flujo| máx [MW]"),
+        )
+        .sort(["Horas congestionadas", "Carga máx [%]"], descending=True, nulls_last=True)
+    )
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Desvíos entre soluciones
+# ─────────────────────────────────────────────────────────────────────────────
+def cubo_flujos(results: Dict[str, Dict[str, Any]], hours_full: Sequence[str]) -> Optional[CuboSoluciones]:
+    """Cubo (solución × línea × hora) de FLUJOS para todas las soluciones del archivo."""
+    tablas = {
+        sol: data[CLAVE_FLUJOS] for sol, data in results.items()
+        if isinstance(data, dict) and isinstance(data.get(CLAVE_FLUJOS), pl.DataFrame)
+    }
+    return construir_cubo(tablas, hours_full, dtype=np.float32)
+
+
+def ranking_desvios(cubo: CuboSoluciones, referencia: str, pos: np.ndarray, k: int = 20) -> pl.DataFrame:
+    """
+    Las k combinaciones (solución, línea) con mayor desviación horaria máxima
+    de flujo contra `referencia` en la ventana `pos`.
+    """
+    comp = cubo.comparar(referencia, pos)
+    if not comp.soluciones:
+        return pl.DataFrame()
+    n_h = max(len(pos), 1)
+    planos = comp.max_abs_hora.ravel()
+    idx = top_filas(planos, k, "desc")
+    s_idx, e_idx = np.divmod(np.asarray(idx, dtype=np.int64), len(comp.entidades))
+    return pl.DataFrame({
+        "Nombre_PLEXOS": [comp.entidades[e] for e in e_idx],
+        "Solución": [comp.soluciones[s] for s in s_idx],
+        "Máx |Δ| horario [MW]": planos[idx],
+        "Δ medio [MW]": comp.delta_total[s_idx, e_idx] / n_h,
+    })
@@ -8,7 +8,8 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from collections import defaultdict
 from datetime import datetime
 import streamlit as st
-from compara_prg.utils.funciones import extraer_fecha_y_hora_desde_ruta, detectar_carpeta_por_zip
+from compara_prg.utils.funciones import extraer_fecha_y_hora_desde_ruta
+from compara_prg.services.descubrimiento import descubrir_todas, zips_en
 
 # Funciones de consultas 
 from compara_prg.queries.query_generation_tables import get_generation_tables
@@ -17,6 +18,15 @@ from compara_prg.queries.query_total_generation  import get_total_generation
 from compara_prg.queries.query_CMg               import get_cmg
 from compara_prg.queries.query_BESS              import get_bess
 from compara_prg.queries.query_Ini_Volumes       import get_ini_volumes
+from compara_prg.queries.query_flujos            import get_limites_lineas
+from compara_prg.services.warehouse               import escribir_resultados
+from compara_prg.io.resultados_columnar           import guardar_columnar, normalizar_resultados
+from compara_prg.services.drilldown               import guardar_fuentes
+from compara_prg.io.cache_local                   import prefetch
+from compara_prg.services.rollups                 import agregar_rollups
+from compara_prg.services.tecnologias             import cargar_mapa
+from compara_prg.services.flujos                  import CLAVE_FLUJOS, CLAVE_LIMITES, tabla_flujos, tabla_limites
+from compara_prg.config                           import COLUMNAR_DIR, USAR_CACHE_EXTRACCIONES
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -35,15 +45,15 @@ class Entrada:
 # ─────────────────────────────────────────────────────────────────────────────
 def ruta_zip_valida(base: str, sub: str, descripcion: str) -> Path:
     p = Path(base).expanduser().resolve() / (sub or "")
-    if not p.is_dir():
+    zips = zips_en(p)
+    if zips is None:
         st.error(f"❌ Carpeta no encontrada: {p}")
         raise FileNotFoundError(p)
-    zips = list(p.glob("*.zip"))
     if not zips:
         st.error(f"❌ No hay archivos .zip en {p}")
         raise FileNotFoundError(f"No zip in {p}")
-    st.info(f"✓ {descripcion}: {zips[0].name}")
-    return zips[0]
+    st.info(f"✓ {descripcion}: {zips[0].nombre}")
+    return zips[0].ruta
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -95,33 +105,25 @@ def generar_resultados_interactivos_v2(
     fecha_nombre: Optional[str] = None
     periodo_nombre: Optional[int] = None
 
-    for e, lbl in zip(entradas, labels):
-        # Intentar con la carpeta indicada; si falla, detectar automáticamente
-        try:
-            zip_path = ruta_zip_valida(e.base, e.carpeta or "", lbl)
-        except FileNotFoundError:
-            auto_sub = detectar_carpeta_por_zip(e.base)
-            if auto_sub is None:
-                st.error(f"❌ {lbl}: No se encontró ningún .zip dentro de {Path(e.base).resolve()}")
-                raise
-            ubicacion = (auto_sub or ".")  # "." representa la base
-            st.warning(
-                f"⚠ {lbl}: carpeta '{e.carpeta}' no disponible/sin .zip. "
-                f"Usando detección automática: '{ubicacion}'."
-            )
-            e.carpeta = auto_sub  # puede ser "" (usar base)
-            zip_path = ruta_zip_valida(e.base, e.carpeta, lbl)
+    # Todas las entradas se resuelven en paralelo (un listado por carpeta, cacheado)
+    descubiertas = descubrir_todas([(e.base, e.carpeta or "") for e in entradas])
+
+    for e, lbl, d in zip(entradas, labels, descubiertas):
+        if d.error:
+            st.error(f"❌ {lbl}: {d.error}")
+            raise FileNotFoundError(d.error)
+        for aviso in d.avisos:
+            st.warning(f"⚠ {lbl}: {aviso}")
+        if d.auto:
+            e.carpeta = d.carpeta  # puede ser "" (usar base)
+        st.info(f"✓ {lbl}: {d.zip.name}")
+        zip_path = d.zip
 
         zip_by_label[lbl] = zip_path
 
-        if e.tipo == "PID" and (fecha_nombre is None):
-            try:
-                f_detect, _ = extraer_fecha_y_hora_desde_ruta(e.base)
-                if f_detect:
-                    fecha_nombre = f_detect
-                    periodo_nombre = int(e.periodo)
-            except Exception:
-                pass
+        if e.tipo == "PID" and (fecha_nombre is None) and d.fecha:
+            fecha_nombre = d.fecha
+            periodo_nombre = int(e.periodo)
 
         if e.tipo == "PID":
             hini = int(e.periodo)
@@ -143,6 +145,11 @@ def generar_resultados_interactivos_v2(
             "periodo_pid": periodo_pid,
         }
 
+    # Copia local de los zips en segundo plano mientras se arma el resto de la corrida.
+    # Con el caché de extracciones la copia se hace sólo ante un fallo (query_solution)
+    if not USAR_CACHE_EXTRACCIONES:
+        prefetch(zip_by_label.values())
+
     # Referencia para get_total_generation: primer PCP; si no hay, primera entrada
     order = list(zip_by_label.keys())
     first_pcp_lbl = next((lbl for lbl in order if cfg_by_label[lbl]["tipo"] == "PCP"), None)
@@ -156,7 +163,7 @@ def generar_resultados_interactivos_v2(
     # Ejecuta consultas por solución x función
     results: Dict[str, Dict[str, Any]] = defaultdict(dict)
     #function_names = ["GENTABLES", "GENC", "GENT", "CMG",'COTAS', "BESS"]
-    function_names = ["GENTABLES"]
+    function_names = ["GENTABLES", "GENC"]
 
     # ... líneas previas iguales ...
 
@@ -222,13 +229,23 @@ def generar_resultados_interactivos_v2(
                 )
 
             elif func_name == "BESS":
-                return label, func_name, get_bess(
+                # El flujo por línea sale de la misma consulta BESS: se guarda como FLUJOS
+                perfil, flujo = get_bess(
                     sol_file=sol_file,
                     tipo_solucion=label,
                     directorio_salida=dir_out_str,
                     st_schedule=cfg["st_schedule"],
                     hini=cfg["hini"], hfin=cfg["hfin"],
+                    con_flujos=True,
                 )
+                flujos = tabla_flujos(flujo)
+                limites = None
+                if flujos is not None:
+                    limites = tabla_limites(get_limites_lineas(
+                        sol_file, label, flujos["Nombre_PLEXOS"].to_list(),
+                        st_schedule=cfg["st_schedule"], hini=cfg["hini"], hfin=cfg["hfin"],
+                    ))
+                return label, func_name, {"BESS": perfil, CLAVE_FLUJOS: flujos, CLAVE_LIMITES: limites}
 
         except Exception as e:
             print(f"[ERR] {label} – {func_name}: {e}")
@@ -241,7 +258,9 @@ def generar_resultados_interactivos_v2(
                    for fn in function_names]
         for fut in as_completed(futures):
             lbl, fn, res = fut.result()
-            if res is not None:
+            if fn == "BESS" and isinstance(res, dict):
+                results[lbl].update({k: v for k, v in res.items() if v is not None})
+            elif res is not None:
                 results[lbl][fn] = res
 
     # Nombre de salida
@@ -256,7 +275,38 @@ def generar_resultados_interactivos_v2(
     etiqueta = f"{fecha_nombre}_{int(periodo_nombre):02d}"
     output_path = directorio_salida / f"results_{etiqueta}.pkl"
 
+    # Agregados por categoría/central/sistema, calculados una vez junto a las tablas
+    try:
+        agregar_rollups(results)
+    except Exception as e:
+        print(f"[WARN] rollups – {etiqueta}: {e}")
+
     with output_path.open("wb") as fh:
         pickle.dump(results, fh, protocol=pickle.HIGHEST_PROTOCOL)
 
+    # Zip de origen por solución: habilita consultas puntuales posteriores (drill-down).
+    # También deja la versión del mapa categoría → tecnología con que se armó GENTABLES
+    try:
+        version_categorias = cargar_mapa().version
+        guardar_fuentes(output_path, {
+            lbl: {"zip": str(zip_by_label[lbl]), **{k: cfg_by_label[lbl][k] for k in ("tipo", "st_schedule", "hini", "hfin")},
+                  "categorias_version": version_categorias}
+            for lbl in results
+        })
+    except Exception as e:
+        print(f"[WARN] fuentes – {etiqueta}: {e}")
+
+    # Copia columnar (Arrow IPC, se abre con memory-map desde load_results)
+    try:
+        results_norm, _ = normalizar_resultados(dict(results))
+        guardar_columnar(results_norm, COLUMNAR_DIR / output_path.stem)
+    except Exception as e:
+        print(f"[WARN] copia columnar – {etiqueta}: {e}")
+
+    # Alimenta el almacén histórico (no bloquea la entrega del .pkl si falla)
+    try:
+        escribir_resultados(results, fecha=fecha_nombre, periodo=int(periodo_nombre))
+    except Exception as e:
+        print(f"[WARN] almacén histórico – {etiqueta}: {e}")
+
     return output_path, results
@@ -0,0 +1,145 @@
+# src/compara_prg/services/perdidas.py
+"""
+Pérdidas por línea indexadas: arreglo (solución × línea × hora) en Float32.
+
+`GENT["losses"]` viene en formato largo (Nombre_PLEXOS, Loss, Hora). Las vistas
+filtraban y ordenaban ese frame por cada (línea × solución) y recalculaban el
+top de líneas con un group_by en cada rerun. Aquí se indexa una vez por archivo:
+  - la serie de cualquier línea es un slice (constante por línea),
+  - totales por línea (ventana completa y por día) quedan precalculados,
+  - el Δ entre dos soluciones se calcula una vez por par.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import polars as pl
+
+from compara_prg.services.ranking import top_filas
+
+HORAS_DIA = 24
+
+
+@dataclass
+class CuboPerdidas:
+    soluciones: List[str]
+    lineas: List[str]
+    horas: np.ndarray          # (H,) int — horas presentes en alguna solución
+    valores: np.ndarray        # (S, L, H) float32 — NaN donde la solución no trae la línea/hora
+    presente: np.ndarray       # (S, L) bool
+    total: np.ndarray          # (S, L) suma sobre todas las horas
+    dias: np.ndarray           # (D,) int
+    total_dia: np.ndarray      # (S, L, D)
+    idx_linea: Dict[str, int] = field(repr=False)
+    _deltas: Dict[Tuple[str, str], np.ndarray] = field(default_factory=dict, repr=False)
+
+    def idx_sol(self, sol: str) -> int:
+        return self.soluciones.index(sol)
+
+    def serie(self, sol: str, linea: str) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """(horas, pérdidas) de una línea en una solución; (None, None) si no está."""
+        i, s = self.idx_linea.get(linea), self.idx_sol(sol)
+        if i is None or not self.presente[s, i]:
+            return None, None
+        y = self.valores[s, i]
+        ok = ~np.isnan(y)
+        return self.horas[ok], y[ok]
+
+    def valores_hora(self, sol: str, hora: int) -> Dict[str, float]:
+        """{línea: pérdida} de una solución en una hora."""
+        k = np.searchsorted(self.horas, int(hora))
+        if k >= len(self.horas) or self.horas[k] != int(hora):
+            return {}
+        col = self.valores[self.idx_sol(sol), :, k]
+        ok = np.flatnonzero(~np.isnan(col))
+        return dict(zip((self.lineas[i] for i in ok), col[ok].tolist()))
+
+    def top_lineas(self, sol: str, k: int = 5) -> List[str]:
+        """Las k líneas con mayor pérdida total en `sol` (sin ordenar todas)."""
+        return [self.lineas[i] for i in top_filas(self.total[self.idx_sol(sol)], k, "desc")]
+
+    def delta(self, sol_a: str, sol_b: str) -> np.ndarray:
+        """Pérdidas(sol_b) − pérdidas(sol_a) por línea y hora, (L, H); una vez por par."""
+        key = (sol_a, sol_b)
+        if key not in self._deltas:
+            inv = self._deltas.get((sol_b, sol_a))
+            self._deltas[key] = -inv if inv is not None else (
+                np.nan_to_num(self.valores[self.idx_sol(sol_b)])
+                - np.nan_to_num(self.valores[self.idx_sol(sol_a)])
+            )
+        return self._deltas[key]
+
+    def tabla_diaria(self, sols: Sequence[str], lineas: Sequence[str], referencia: Optional[str] = None) -> pl.DataFrame:
+        """Totales diarios por (solución, línea) y, si hay referencia, Δ contra ella."""
+        filas = [self.idx_linea[l] for l in lineas if l in self.idx_linea]
+        s_idx = [self.idx_sol(s) for s in sols]
+        bloque = self.total_dia[np.ix_(s_idx, filas)]                           # (S', F, D)
+        S, F, D = bloque.shape
+        out = {
+            "Solución": np.repeat(list(sols), F * D),
+            "Línea": np.tile(np.repeat([self.lineas[i] for i in filas], D), S),
+            "Día": np.tile(self.dias, S * F),
+            "Pérdidas [MWh]": bloque.ravel(),
+        }
+        if referencia is not None:
+            ref = self.total_dia[self.idx_sol(referencia)][filas]               # (F, D)
+            out[f"Δ vs {referencia} [MWh]"] = (bloque - ref[None]).ravel()
+        return pl.DataFrame(out)
+
+
+def construir_cubo_perdidas(losses: Dict[str, pl.DataFrame]) -> Optional[CuboPerdidas]:
+    """
+    Indexa las pérdidas largas de varias soluciones en un CuboPerdidas.
+
+    Args:
+        losses (dict): {solución: DataFrame largo Nombre_PLEXOS, Loss, Hora}
+
+    Returns:
+        CuboPerdidas o None si ninguna solución trae pérdidas por línea
+    """
+    limpias: Dict[str, pl.DataFrame] = {}
+    for sol, df in losses.items():
+        if not isinstance(df, pl.DataFrame) or df.is_empty() \
+                or not {"Nombre_PLEXOS", "Loss", "Hora"}.issubset(df.columns):
+            continue
+        limpias[sol] = df.select(
+            pl.col("Nombre_PLEXOS").cast(pl.Utf8),
+            pl.col("Hora").cast(pl.Int64, strict=False),
+            pl.col("Loss").cast(pl.Float32, strict=False),
+        ).drop_nulls()
+    if not limpias:
+        return None
+
+    todas = pl.concat(limpias.values())
+    lineas = todas.get_column("Nombre_PLEXOS").unique(maintain_order=True).sort().to_list()
+    horas = np.sort(todas.get_column("Hora").unique().to_numpy())
+    idx_linea = {n: i for i, n in enumerate(lineas)}
+    mapa = pl.DataFrame({"Nombre_PLEXOS": lineas, "_fila": np.arange(len(lineas), dtype=np.int64)})
+
+    soluciones = list(limpias)
+    valores = np.full((len(soluciones), len(lineas), len(horas)), np.nan, dtype=np.float32)
+    for s, df in enumerate(limpias.values()):
+        df = df.join(mapa, on="Nombre_PLEXOS", how="inner")
+        filas = df.get_column("_fila").to_numpy()
+        cols = np.searchsorted(horas, df.get_column("Hora").to_numpy())
+        valores[s, filas, cols] = df.get_column("Loss").to_numpy()
+
+    presente = ~np.isnan(valores).all(axis=2)
+    total = np.nansum(valores, axis=2)
+    dia = (horas - 1) // HORAS_DIA + 1
+    dias = np.unique(dia)
+    total_dia = np.stack([np.nansum(valores[:, :, dia == d], axis=2) for d in dias], axis=2)
+
+    return CuboPerdidas(
+        soluciones=soluciones,
+        lineas=lineas,
+        horas=horas,
+        valores=valores,
+        presente=presente,
+        total=total,
+        dias=dias,
+        total_dia=total_dia,
+        idx_linea=idx_linea,
+    )
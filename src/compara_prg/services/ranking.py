@@ -0,0 +1,262 @@
+# src/compara_prg/services/ranking.py
+"""
+Ranking Top-K de desviaciones (|Δ total| contra una referencia).
+
+Se guarda un heap de tamaño K por (referencia, solución, categoría, ventana):
+  - construirlo desde el cubo cuesta O(E log K) por solución,
+  - al llegar un nuevo periodo PID sólo se agregan sus soluciones; lo ya
+    rankeado no se recalcula,
+  - el estado se persiste en JSON, así el reporte de la mañana sólo procesa
+    los results_* nuevos.
+
+Uso (reporte por consola):
+    python -m compara_prg.services.ranking 20250730 [--referencia PCP] [--k 20]
+        [--categoria 2] [--horas 1-24]
+"""
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import os
+import pickle
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from compara_prg.config import CATEGORY_LABELS, RESULTS_DIR, COLUMNAR_DIR, THERMAL_IDX
+
+RANKINGS_DIR = RESULTS_DIR.parent / "rankings"
+
+# (referencia, solución, categoría, ventana "h1-h2")
+Clave = Tuple[str, str, str, str]
+# (|Δ|, nombre, Δ): el primer elemento ordena el heap (mínimo arriba)
+Item = Tuple[float, str, float]
+
+
+class RankingTopK:
+    def __init__(self, k: int = 20):
+        self.k = k
+        self._heaps: Dict[Clave, List[Item]] = {}
+        self.procesados: Dict[str, int] = {}     # archivo → mtime_ns (para el modo incremental)
+
+    # ── actualización ────────────────────────────────────────────────────────
+    def actualizar(self, clave: Clave, nombres: Sequence[str], deltas: Iterable[float]) -> None:
+        """Incorpora entidades al heap de `clave`, conservando las K de mayor |Δ|."""
+        heap = self._heaps.setdefault(clave, [])
+        for nombre, d in zip(nombres, deltas):
+            item = (abs(float(d)), nombre, float(d))
+            if len(heap) < self.k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+    def reemplazar(self, clave: Clave, nombres: Sequence[str], deltas: Iterable[float]) -> None:
+        self._heaps.pop(clave, None)
+        self.actualizar(clave, nombres, deltas)
+
+    def tiene(self, clave: Clave) -> bool:
+        return clave in self._heaps
+
+    # ── consulta ─────────────────────────────────────────────────────────────
+    def top(self, clave: Clave, n: Optional[int] = None) -> List[Tuple[str, float]]:
+        """(nombre, Δ) de mayor a menor |Δ|."""
+        heap = self._heaps.get(clave, [])
+        return [(nom, d) for _, nom, d in heapq.nlargest(n or self.k, heap)]
+
+    def claves(self, referencia: Optional[str] = None, categoria: Optional[str] = None,
+               ventana: Optional[str] = None) -> List[Clave]:
+        return [
+            c for c in self._heaps
+            if (referencia is None or c[0] == referencia)
+            and (categoria is None or c[2] == categoria)
+            and (ventana is None or c[3] == ventana)
+        ]
+
+    def global_top(self, claves: Iterable[Clave], n: Optional[int] = None) -> List[Tuple[Clave, str, float]]:
+        """Las mayores desviaciones entre varias claves (p. ej. todos los PID del día)."""
+        items = ((it, c) for c in claves for it in self._heaps.get(c, []))
+        return [(c, it[1], it[2]) for it, c in heapq.nlargest(n or self.k, items, key=lambda x: x[0])]
+
+    # ── persistencia ─────────────────────────────────────────────────────────
+    def a_json(self) -> dict:
+        return {
+            "k": self.k,
+            "procesados": self.procesados,
+            "heaps": [{"clave": list(c), "items": h} for c, h in self._heaps.items()],
+        }
+
+    @classmethod
+    def desde_json(cls, data: dict) -> "RankingTopK":
+        rk = cls(int(data.get("k", 20)))
+        rk.procesados = dict(data.get("procesados", {}))
+        for ent in data.get("heaps", []):
+            heap = [tuple(it) for it in ent["items"]]
+            heapq.heapify(heap)
+            rk._heaps[tuple(ent["clave"])] = heap
+        return rk
+
+    def guardar(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self.a_json(), ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    @classmethod
+    def cargar(cls, path: Path, k: int) -> "RankingTopK":
+        try:
+            rk = cls.desde_json(json.loads(Path(path).read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            return cls(k)
+        return rk if rk.k == k else cls(k)      # otro K: se reconstruye
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Desde el cubo de soluciones
+# ─────────────────────────────────────────────────────────────────────────────
+def ranking_desde_cubo(
+    rk: RankingTopK,
+    cubo,
+    categoria: str,
+    referencia: str,
+    pos: np.ndarray,
+    ventana: str,
+    prefijo: str = "",
+    solo_nuevas: bool = True,
+) -> List[Clave]:
+    """
+    Agrega al ranking las soluciones del cubo (menos la referencia). Los Δ salen
+    de `CuboSoluciones.comparar`, que ya los calcula vectorizados.
+
+    Args:
+        prefijo (str): antepuesto al nombre de la solución (p. ej. "P04·" para el periodo)
+        solo_nuevas (bool): no recalcula claves que ya existen
+
+    Returns:
+        claves agregadas o actualizadas
+    """
+    if referencia not in cubo.soluciones:
+        return []
+    comp = cubo.comparar(referencia, pos)
+    nuevas = []
+    for j, sol in enumerate(comp.soluciones):
+        clave = (referencia, f"{prefijo}{sol}", categoria, ventana)
+        if solo_nuevas and rk.tiene(clave):
+            continue
+        rk.reemplazar(clave, comp.entidades, comp.delta_total[j])
+        nuevas.append(clave)
+    return nuevas
+
+
+def top_filas(valores: Sequence[float], k: int, orden: str = "abs") -> List[int]:
+    """
+    Índices de las k filas mayores según `orden` ('abs' = |valor|, 'desc', 'asc'),
+    sin ordenar toda la columna. Los NaN quedan después de cualquier valor real.
+    """
+    v = np.asarray(valores, dtype=np.float64)
+    clave = {"abs": np.abs, "desc": lambda x: x, "asc": np.negative}[orden](v)
+    # NaN al final: nunca le gana a un valor real
+    clave = np.where(np.isnan(clave), -np.inf, clave)
+    k = min(int(k), clave.size)
+    if k <= 0:
+        return []
+    if k < clave.size:
+        # Umbral = k-ésima clave; los empates en el umbral se toman por índice
+        umbral = clave[np.argpartition(-clave, k - 1)[k - 1]]
+        mayores = np.flatnonzero(clave > umbral)
+        sel = np.concatenate([mayores, np.flatnonzero(clave == umbral)[: k - mayores.size]])
+    else:
+        sel = np.arange(clave.size)
+    # Mayor clave primero; en empate, el índice menor (mismo orden que antes)
+    return sel[np.lexsort((sel, -clave[sel]))].tolist()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Periodos de un día (modo incremental)
+# ─────────────────────────────────────────────────────────────────────────────
+def _cargar_resultados(path: Path) -> dict:
+    from compara_prg.io.resultados_columnar import cargar_columnar, es_columnar
+
+    carpeta = COLUMNAR_DIR / path.stem
+    if es_columnar(carpeta):
+        return cargar_columnar(carpeta)
+    with path.open("rb") as fh:
+        return pickle.load(fh)
+
+
+def procesar_dia(
+    fecha: str,
+    referencia: str = "PCP",
+    categoria_idx: int = THERMAL_IDX,
+    horas: Tuple[int, int] = (1, 24),
+    k: int = 20,
+    results_dir: Path = RESULTS_DIR,
+    estado_dir: Path = RANKINGS_DIR,
+) -> RankingTopK:
+    """
+    Ranking del día `fecha` (AAAAMMDD). Sólo procesa los results_{fecha}_PP.pkl
+    que no estén en el estado persistido (o que cambiaron desde entonces).
+    """
+    from compara_prg.utils.funciones import cubo_categoria, infer_hours
+
+    categoria = CATEGORY_LABELS[categoria_idx]
+    ventana = f"{horas[0]}-{horas[1]}"
+    estado = Path(estado_dir) / f"ranking_{fecha}_{categoria_idx}_{ventana}.json"
+    rk = RankingTopK.cargar(estado, k)
+
+    for pkl in sorted(Path(results_dir).glob(f"results_{fecha}_*.pkl")):
+        m = re.search(r"_(\d{2})$", pkl.stem)
+        if not m:
+            continue
+        mtime = pkl.stat().st_mtime_ns
+        if rk.procesados.get(pkl.name) == mtime:
+            continue
+        try:
+            results = _cargar_resultados(pkl)
+        except Exception as e:
+            print(f"[WARN] ranking – {pkl.name}: {e}")
+            continue
+        hours_full = infer_hours(results)
+        cubo = cubo_categoria(results, str(pkl), categoria_idx, hours_full)
+        if cubo is not None:
+            pos = cubo.posiciones([str(h) for h in range(horas[0], horas[1] + 1)])
+            ranking_desde_cubo(rk, cubo, categoria, referencia, pos, ventana,
+                               prefijo=f"P{m.group(1)}·", solo_nuevas=False)
+        rk.procesados[pkl.name] = mtime
+        rk.guardar(estado)
+    return rk
+
+
+def reporte(rk: RankingTopK, n: int = 20) -> str:
+    lineas = []
+    claves = sorted(rk.claves())
+    if not claves:
+        return "Sin datos para el ranking."
+    ref, _, cat, ventana = claves[0]
+    lineas.append(f"Top {n} desviaciones |Δ total| vs {ref} — {cat}, horas {ventana}")
+    lineas.append("")
+    for pos_, (clave, nombre, d) in enumerate(rk.global_top(claves, n), start=1):
+        lineas.append(f"{pos_:>3}. {clave[1]:<12} {nombre:<40} {d:>+12,.1f}")
+    lineas.append("")
+    lineas.append("Por solución:")
+    for clave in claves:
+        top3 = ", ".join(f"{nom} ({d:+,.0f})" for nom, d in rk.top(clave, 3))
+        lineas.append(f"  {clave[1]:<12} {top3}")
+    return "\n".join(lineas)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Ranking Top-K de desviaciones del día.")
+    ap.add_argument("fecha", help="AAAAMMDD")
+    ap.add_argument("--referencia", default="PCP")
+    ap.add_argument("--k", type=int, default=20)
+    ap.add_argument("--categoria", type=int, default=THERMAL_IDX, help="índice en CATEGORY_LABELS")
+    ap.add_argument("--horas", default="1-24", help="ventana h1-h2")
+    ap.add_argument("--origen", type=Path, default=RESULTS_DIR)
+    args = ap.parse_args()
+    h1, h2 = (int(x) for x in args.horas.split("-"))
+    rk = procesar_dia(args.fecha, args.referencia, args.categoria, (h1, h2), args.k, args.origen)
+    print(reporte(rk, args.k))
@@ -0,0 +1,111 @@
+# src/compara_prg/services/rollups.py
+"""
+Agregados precalculados por solución, guardados junto a las tablas crudas en
+results[sol]["ROLLUPS"].
+
+Se calculan una vez al escribir los resultados (y en el backfill), así las
+páginas de totales leen unos cientos de números en vez de normalizar y sumar
+las tablas completas de centrales en cada rerun.
+
+Todas las tablas son largas (hora/día como columna): ningún nombre de columna
+es sólo dígitos, para que `infer_hours` / `coerce_schema` no las confundan con
+tablas anchas por hora.
+
+    categoria_hora: Categoria, Hora, Valor              (Σ centrales por hora)
+    central_dia:    Categoria, Nombre_PLEXOS, Dia, Valor (Σ horas del día)
+    sistema_hora:   Variable, Hora, Valor               (tabla GENT)
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+import polars as pl
+
+from compara_prg.services.tecnologias import etiqueta_tecnologia
+from compara_prg.utils.funciones import coerce_schema, infer_hours, normalize_hours, _coerce_gent_payload
+
+CLAVE_ROLLUPS = "ROLLUPS"
+HORAS_DIA = 24
+
+
+def _ancho_a_largo(df: pl.DataFrame, nombre: str, horas: List[str]) -> Optional[pl.DataFrame]:
+    cols = [h for h in horas if h in df.columns]
+    if not cols or nombre not in df.columns:
+        return None
+    # El índice se renombra antes de pivotear: en GENT se llama justamente 'Hora'
+    return (
+        df.select(pl.col(nombre).cast(pl.Utf8).alias("_id"), *[pl.col(h).cast(pl.Float64, strict=False) for h in cols])
+        .unpivot(index="_id", on=cols, variable_name="Hora", value_name="Valor")
+        .with_columns(pl.col("Hora").cast(pl.Int32), pl.col("Valor").fill_null(0.0))
+        .rename({"_id": nombre if nombre != "Hora" else "_nombre"})
+    )
+
+
+def calcular_rollups(data: Dict[str, Any], hours_full: List[str]) -> Dict[str, pl.DataFrame]:
+    """
+    Agregados de una solución (dict con GENTABLES y/o GENT).
+
+    Args:
+        data (dict): results[sol]
+        hours_full (list): horas (str) del archivo (`infer_hours`)
+
+    Returns:
+        dict con las tablas presentes (categoria_hora, central_dia, sistema_hora)
+    """
+    horas = [str(h) for h in hours_full]
+    out: Dict[str, pl.DataFrame] = {}
+
+    gentables = data.get("GENTABLES")
+    if isinstance(gentables, (tuple, list)):
+        largos = []
+        for i, df in enumerate(gentables):
+            if not isinstance(df, pl.DataFrame) or df.is_empty():
+                continue
+            df = coerce_schema(normalize_hours(df, horas), horas)
+            largo = _ancho_a_largo(df, "Nombre_PLEXOS", horas)
+            if largo is not None:
+                cat = etiqueta_tecnologia(i)
+                largos.append(largo.with_columns(pl.lit(cat).alias("Categoria")))
+        if largos:
+            largo = pl.concat(largos)
+            out["categoria_hora"] = (
+                largo.group_by("Categoria", "Hora").agg(pl.col("Valor").sum())
+                .sort("Categoria", "Hora")
+            )
+            out["central_dia"] = (
+                largo.with_columns(((pl.col("Hora") - 1) // HORAS_DIA + 1).cast(pl.Int32).alias("Dia"))
+                .group_by("Categoria", "Nombre_PLEXOS", "Dia").agg(pl.col("Valor").sum())
+                .sort("Categoria", "Nombre_PLEXOS", "Dia")
+            )
+
+    gent = _coerce_gent_payload(data.get("GENT"))
+    tabla = gent.get("tabla") if gent else None
+    if isinstance(tabla, pl.DataFrame) and not tabla.is_empty():
+        tabla = tabla.rename({c: str(c) for c in tabla.columns if not isinstance(c, str)})
+        # En GENT la primera columna ('Hora' en los archivos actuales) trae el nombre de la variable
+        nombre = tabla.columns[0]
+        largo = _ancho_a_largo(tabla, nombre, horas)
+        if largo is not None:
+            out["sistema_hora"] = largo.rename({largo.columns[0]: "Variable"}).sort("Variable", "Hora")
+
+    return out
+
+
+def agregar_rollups(results: Dict[str, Dict[str, Any]], forzar: bool = False) -> Dict[str, Dict[str, Any]]:
+    """Calcula (en el mismo dict) los ROLLUPS de cada solución que no los tenga."""
+    hours_full = infer_hours(results)
+    for data in results.values():
+        if not isinstance(data, dict) or (CLAVE_ROLLUPS in data and not forzar):
+            continue
+        rollups = calcular_rollups(data, hours_full)
+        if rollups:
+            data[CLAVE_ROLLUPS] = rollups
+    return results
+
+
+def rollup(results: Dict[str, Any], sol: str, parte: str) -> Optional[pl.DataFrame]:
+    """Tabla `parte` de los ROLLUPS de `sol` (None si el archivo no los trae)."""
+    data = results.get(sol)
+    r = data.get(CLAVE_ROLLUPS) if isinstance(data, dict) else None
+    df = r.get(parte) if isinstance(r, dict) else None
+    return df if isinstance(df, pl.DataFrame) else None
@@ -0,0 +1,169 @@
+# src/compara_prg/services/tecnologias.py
+"""
+Clasificación de centrales por tecnología a partir de la categoría PLEXOS.
+
+La tabla vive en resources/categorias_tecnologia.csv (versionada con la línea
+'# version: N'):
+
+    categoria,regla,codigo
+    Thermal,exacta,2
+    Thermal,contiene,2
+
+  - 'exacta': la categoría se resuelve con un join por hash.
+  - 'contiene': respaldo para categorías sin fila exacta; las reglas se evalúan
+    en el orden del archivo y gana la primera que calza. Los filtros antiguos
+    (str.contains por tabla) eran independientes: una categoría que calza con
+    dos patrones quedaba en ambas tablas; ahora queda en una y se avisa.
+
+La versión del mapa queda registrada por etiqueta en el sidecar de fuentes
+(`obtener_resultados`), junto al zip de origen.
+
+Las reglas se aplican sólo a las categorías distintas que no tienen fila exacta
+(unas pocas decenas, no cada fila), y el resultado queda memorizado en el
+proceso. Agregar una categoría nueva o una tecnología nueva es editar el CSV.
+El código es la posición en la tupla GENTABLES (CATEGORY_LABELS).
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from enum import IntEnum
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import polars as pl
+
+from compara_prg.config import CATEGORIAS_TEC_CSV, CATEGORY_LABELS
+
+COLUMNA_CODIGO = "codigo"
+REGLAS = ("exacta", "contiene")
+
+
+class Tecnologia(IntEnum):
+    EMBALSE = 0
+    ALMACENAMIENTO = 1
+    TERMICA = 2
+    SOLAR = 3
+    EOLICA = 4
+
+
+def etiqueta_tecnologia(codigo: int) -> str:
+    """Etiqueta de la app para un código (CATEGORY_LABELS; genérica si es nuevo)."""
+    return CATEGORY_LABELS[codigo] if 0 <= codigo < len(CATEGORY_LABELS) else f"Tecnología {codigo}"
+
+
+@dataclass(frozen=True)
+class MapaCategorias:
+    version: int
+    exactas: pl.DataFrame                  # Categoría (Utf8), codigo (UInt8)
+    reglas: Tuple[Tuple[str, int], ...]    # (patrón, código) en orden de prioridad
+    # Categorías ya resueltas por regla (las consultas corren en hilos)
+    _resueltas: Dict[str, Optional[int]] = field(default_factory=dict, compare=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, compare=False, repr=False)
+
+    def por_regla(self, categoria: str) -> Optional[int]:
+        return next((codigo for patron, codigo in self.reglas if patron in categoria), None)
+
+    def patrones(self, categoria: str) -> Tuple[str, ...]:
+        """Todos los patrones 'contiene' que calzan (más de uno = ambigua)."""
+        return tuple(patron for patron, _ in self.reglas if patron in categoria)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Carga del CSV
+# ─────────────────────────────────────────────────────────────────────────────
+def _version(ruta: Path) -> int:
+    with ruta.open(encoding="utf-8") as fh:
+        for linea in fh:
+            if not linea.startswith("#"):
+                break
+            clave, _, valor = linea.lstrip("#").partition(":")
+            if clave.strip().lower() == "version":
+                return int(valor)
+    return 0
+
+
+@lru_cache(maxsize=4)
+def _cargar(ruta: str, mtime_ns: int) -> MapaCategorias:
+    df = pl.read_csv(ruta, comment_prefix="#", schema_overrides={"categoria": pl.Utf8, "regla": pl.Utf8})
+    faltan = {"categoria", "regla", "codigo"} - set(df.columns)
+    if faltan:
+        raise ValueError(f"{ruta}: faltan columnas {sorted(faltan)}")
+    df = df.with_columns(pl.col("regla").str.strip_chars().str.to_lowercase())
+    malas = df.filter(~pl.col("regla").is_in(REGLAS) | ~pl.col("codigo").is_between(0, 255))
+    if not malas.is_empty():
+        raise ValueError(f"{ruta}: filas inválidas (regla ∈ {REGLAS}, código 0-255):\n{malas}")
+
+    exactas = (
+        df.filter(pl.col("regla") == "exacta")
+        .select(pl.col("categoria").alias("Categoría"), pl.col("codigo").cast(pl.UInt8).alias(COLUMNA_CODIGO))
+        .unique("Categoría", keep="first", maintain_order=True)
+    )
+    reglas = tuple(df.filter(pl.col("regla") == "contiene").select("categoria", "codigo").iter_rows())
+    return MapaCategorias(version=_version(Path(ruta)), exactas=exactas, reglas=reglas)
+
+
+def cargar_mapa(ruta: Path | str = CATEGORIAS_TEC_CSV) -> MapaCategorias:
+    """Mapa categoría → código; se relee sólo si el CSV cambió."""
+    ruta = Path(ruta)
+    return _cargar(str(ruta), ruta.stat().st_mtime_ns)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Aplicación
+# ─────────────────────────────────────────────────────────────────────────────
+def tabla_codigos(categorias: Iterable[str], mapa: Optional[MapaCategorias] = None) -> pl.DataFrame:
+    """
+    Código de cada categoría distinta: join con las filas exactas y, para las que
+    no tienen, las reglas 'contiene'. Las que no calzan con nada quedan fuera y
+    las que calzan con varias reglas toman la primera (se avisa una vez por
+    categoría).
+
+    Returns:
+        DataFrame (Categoría, codigo UInt8), una fila por categoría clasificada
+    """
+    mapa = mapa or cargar_mapa()
+    distintas = pl.DataFrame({"Categoría": pl.Series(list(categorias), dtype=pl.Utf8)}).unique().drop_nulls()
+    con_exacta = distintas.join(mapa.exactas, on="Categoría", how="left")
+
+    sin_exacta = con_exacta.filter(pl.col(COLUMNA_CODIGO).is_null())["Categoría"].to_list()
+    if sin_exacta:
+        with mapa._lock:
+            memo = mapa._resueltas
+            for cat in sin_exacta:
+                if cat not in memo:
+                    memo[cat] = mapa.por_regla(cat)
+                    patrones = mapa.patrones(cat)
+                    if memo[cat] is None:
+                        print(f"[WARN] Categoría PLEXOS sin tecnología en {CATEGORIAS_TEC_CSV.name}: {cat!r}")
+                    elif len(patrones) > 1:
+                        print(f"[WARN] Categoría PLEXOS {cat!r} calza con {patrones}; se usa {patrones[0]!r} "
+                              f"(agregar fila exacta en {CATEGORIAS_TEC_CSV.name})")
+            por_regla = {cat: memo[cat] for cat in sin_exacta}
+        con_exacta = con_exacta.with_columns(
+            pl.col(COLUMNA_CODIGO).fill_null(
+                pl.col("Categoría").replace_strict(por_regla, default=None, return_dtype=pl.UInt8)
+            )
+        )
+    return con_exacta.drop_nulls(COLUMNA_CODIGO)
+
+
+def con_tecnologia(df, categorias: Optional[Iterable[str]] = None, columna: str = "Categoría", how: str = "inner"):
+    """
+    Agrega la columna 'codigo' a un DataFrame/LazyFrame con un join por categoría.
+
+    Args:
+        df (DataFrame | LazyFrame): tabla con la columna de categoría
+        categorias (iterable): categorías a resolver; por defecto las de `df`
+        columna (str): nombre de la columna de categoría
+        how (str): 'inner' descarta las filas sin tecnología; 'left' las deja con null
+
+    Returns:
+        el mismo tipo de `df`, con la columna 'codigo' (UInt8)
+    """
+    perezoso = isinstance(df, pl.LazyFrame)
+    if categorias is None:
+        categorias = (df.select(pl.col(columna).unique()).collect() if perezoso else df.select(pl.col(columna).unique()))[columna]
+    tabla = tabla_codigos(categorias).rename({"Categoría": columna})
+    return df.join(tabla.lazy() if perezoso else tabla, on=columna, how=how)
@@ -0,0 +1,347 @@
+# src/compara_prg/services/warehouse.py
+"""
+Almacén histórico de resultados (multi-fecha) en Parquet particionado.
+
+Cada archivo de resultados (una fecha + periodo PID) se guarda en formato largo
+(Nombre, Hora, Valor) particionado estilo Hive:
+
+    WAREHOUSE_DIR/tabla=CMG/fecha=20250715/periodo=1/variante=base/solucion=PID1/data.parquet
+
+Es de solo-agregar: escribir una fecha no toca las demás (re-escribir la misma
+fecha/periodo/variante reemplaza sólo esas particiones). Las consultas usan
+`pl.scan_parquet`, así que los filtros por partición (fecha, solución…) y las
+columnas pedidas se empujan al lector y no se abren archivos de otras fechas.
+"""
+from __future__ import annotations
+
+import os
+import re
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import polars as pl
+
+from compara_prg.config import WAREHOUSE_DIR, CATEGORY_LABELS
+from compara_prg.utils.funciones import _coerce_gent_payload
+from compara_prg.services.costos import CLAVE_COSTOS, payload_costos
+from compara_prg.services.tecnologias import etiqueta_tecnologia
+
+HORAS_DIA = 24
+
+# Esquema de las columnas de partición (evita que Polars infiera fecha como int)
+HIVE_SCHEMA = {
+    "tabla": pl.Utf8,
+    "fecha": pl.Utf8,
+    "periodo": pl.Int32,
+    "variante": pl.Utf8,
+    "solucion": pl.Utf8,
+}
+
+_RE_NOMBRE = re.compile(r"results_(\d{8})_(\d{1,2})(?:_(.+))?$")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Identificación del archivo de resultados
+# ─────────────────────────────────────────────────────────────────────────────
+def partes_desde_nombre(path: Path | str) -> Optional[Tuple[str, int, str]]:
+    """
+    (fecha, periodo, variante) desde 'results_YYYYMMDD_PP[_variante].pkl'.
+    La variante es 'base' si no hay sufijo (p. ej. '_ori', '_ori2', '_SinCondIni').
+    """
+    m = _RE_NOMBRE.match(Path(path).stem)
+    if not m:
+        return None
+    return m.group(1), int(m.group(2)), m.group(3) or "base"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Ancho → largo
+# ─────────────────────────────────────────────────────────────────────────────
+def ancho_a_largo(df: pl.DataFrame) -> Optional[pl.DataFrame]:
+    """
+    Tabla ancha (1 columna etiqueta + columnas de horas) → (Nombre, Hora, Valor).
+    La etiqueta es 'Nombre_PLEXOS' si existe; si no, la primera columna no-hora
+    ('Hora' en GENT, 'Propiedad' en GENC).
+    """
+    if df is None or not isinstance(df, pl.DataFrame) or df.is_empty():
+        return None
+    df = df.rename({c: str(c) for c in df.columns if not isinstance(c, str)})
+    horas = [c for c in df.columns if c.isdigit()]
+    etiquetas = [c for c in df.columns if not c.isdigit()]
+    if not horas or not etiquetas:
+        return None
+    lab = "Nombre_PLEXOS" if "Nombre_PLEXOS" in etiquetas else etiquetas[0]
+    return (
+        df.select(
+            pl.col(lab).cast(pl.Utf8).alias("Nombre"),
+            *[pl.col(h).cast(pl.Float64, strict=False) for h in horas],
+        )
+        .unpivot(index="Nombre", variable_name="Hora", value_name="Valor")
+        .with_columns(pl.col("Hora").cast(pl.Int32))
+    )
+
+
+def _perdidas_a_largo(df: pl.DataFrame) -> Optional[pl.DataFrame]:
+    if df is None or not isinstance(df, pl.DataFrame) or df.is_empty():
+        return None
+    if not {"Nombre_PLEXOS", "Loss", "Hora"}.issubset(df.columns):
+        return None
+    return df.select(
+        pl.col("Nombre_PLEXOS").cast(pl.Utf8).alias("Nombre"),
+        pl.col("Hora").cast(pl.Int32, strict=False),
+        pl.col("Loss").cast(pl.Float64, strict=False).alias("Valor"),
+    )
+
+
+def _costos_a_largo(df: pl.DataFrame) -> Optional[pl.DataFrame]:
+    if df is None or not isinstance(df, pl.DataFrame) or df.is_empty():
+        return None
+    return df.select(
+        pl.col("Nombre_PLEXOS").cast(pl.Utf8).alias("Nombre"),
+        pl.col("Hora").cast(pl.Int32, strict=False),
+        pl.col("Costo").cast(pl.Float64, strict=False).alias("Valor"),
+        pl.col("Propiedad").cast(pl.Utf8),
+    )
+
+
+def tablas_largas(results: Dict[str, Dict[str, Any]]) -> Iterator[Tuple[str, str, pl.DataFrame]]:
+    """
+    Recorre un dict de resultados y entrega (tabla, solución, df_largo).
+
+    GENTABLES se entrega como una sola tabla con columna 'Categoria'
+    (CATEGORY_LABELS); GENT se separa en 'GENT' (tabla) y 'PERDIDAS' (losses);
+    GENC en 'GENC' (sistema) y 'GENC_CENTRAL' (detalle, con columna 'Propiedad').
+    """
+    for sol, data in results.items():
+        if not isinstance(data, dict):
+            continue
+        for key, obj in data.items():
+            if key == "GENTABLES" and isinstance(obj, (tuple, list)):
+                partes = []
+                for i, df in enumerate(obj):
+                    largo = ancho_a_largo(df)
+                    if largo is not None:
+                        cat = etiqueta_tecnologia(i)
+                        partes.append(largo.with_columns(pl.lit(cat).alias("Categoria")))
+                if partes:
+                    yield "GENTABLES", sol, pl.concat(partes)
+            elif key == "GENT":
+                gent = _coerce_gent_payload(obj)
+                if gent is None:
+                    continue
+                tabla = ancho_a_largo(gent.get("tabla"))
+                if tabla is not None:
+                    yield "GENT", sol, tabla
+                perdidas = _perdidas_a_largo(gent.get("losses"))
+                if perdidas is not None:
+                    yield "PERDIDAS", sol, perdidas
+            elif key == CLAVE_COSTOS:
+                genc = payload_costos(obj)
+                if genc is None:
+                    continue
+                tabla = ancho_a_largo(genc.get("tabla"))
+                if tabla is not None:
+                    yield "GENC", sol, tabla
+                detalle = _costos_a_largo(genc.get("detalle"))
+                if detalle is not None:
+                    yield "GENC_CENTRAL", sol, detalle
+            elif isinstance(obj, pl.DataFrame):
+                largo = ancho_a_largo(obj)
+                if largo is not None:
+                    yield key, sol, largo
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Escritura
+# ─────────────────────────────────────────────────────────────────────────────
+def ruta_particion(raiz: Path, tabla: str, fecha: str, periodo: int, variante: str, sol: str) -> Path:
+    return (
+        Path(raiz) / f"tabla={tabla}" / f"fecha={fecha}" / f"periodo={int(periodo)}"
+        / f"variante={variante}" / f"solucion={sol}"
+    )
+
+
+def escribir_resultados(
+    results: Dict[str, Dict[str, Any]],
+    fecha: str,
+    periodo: int,
+    variante: str = "base",
+    raiz: Path = WAREHOUSE_DIR,
+) -> List[Path]:
+    """
+    Agrega (o reemplaza) las particiones de un archivo de resultados.
+
+    Args:
+        results (dict): {solución: {tabla: DataFrame | tuple | dict}}
+        fecha (str): 'YYYYMMDD'
+        periodo (int): periodo PID del archivo
+        variante (str): 'base' o sufijo del archivo ('ori', 'SinCondIni', …)
+        raiz (Path): carpeta raíz del almacén
+
+    Returns:
+        Lista de archivos Parquet escritos
+    """
+    escritos: List[Path] = []
+    for tabla, sol, df in tablas_largas(results):
+        destino = ruta_particion(raiz, tabla, fecha, periodo, variante, sol) / "data.parquet"
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        tmp = destino.with_suffix(".parquet.tmp")
+        df.sort("Nombre", "Hora").write_parquet(tmp, compression="zstd", statistics=True)
+        os.replace(tmp, destino)   # atómico: un lector nunca ve un archivo a medias
+        escritos.append(destino)
+    return escritos
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Consultas
+# ─────────────────────────────────────────────────────────────────────────────
+def tablas_disponibles(raiz: Path = WAREHOUSE_DIR) -> List[str]:
+    raiz = Path(raiz)
+    if not raiz.exists():
+        return []
+    return sorted(p.name.split("=", 1)[1] for p in raiz.glob("tabla=*") if p.is_dir())
+
+
+def consultar(
+    tabla: str,
+    columnas: Optional[Sequence[str]] = None,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    periodos: Optional[Iterable[int]] = None,
+    variantes: Optional[Iterable[str]] = ("base",),
+    soluciones: Optional[Iterable[str]] = None,
+    nombres: Optional[Iterable[str]] = None,
+    horas: Optional[Tuple[int, int]] = None,
+    raiz: Path = WAREHOUSE_DIR,
+) -> pl.LazyFrame:
+    """
+    LazyFrame filtrado sobre una tabla del almacén. Nada se lee hasta `.collect()`;
+    los filtros de partición descartan directorios completos y el resto se
+    resuelve con las estadísticas de cada Parquet.
+
+    Args:
+        tabla (str): 'CMG', 'GENTABLES', 'GENT', 'PERDIDAS', 'GENC', 'GENC_CENTRAL', 'BESS', 'COTAS'…
+        columnas (list): columnas a devolver (None = todas)
+        fecha_desde / fecha_hasta (str): 'YYYYMMDD' inclusivos
+        periodos (list[int]): periodos PID
+        variantes (list[str]): por defecto sólo 'base'; None = todas
+        soluciones (list[str]): 'PCP', 'PID1', …
+        nombres (list[str]): valores de 'Nombre' (central, nodo, línea…)
+        horas (tuple): (hora_ini, hora_fin) inclusivas
+    """
+    base = Path(raiz) / f"tabla={tabla}"
+    lf = pl.scan_parquet(
+        base / "**" / "*.parquet",
+        hive_partitioning=True,
+        hive_schema=HIVE_SCHEMA,
+    )
+
+    filtros = []
+    if fecha_desde:
+        filtros.append(pl.col("fecha") >= fecha_desde)
+    if fecha_hasta:
+        filtros.append(pl.col("fecha") <= fecha_hasta)
+    if periodos is not None:
+        filtros.append(pl.col("periodo").is_in([int(p) for p in periodos]))
+    if variantes is not None:
+        filtros.append(pl.col("variante").is_in(list(variantes)))
+    if soluciones is not None:
+        filtros.append(pl.col("solucion").is_in(list(soluciones)))
+    if nombres is not None:
+        filtros.append(pl.col("Nombre").is_in(list(nombres)))
+    if horas is not None:
+        filtros.append(pl.col("Hora").is_between(int(horas[0]), int(horas[1])))
+    if filtros:
+        lf = lf.filter(pl.all_horizontal(filtros))
+    if columnas:
+        lf = lf.select(list(columnas))
+    return lf
+
+
+def ultimos_dias(dias: int, hasta: Optional[date] = None) -> Tuple[str, str]:
+    """(fecha_desde, fecha_hasta) 'YYYYMMDD' para los últimos `dias` días."""
+    hasta = hasta or date.today()
+    return (hasta - timedelta(days=dias - 1)).strftime("%Y%m%d"), hasta.strftime("%Y%m%d")
+
+
+def serie_diaria(
+    tabla: str,
+    nombre: str,
+    soluciones: Sequence[str],
+    dias: int = 90,
+    agg: str = "mean",
+    **kwargs,
+) -> pl.DataFrame:
+    """
+    Valor diario por solución de una entidad (p. ej. CMG Quillota220, PCP vs PID1,
+    últimos 90 días). `agg` es 'mean' o 'sum' sobre las horas de cada día.
+
+    Returns:
+        DataFrame: fecha, periodo, solucion, Valor
+    """
+    desde, hasta = ultimos_dias(dias)
+    valor = pl.col("Valor").mean() if agg == "mean" else pl.col("Valor").sum()
+    return (
+        consultar(
+            tabla, columnas=["fecha", "periodo", "solucion", "Valor"],
+            fecha_desde=desde, fecha_hasta=hasta,
+            soluciones=soluciones, nombres=[nombre], **kwargs,
+        )
+        .group_by("fecha", "periodo", "solucion")
+        .agg(valor.alias("Valor"))
+        .sort("fecha", "periodo", "solucion")
+        .collect()
+    )
+
+
+def desvio_mensual(
+    sol_ref: str,
+    sol_cmp: str,
+    categoria: str = CATEGORY_LABELS[2],
+    periodo: Optional[int] = None,
+    **kwargs,
+) -> pl.DataFrame:
+    """
+    Desvío de despacho por central y mes (Σ sol_cmp − Σ sol_ref, MWh), p. ej.
+    térmicas PID1 vs PCP.
+
+    Los periodos PID de una misma fecha tienen ventanas de 48 h que se traslapan,
+    así que cada fecha aporta un solo periodo (`periodo`, o el primero guardado) y
+    sólo sus horas del día (1-24) presentes en ambas soluciones: un día suma un día.
+
+    Args:
+        sol_ref / sol_cmp (str): soluciones a comparar
+        categoria (str): categoría de GENTABLES
+        periodo (int): periodo PID a usar en cada fecha (None = el primero)
+        **kwargs: filtros de `consultar` (fechas, variantes, raiz…)
+
+    Returns:
+        DataFrame: mes ('YYYYMM'), Nombre, <sol_ref>, <sol_cmp>, Delta
+    """
+    lf = (
+        consultar("GENTABLES", soluciones=[sol_ref, sol_cmp], **kwargs)
+        .filter((pl.col("Categoria") == categoria) & pl.col("Hora").is_between(1, HORAS_DIA))
+    )
+    if periodo is None:
+        lf = lf.filter(pl.col("periodo") == pl.col("periodo").min().over("fecha"))
+    else:
+        lf = lf.filter(pl.col("periodo") == int(periodo))
+    ancho = (
+        # Horas comunes: el PCP puede cubrir una hora más que el PID
+        lf.filter(pl.col("solucion").n_unique().over("fecha", "Hora") == 2)
+        .group_by(pl.col("fecha").str.slice(0, 6).alias("mes"), "Nombre", "solucion")
+        .agg(pl.col("Valor").sum())
+        .collect()
+        .pivot(on="solucion", index=["mes", "Nombre"], values="Valor")
+    )
+    faltan = [s for s in (sol_ref, sol_cmp) if s not in ancho.columns]
+    if faltan:
+        ancho = ancho.with_columns([pl.lit(None, dtype=pl.Float64).alias(s) for s in faltan])
+    return (
+        ancho.select("mes", "Nombre", sol_ref, sol_cmp)
+        .with_columns(
+            (pl.col(sol_cmp).fill_null(0) - pl.col(sol_ref).fill_null(0)).alias("Delta")
+        )
+        .sort("mes", pl.col("Delta").abs(), descending=[False, True])
+    )
@@ -12,6 +12,9 @@ from typing import Any, Set
 warnings.filterwarnings("ignore", category=RuntimeWarning)
 import os
 from typing import Tuple, Optional
+from compara_prg.services.cubo_soluciones import CuboSoluciones, construir_cubo
+from compara_prg.services.cubo_cmg import CuboCMG, construir_cubo_cmg
+from compara_prg.services.perdidas import CuboPerdidas, construir_cubo_perdidas
 
 # ─────────────────────────────────────────────────────────────
 # 1. Utilidad: extraer fecha y hora (periodo)
@@ -37,13 +40,15 @@ def extraer_fecha_y_hora_desde_ruta(ruta: str) -> Tuple[str, int]:
 
 # 2) Valida inputs antes de lanzar hilos --------------------------
 def validar_ruta_carpeta(base: str, carpeta: str) -> Path:
+    from compara_prg.services.descubrimiento import zips_en   # listado scandir con TTL
+
     p = Path(base, carpeta)
-    if not p.is_dir():
+    zips = zips_en(p)
+    if zips is None:
         raise FileNotFoundError(f"❌ Carpeta no encontrada: {p}")
-    zips = list(p.glob("*.zip"))
     if not zips:
         raise FileNotFoundError(f"❌ No hay .zip en {p}")
-    return zips[0]          # primer zip
+    return zips[0].ruta     # primer zip
 
 
 
@@ -59,25 +64,9 @@ def detectar_carpeta_por_zip(base: str) -> Optional[str]:
     """Devuelve el nombre de la subcarpeta de `base` que contenga algún .zip,
     eligiendo la más reciente. Si hay .zip directamente en `base`, retorna "".
     Si no hay ningún .zip, retorna None."""
-    p = Path(base).expanduser().resolve()
-    if not p.is_dir():
-        return None
-
-    candidatos = []
-    for d in p.iterdir():
-        if d.is_dir():
-            zips = list(d.glob("*.zip"))
-            if zips:
-                latest = max(zips, key=lambda z: z.stat().st_mtime)
-                candidatos.append((latest.stat().st_mtime, d.name))
-    if candidatos:
-        candidatos.sort(reverse=True)
-        return candidatos[0][1]  # nombre de la subcarpeta
-
-    if list(p.glob("*.zip")):
-        return ""  # usar la base directamente
+    from compara_prg.services.descubrimiento import detectar_subcarpeta   # subcarpetas en paralelo
 
-    return None
+    return detectar_subcarpeta(Path(base).expanduser().resolve())
 
 
 
@@ -142,9 +131,98 @@ def infer_hours(results: Dict[str, dict]) -> List[str]:
 
     return [str(h) for h in sorted(horas)]
 
-@st.cache_data(show_spinner=False, max_entries=1)
+def _redondear(x: np.ndarray) -> np.ndarray:
+    """
+    Redondeo a entero “mitad lejos de cero” (igual que polars), limpiando antes el
+    ruido de punto flotante que dejan las sumas prefijas.
+    """
+    x = np.round(x, 6)
+    return np.sign(x) * np.floor(np.abs(x) + 0.5)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def cubo_categoria(_results: dict, results_id: str, cat_idx: int, hours_full: list[str]) -> CuboSoluciones | None:
+    """
+    Cubo (solución × central × hora) de una categoría de GENTABLES para todas
+    las soluciones del archivo. Se construye una vez por archivo de resultados
+    (`results_id`) y categoría; los deltas por par se calculan bajo demanda.
+    """
+    hours_full = [str(h) for h in hours_full]
+    tablas = {}
+    for sol, payload in _results.items():
+        gentables = payload.get("GENTABLES") if isinstance(payload, dict) else None
+        if gentables is None or cat_idx >= len(gentables):
+            continue
+        try:
+            df = normalize_hours(gentables[cat_idx], hours_full)
+        except Exception:
+            continue
+        tablas[sol] = coerce_schema(df, hours_full)
+    return construir_cubo(tablas, hours_full)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def cubo_tabla(_results: dict, results_id: str, clave: str, hours_full: list[str]) -> CuboSoluciones | None:
+    """
+    Cubo (solución × entidad × hora) de una tabla ancha por nombre ("CMG",
+    "COTAS", "BESS") para todas las soluciones del archivo.
+    """
+    hours_full = [str(h) for h in hours_full]
+    tablas = {}
+    for sol, payload in _results.items():
+        df = payload.get(clave) if isinstance(payload, dict) else None
+        if not isinstance(df, pl.DataFrame) or df.is_empty():
+            continue
+        if "Nombre_PLEXOS" not in df.columns and "Nombre" in df.columns:
+            df = df.rename({"Nombre": "Nombre_PLEXOS"})
+        try:
+            df = normalize_hours(df, hours_full)
+        except Exception:
+            continue
+        tablas[sol] = coerce_schema(df, hours_full)
+    return construir_cubo(tablas, hours_full)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def cubo_cmg(_results: dict, results_id: str, hours_full: list[str]) -> CuboCMG | None:
+    """
+    Cubo CMG (solución × nodo × hora, Float32) con índice de nodos para todas
+    las soluciones del archivo. Se construye una vez por archivo de resultados.
+    """
+    hours_full = [str(h) for h in hours_full]
+    tablas = {}
+    for sol, payload in _results.items():
+        df = payload.get("CMG") if isinstance(payload, dict) else None
+        if not isinstance(df, pl.DataFrame) or df.is_empty():
+            continue
+        try:
+            df = coerce_schema(normalize_hours(df, hours_full), hours_full)
+        except Exception:
+            continue
+        if "Nombre_PLEXOS" not in df.columns:
+            df = df.rename({df.columns[0]: "Nombre_PLEXOS"})
+        tablas[sol] = df
+    return construir_cubo_cmg(tablas, hours_full)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def cubo_perdidas(_results: dict, results_id: str) -> CuboPerdidas | None:
+    """
+    Pérdidas por línea (solución × línea × hora) de GENT["losses"], indexadas
+    una vez por archivo de resultados.
+    """
+    losses = {}
+    for sol, payload in _results.items():
+        gent = _coerce_gent_payload(payload.get("GENT")) if isinstance(payload, dict) else None
+        if gent and isinstance(gent.get("losses"), pl.DataFrame):
+            losses[sol] = gent["losses"]
+    return construir_cubo_perdidas(losses)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
 def prepara_datos(
     _results: dict,
+    results_id: str,
     sol_a: str,
     sol_b: str,
     thermal_idx: int,
@@ -156,119 +234,62 @@ def prepara_datos(
     - pivot_pd: tabla hora-a-hora (centrales x horas)
     - resumen_df: totales del día visible por central, ORDENADO por |Δ| desc
     - styles: estilos para la tabla coloreada
+
+    Los totales y diferencias salen del cubo de la categoría (ver `cubo_categoria`),
+    por lo que cambiar de ventana o de par no vuelve a unir las tablas.
     """
 
     # --- Normaliza horas a str (importante para selects y renames) ---
     hours_full = [str(h) for h in hours_full]
     hrs = [str(h) for h in hours]
 
-    # --- Carga tablas y fuerza esquema ---
-    try:
-        df1 = normalize_hours(_results[sol_a]["GENTABLES"][thermal_idx], hours_full)
-        df2 = normalize_hours(_results[sol_b]["GENTABLES"][thermal_idx], hours_full)
-    except Exception:
+    cubo = cubo_categoria(_results, results_id, thermal_idx, hours_full)
+    if cubo is None or sol_a not in cubo.soluciones or sol_b not in cubo.soluciones:
         return None, None, None
 
-    df1 = coerce_schema(df1, hours_full)
-    df2 = coerce_schema(df2, hours_full)
-
-    if (
-        df1 is None or df2 is None or df1.is_empty() or df2.is_empty()
-        or "Nombre_PLEXOS" not in df1.columns or "Nombre_PLEXOS" not in df2.columns
-    ):
+    pos = cubo.posiciones(hrs)
+    if len(pos) == 0:
         return None, None, None
-
-    # Asegura numérico y sin nulos en TODO el horizonte
-    df1 = df1.with_columns([pl.col(h).cast(pl.Float64).fill_null(0).alias(h) for h in hours_full])
-    df2 = df2.with_columns([pl.col(h).cast(pl.Float64).fill_null(0).alias(h) for h in hours_full])
+    hrs = [cubo.horas[p] for p in pos]
+    ia, ib = cubo.idx_sol(sol_a), cubo.idx_sol(sol_b)
 
     # =======================
     # (A) RESUMEN EN VENTANA
     # =======================
-    resumen_pl = (
-        df1.select("Nombre_PLEXOS", pl.sum_horizontal([pl.col(h) for h in hrs]).alias("Tot_1_win"))
-          .join(
-              df2.select("Nombre_PLEXOS", pl.sum_horizontal([pl.col(h) for h in hrs]).alias("Tot_2_win")),
-              on="Nombre_PLEXOS", how="inner"
-          )
-          .with_columns([
-              pl.col("Tot_1_win").round(0).cast(pl.Int64),
-              pl.col("Tot_2_win").round(0).cast(pl.Int64),
-              (pl.col("Tot_2_win") - pl.col("Tot_1_win")).round(0).cast(pl.Int64).alias("Δ Total"),
-          ])
-          .filter(
-              ((pl.col("Tot_1_win") != 0) & (pl.col("Tot_2_win") != 0) & (pl.col("Δ Total").abs() > 50))
-              | (pl.col("Tot_1_win") == 0) ^ (pl.col("Tot_2_win") == 0)
-          )
-          .select(["Nombre_PLEXOS", "Tot_1_win", "Tot_2_win", "Δ Total"])
-          .sort(pl.col("Δ Total").abs(), descending=True)   # 👈 orden mayor→menor por |Δ|
+    tot1 = cubo.suma_ventana(sol_a, pos)
+    tot2 = cubo.suma_ventana(sol_b, pos)
+    t1 = _redondear(tot1)
+    t2 = _redondear(tot2)
+    dt = _redondear(tot2 - tot1)
+
+    en_ambas = cubo.presente[ia] & cubo.presente[ib]
+    sel = en_ambas & (
+        ((t1 != 0) & (t2 != 0) & (np.abs(dt) > 50))
+        | ((t1 == 0) ^ (t2 == 0))
     )
-    if resumen_pl.is_empty():
+    idx_res = np.flatnonzero(sel)
+    if len(idx_res) == 0:
         return None, None, None
+    idx_res = idx_res[np.argsort(-np.abs(dt[idx_res]), kind="stable")]   # 👈 orden mayor→menor por |Δ|
 
     # ======================================
     # (B) DIFERENCIAS HORA-A-HORA (ventana)
     # ======================================
-    ren1 = {h: f"{h}_1" for h in hrs}
-    ren2 = {h: f"{h}_2" for h in hrs}
-
-    joined = (
-        df1.select(["Nombre_PLEXOS", *hrs]).rename(ren1)
-          .join(df2.select(["Nombre_PLEXOS", *hrs]).rename(ren2),
-                on="Nombre_PLEXOS", how="outer")  # outer para permitir on/off entre soluciones
-          .with_columns([
-              (pl.coalesce([pl.col(f"{h}_2"), pl.lit(0.0)]) -
-               pl.coalesce([pl.col(f"{h}_1"), pl.lit(0.0)])).alias(h)
-              for h in hrs
-          ])
-          .with_columns([
-              pl.when(pl.col(h).abs() < 1e-9).then(0.0).otherwise(pl.col(h)).alias(h)
-              for h in hrs
-          ])
-          .fill_null(0)
-    )
-
-    
+    diff = cubo.delta(sol_a, sol_b)[:, pos]
 
-    # filtra centrales con alguna |Δ| > th
-    diff_cols = hrs
-    centrales_ok = (
-        joined
-        .with_columns(pl.max_horizontal([pl.col(c).abs() for c in diff_cols]).alias("mx"))
-        .filter(pl.col("mx") > th)
-        .select("Nombre_PLEXOS")
-    )
-    if centrales_ok.is_empty():
+    # filtra centrales con alguna |Δ| > th, en el orden del resumen
+    sig = np.abs(diff).max(axis=1) > th
+    rows = idx_res[sig[idx_res]]
+    if len(rows) == 0:
         return None, None, None
 
-    # largo → ancho
-    long = (
-        joined
-        .filter(pl.col("Nombre_PLEXOS").is_in(centrales_ok.get_column("Nombre_PLEXOS").to_list()))
-        .unpivot(index="Nombre_PLEXOS", on=diff_cols, variable_name="Hora", value_name="Δ MWh")
-        .with_columns(pl.col("Hora").cast(pl.UInt16))
-        .filter(pl.col("Δ MWh") != 0)
+    nombres = [cubo.entidades[i] for i in rows]
+    hours_cols = [int(h) for h in hrs]
+    pivot_pd = pd.DataFrame(
+        diff[rows].astype(float),
+        index=pd.Index(nombres, name="Nombre_PLEXOS"),
+        columns=hours_cols,
     )
-    pivot_pl = long.pivot(values="Δ MWh", index="Nombre_PLEXOS", on="Hora").fill_null(0)
-
-    # --- pandas pivot (desde polars) ---
-    pivot_pd = pivot_pl.to_pandas().set_index("Nombre_PLEXOS")
-
-    # 1) Ordenar por el resumen, pero solo las que existen en el pivot
-    orden_resumen = resumen_pl.get_column("Nombre_PLEXOS").to_list()
-    orden = [n for n in orden_resumen if n in pivot_pd.index]
-    pivot_pd = pivot_pd.reindex(orden)
-
-    # 2) Quedarse solo con las horas visibles
-    pivot_pd.columns = pivot_pd.columns.astype(int)
-    pivot_pd = pivot_pd.reindex([int(h) for h in hrs], axis=1)
-
-        # 3) Filtrar filas sin diferencias significativas (NaN → 0 para evaluar)
-    mask_sig = (pivot_pd.fillna(0.0).abs() > th).any(axis=1)
-    pivot_pd = pivot_pd.loc[mask_sig].fillna(0.0).astype(float)
-
-    # Guarda las columnas de horas ANTES de agregar el total
-    hours_cols = list(pivot_pd.columns)  # típicamente [1..24] (ints)
 
     # ==========================
     # (D) COLUMNA TOTAL POR FILA
@@ -281,15 +302,8 @@ def prepara_datos(
     # (C) ESTILOS DE LA TABLA
     # ==========================
     # g1 = sol_a ; g2 = sol_b ; diff = g2 - g1 (usado solo para tolerancia)
-    g1 = joined.select([pl.col(f"{h}_1").fill_null(0) for h in hrs]).to_numpy()
-    g2 = joined.select([pl.col(f"{h}_2").fill_null(0) for h in hrs]).to_numpy()
-
-    # Alineamos con el orden/filtrado de pivot_pd
-    idx_map = {name: i for i, name in enumerate(joined.get_column("Nombre_PLEXOS").to_list())}
-    rows = [idx_map[n] for n in pivot_pd.index]
-
-    g1v = g1[rows]
-    g2v = g2[rows]
+    g1v = cubo.valores[ia][rows][:, pos]
+    g2v = cubo.valores[ib][rows][:, pos]
 
     # Tolerancia para “cero” e “igualdad”
     EPS = 0.5  # ajusta si lo necesitas más/menos estricto
@@ -304,13 +318,6 @@ def prepara_datos(
     rojo_oscuro = (g2v - g1v > EPS) & (np.abs(g1v) <= EPS)    # primero == 0
     rojo_opaco  = (g2v - g1v > EPS) & (np.abs(g1v) > EPS)     # primero != 0
 
-    # DataFrame de estilos para TODAS las columnas (horas + total), vacío por defecto
-    styles = pd.DataFrame("", index=pivot_pd.index, columns=pivot_pd.columns)
-
-    def _mask_to_df(mask_bool):
-        # Mapea las máscaras SOLO a las columnas de horas (coinciden en forma)
-        return pd.DataFrame(mask_bool, index=pivot_pd.index, columns=hours_cols)
-
     # Colores — MISMOS que ya usabas
     COL_GRIS      = "background-color:#D9D9D9;color:#333"     # ambos 0
     COL_CELESTE   = "background-color:#CFE2F3;color:#1E4F7B"  # iguales ≠ 0
@@ -319,14 +326,16 @@ def prepara_datos(
     COL_ROJO_OP   = "background-color:#FFCDD2;color:#6E0000"  # a<b, a≠0
     COL_ROJO_OSC  = "background-color:#E57373;color:#6E0000"  # a<b, a==0
 
-    # Aplica estilos a las HORAS sin tocar la columna total
-    styles.loc[:, hours_cols] = ""  # explícito
-    styles.loc[:, hours_cols] = styles.loc[:, hours_cols].mask(_mask_to_df(ambos_cero),      COL_GRIS)
-    styles.loc[:, hours_cols] = styles.loc[:, hours_cols].mask(_mask_to_df(iguales_no_cero), COL_CELESTE)
-    styles.loc[:, hours_cols] = styles.loc[:, hours_cols].mask(_mask_to_df(rojo_opaco),     COL_VERDE_OP)
-    styles.loc[:, hours_cols] = styles.loc[:, hours_cols].mask(_mask_to_df(rojo_oscuro),    COL_VERDE_OSC)
-    styles.loc[:, hours_cols] = styles.loc[:, hours_cols].mask(_mask_to_df(verde_opaco),      COL_ROJO_OP)
-    styles.loc[:, hours_cols] = styles.loc[:, hours_cols].mask(_mask_to_df(verde_oscuro),     COL_ROJO_OSC)
+    # Aplica estilos a las HORAS sin tocar la columna total (el último gana)
+    est = np.full(g1v.shape, "", dtype=object)
+    est[ambos_cero]      = COL_GRIS
+    est[iguales_no_cero] = COL_CELESTE
+    est[rojo_opaco]      = COL_VERDE_OP
+    est[rojo_oscuro]     = COL_VERDE_OSC
+    est[verde_opaco]     = COL_ROJO_OP
+    est[verde_oscuro]    = COL_ROJO_OSC
+
+    styles = pd.DataFrame(est, index=pivot_pd.index, columns=hours_cols)
 
     # (opcional) Si quieres colorear el total, descomenta uno de estos:
     # 1) Sin color (default): styles[total_col] = ""
@@ -338,10 +347,11 @@ def prepara_datos(
     )
 
     # pandas final: columnas con nombres claros
-    resumen_df = resumen_pl.to_pandas().rename(columns={
-        "Tot_1_win": f"Total {sol_a} (día)",
-        "Tot_2_win": f"Total {sol_b} (día)",
-        "Δ Total":   f"Δ Total ({sol_b} – {sol_a}) (día)"
+    resumen_df = pd.DataFrame({
+        "Nombre_PLEXOS": [cubo.entidades[i] for i in idx_res],
+        f"Total {sol_a} (día)": t1[idx_res].astype(np.int64),
+        f"Total {sol_b} (día)": t2[idx_res].astype(np.int64),
+        f"Δ Total ({sol_b} – {sol_a}) (día)": dt[idx_res].astype(np.int64),
     })
 
     return pivot_pd, resumen_df, styles
@@ -388,4 +398,21 @@ def coerce_schema(df: pl.DataFrame, hours_full: list[str], name_col: str = "Nomb
 
     # Último intento: convertir headers int->str
     ren = {c: str(c) for c in cols if isinstance(c, int)}
-    return df.rename(ren) if ren else df
\ No newline at end of file
+    return df.rename(ren) if ren else df
+
+
+def _coerce_gent_payload(gent_obj):
+    """
+    Normaliza GENT a {'tabla': DF, 'losses': DF} si viene como:
+      - dict {'tabla':..., 'losses':...}
+      - tuple (tabla, losses)
+      - DataFrame suelto (pickles antiguos, sin pérdidas por línea) → losses=None
+    Retorna dict o None.
+    """
+    if isinstance(gent_obj, dict) and "tabla" in gent_obj and "losses" in gent_obj:
+        return gent_obj
+    if isinstance(gent_obj, tuple) and len(gent_obj) == 2:
+        return {"tabla": gent_obj[0], "losses": gent_obj[1]}
+    if isinstance(gent_obj, pl.DataFrame):
+        return {"tabla": gent_obj, "losses": None}
+    return None
@@ -1,31 +1,100 @@
-import pandas as pd
+from typing import Dict, Optional, Tuple
+
+import numpy as np
 import polars as pl
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import streamlit as st
 
+# Sobre este número de series por solución se agrega (o se recorta al Top N)
+MAX_SERIES_BESS = 30
+
+# (nombres, horas, matriz nombres × horas)
+Serie = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Índices por archivo de resultados
+# ─────────────────────────────────────────────────────────────────────────────
+def _a_matriz(df: pl.DataFrame) -> Optional[Serie]:
+    """Tabla ancha (Nombre_PLEXOS + horas) o larga (Nombre_PLEXOS, Hora, Valor) → arreglos."""
+    if df is None or not isinstance(df, pl.DataFrame) or "Nombre_PLEXOS" not in df.columns:
+        return None
+    df = df.rename({c: str(c) for c in df.columns if not isinstance(c, str)})
+    if {"Hora", "Valor"}.issubset(df.columns):
+        df = (
+            df.with_columns(
+                pl.col("Hora").cast(pl.Int64, strict=False).cast(pl.Utf8),
+                pl.col("Valor").cast(pl.Float64, strict=False),
+            )
+            .pivot(on="Hora", index="Nombre_PLEXOS", values="Valor", aggregate_function="first")
+        )
+    hcols = sorted((c for c in df.columns if c.isdigit()), key=int)
+    if not hcols or df.is_empty():
+        return None
+    df = df.select(
+        pl.col("Nombre_PLEXOS").cast(pl.Utf8),
+        *[pl.col(c).cast(pl.Float64, strict=False) for c in hcols],
+    )
+    return (
+        df.get_column("Nombre_PLEXOS").to_numpy(),
+        np.array([int(c) for c in hcols], dtype=np.int64),
+        df.select(hcols).to_numpy(),
+    )
 
 
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _indice_perfil(_results: dict, results_id: str, sols: tuple) -> Dict[str, Dict[str, Optional[Serie]]]:
+    """
+    Por solución: BESS y CMG de nodos BAT_ como arreglos numpy. Se construye una
+    vez por archivo de resultados (results_id) y se reutiliza en cada rerun.
+    """
+    out = {}
+    for s in sols:
+        data = _results.get(s, {})
+        cmg = data.get("CMG")
+        if isinstance(cmg, pl.DataFrame) and "Nombre_PLEXOS" in cmg.columns:
+            cmg = cmg.filter(pl.col("Nombre_PLEXOS").cast(pl.Utf8).str.to_uppercase().str.starts_with("BAT_"))
+        out[s] = {"BESS": _a_matriz(data.get("BESS")), "CMG": _a_matriz(cmg)}
+    return out
+
+
+def _recortar(serie: Serie, h_ini: int, h_fin: int, nombres: Optional[list] = None) -> Optional[Serie]:
+    """Ventana horaria y (opcional) filtro por nombre, sin copiar más de lo necesario."""
+    if serie is None:
+        return None
+    n, h, m = serie
+    mh = (h >= h_ini) & (h <= h_fin)
+    mf = np.isin(n, nombres) if nombres else np.ones(len(n), dtype=bool)
+    if not mh.any() or not mf.any():
+        return None
+    return n[mf], h[mh], m[np.ix_(mf, mh)]
+
+
+def _top(serie: Serie, k: int) -> Serie:
+    """Las k series con mayor Σ|valor| (orden original preservado)."""
+    n, h, m = serie
+    if len(n) <= k:
+        return serie
+    peso = np.nansum(np.abs(m), axis=1)
+    keep = np.sort(np.argsort(-peso, kind="stable")[:k])
+    return n[keep], h, m[keep]
 
-def bat_perfil(results,SOLUTIONS ):
-
-    # --- helpers ---
-    def _get_bess_df(sol):
-        df = results.get(sol, {}).get("BESS")
-        if df is None:
-            return None
-        return df.to_pandas() if isinstance(df, pl.DataFrame) else df
 
-    def _hour_cols(df):
-        # columnas que son horas (números) en BESS
-        return [c for c in df.columns if c != "Nombre_PLEXOS" and str(c).isdigit()]
+def bat_perfil(results,SOLUTIONS ):
 
     # Soluciones que traen BESS
-    sols_with_bess = [s for s in SOLUTIONS if _get_bess_df(s) is not None]
+    sols_with_bess = [s for s in SOLUTIONS if results.get(s, {}).get("BESS") is not None]
     if not sols_with_bess:
         st.info("No hay datos de BESS en los resultados cargados.")
         st.stop()
 
+    idx = _indice_perfil(
+        results,
+        str(st.session_state.get("DATA_PATH", "default")),
+        tuple(SOLUTIONS),
+    )
+
     st.subheader("Perfil de BESS")
 
     # ====== FILTROS (en página) ======
@@ -49,17 +118,11 @@ def bat_perfil(results,SOLUTIONS ):
             sel_pair   = st.selectbox("Comparación de soluciones (BESS)", pair_labels, index=0, key="bess_pair")
             solA, solB = pair_options[pair_labels.index(sel_pair)]
 
-            # Etiquetas dinámicas
-            labelA = solA
-            labelB = solB
-
-
         # Baterías disponibles según soluciones elegidas
         all_bess = set()
         for sol in [solA, solB]:
-            dfp = _get_bess_df(sol) 
-            if dfp is not None and "Nombre_PLEXOS" in dfp.columns:
-                all_bess |= set(dfp["Nombre_PLEXOS"].astype(str).unique().tolist())
+            if idx[sol]["BESS"] is not None:
+                all_bess |= set(idx[sol]["BESS"][0].tolist())
         all_bess = sorted(all_bess)
 
         with c2:
@@ -73,9 +136,8 @@ def bat_perfil(results,SOLUTIONS ):
         # rango de horas (default: primeras 48)
         hours_union = set()
         for sol in [solA, solB]:
-            dfp = _get_bess_df(sol) 
-            if dfp is not None:
-                hours_union |= set(int(str(c)) for c in _hour_cols(dfp))
+            if idx[sol]["BESS"] is not None:
+                hours_union |= set(idx[sol]["BESS"][1].tolist())
         if not hours_union:
             st.info("No se detectaron columnas de horas en BESS.")
             st.stop()
@@ -89,120 +151,82 @@ def bat_perfil(results,SOLUTIONS ):
             step=1,
         )
 
-    if not [solA, solB]:
-        st.info("Selecciona al menos una solución.")
-        st.stop()
+        n_sel = len(sel_bess) if sel_bess else len(all_bess)
+        modo = st.radio(
+            "Modo",
+            ("Individual", "Agregado"),
+            index=0 if n_sel <= MAX_SERIES_BESS else 1,
+            horizontal=True,
+            help=f"Con más de {MAX_SERIES_BESS} baterías, 'Individual' muestra solo las "
+                 f"{MAX_SERIES_BESS} de mayor Σ|MW|; 'Agregado' muestra la suma BESS y la "
+                 "media CMG BAT_ por solución.",
+            key="bess_modo",
+        )
 
-    # ---- Construir DF largo (BESS) ----
-    long_list = []
-    for s in [solA, solB]:
-        dfp = _get_bess_df(s)
-        if dfp is None:
-            continue
-        dfp = dfp.copy()
-        dfp["Nombre_PLEXOS"] = dfp["Nombre_PLEXOS"].astype(str)
-        hcols = _hour_cols(dfp)
-        if not hcols:
-            continue
-        hkeep = [c for c in hcols if hr_ini <= int(str(c)) <= hr_fin]
-        if not hkeep:
-            continue
-        sub = dfp[["Nombre_PLEXOS"] + hkeep]
-        if sel_bess:
-            sub = sub[sub["Nombre_PLEXOS"].isin(sel_bess)]
-        if sub.empty:
-            continue
-        long = sub.melt(id_vars="Nombre_PLEXOS", var_name="Hora", value_name="Valor")
-        long["Hora"] = long["Hora"].astype(int)
-        long["Solución"] = s
-        long_list.append(long)
+    # ---- Series recortadas (arreglos) ----
+    bess = {s: _recortar(idx[s]["BESS"], hr_ini, hr_fin, sel_bess) for s in [solA, solB]}
+    cmg  = {s: _recortar(idx[s]["CMG"],  hr_ini, hr_fin) for s in [solA, solB]}
 
-    if not long_list:
+    if all(v is None for v in bess.values()):
         st.info("No hay datos de BESS que coincidan con los filtros actuales.")
         st.stop()
 
-    long_df = pd.concat(long_list, ignore_index=True)
-
     # ============== GRÁFICO ==================
     fig = make_subplots(specs=[[{"secondary_y": True}]])
     bess_traces = 0
     cmg_traces = 0
+    recortado = False
 
-    # --- PERFIL BESS (eje primario) ---
-    for (bess_name, sol), g in long_df.groupby(["Nombre_PLEXOS", "Solución"]):
-        g = g.sort_values("Hora")
-        fig.add_trace(
-            go.Scatter(
-                x=g["Hora"], y=g["Valor"],
-                mode="lines",
-                name=f"{bess_name} ({sol})"
-            ),
-            secondary_y=False,
-        )
-        bess_traces += 1
-
-    # --- CMG nodos BAT_* (eje secundario) ---
     for sol in [solA, solB]:
-        cmg = results.get(sol, {}).get("CMG")
-        if cmg is None:
-            continue
-        cmg = cmg.to_pandas() if isinstance(cmg, pl.DataFrame) else cmg
-        if cmg is None or "Nombre_PLEXOS" not in cmg.columns:
-            continue
-
-        # Detectar forma: largo (Hora, Valor) o ancho (5..49)
-        cols_set = set(map(str, cmg.columns))
-        is_long = {"Hora", "Valor"}.issubset(cols_set)
-
-        if is_long:
-            # ---- LARGO: filtrar BAT_, rango de horas y trazar por nodo ----
-            cmg_bat = cmg[cmg["Nombre_PLEXOS"].astype(str).str.upper().str.startswith("BAT_")]
-            if cmg_bat.empty:
-                continue
-            cmg_bat = cmg_bat[(cmg_bat["Hora"] >= hr_ini) & (cmg_bat["Hora"] <= hr_fin)]
-            for nodo, serie in cmg_bat.groupby("Nombre_PLEXOS"):
-                y = pd.to_numeric(serie["Valor"], errors="coerce")
-                if y.notna().any():
+        # --- PERFIL BESS (eje primario) ---
+        serie = bess[sol]
+        if serie is not None:
+            n, h, m = serie
+            if modo == "Agregado":
+                fig.add_trace(
+                    go.Scatter(x=h, y=np.nansum(m, axis=0), mode="lines",
+                               name=f"Σ BESS ({len(n)}) ({sol})"),
+                    secondary_y=False,
+                )
+                bess_traces += 1
+            else:
+                recortado |= len(n) > MAX_SERIES_BESS
+                n, h, m = _top(serie, MAX_SERIES_BESS)
+                for i in np.argsort(n, kind="stable"):
                     fig.add_trace(
-                        go.Scatter(
-                            x=serie["Hora"], y=y,
-                            mode="lines",
-                            name=f"CMG {nodo} ({sol})",
-                            line=dict(dash="dot", width=1.5),
-                        ),
-                        secondary_y=True,
+                        go.Scatter(x=h, y=m[i], mode="lines", name=f"{n[i]} ({sol})"),
+                        secondary_y=False,
                     )
-                    cmg_traces += 1
+                    bess_traces += 1
+
+        # --- CMG nodos BAT_* (eje secundario) ---
+        serie = cmg[sol]
+        if serie is None:
+            continue
+        n, h, m = serie
+        validas = ~np.all(np.isnan(m), axis=1)
+        n, m = n[validas], m[validas]
+        if not len(n):
+            continue
+        if modo == "Agregado":
+            fig.add_trace(
+                go.Scatter(x=h, y=np.nanmean(m, axis=0), mode="lines",
+                           name=f"CMG BAT_ media ({sol})",
+                           line=dict(dash="dot", width=1.5)),
+                secondary_y=True,
+            )
+            cmg_traces += 1
         else:
-            # ---- ANCHO: filas por nodo, columnas por horas (5..49) ----
-            cmg_bat = cmg[cmg["Nombre_PLEXOS"].astype(str).str.upper().str.startswith("BAT_")]
-            if cmg_bat.empty:
-                continue
-
-            hour_cols = [c for c in cmg_bat.columns if str(c).isdigit()]
-            if not hour_cols:
-                continue
-            hour_map = {c: int(str(c)) for c in hour_cols}
-            in_range = [c for c in hour_cols if hr_ini <= hour_map[c] <= hr_fin]
-            if not in_range:
-                continue
-            in_range = sorted(in_range, key=lambda c: hour_map[c])
-
-            for _, row in cmg_bat.iterrows():
-                nodo = row["Nombre_PLEXOS"]
-                x = [hour_map[c] for c in in_range]
-                y = pd.to_numeric(row[in_range], errors="coerce").values
-                if pd.notna(y).any():
-                    fig.add_trace(
-                        go.Scatter(
-                            x=x, y=y,
-                            mode="lines",
-                            name=f"CMG {nodo} ({sol})",
-                            line=dict(dash="dot", width=1.5),
-                        ),
-                        secondary_y=True,
-                    )
-                    cmg_traces += 1
+            recortado |= len(n) > MAX_SERIES_BESS
+            n, h, m = _top((n, h, m), MAX_SERIES_BESS)
+            for i in range(len(n)):
+                fig.add_trace(
+                    go.Scatter(x=h, y=m[i], mode="lines",
+                               name=f"CMG {n[i]} ({sol})",
+                               line=dict(dash="dot", width=1.5)),
+                    secondary_y=True,
+                )
+                cmg_traces += 1
 
     # Layout
     fig.update_layout(
@@ -218,5 +242,7 @@ def bat_perfil(results,SOLUTIONS ):
         st.warning("No se agregaron series. Revisa filtros de horas/baterías o las soluciones.")
     elif cmg_traces == 0:
         st.info("No se encontraron nodos CMG que empiecen por 'BAT_' en las soluciones seleccionadas.")
+    if recortado:
+        st.caption(f"Mostrando las {MAX_SERIES_BESS} series de mayor Σ|valor| por solución; usa 'Agregado' para verlas todas.")
 
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    st.plotly_chart(fig, use_container_width=True)
@@ -1,91 +1,167 @@
+import warnings
+import numpy as np
 import pandas as pd
+import polars as pl
 from pathlib import Path
+from typing import Dict, Optional, Tuple
 import plotly.graph_objects as go
 import streamlit as st
 
-from compara_prg.io.query_base import query_read_base
 from compara_prg.config import _data_intermedia, DEFAULT_NAME_BASE
+from compara_prg.io.topologia import LAT_MIN, LAT_MAX, LON_MIN, LON_MAX
+from compara_prg.io.topologia import cargar_topologia as cargar_topologia_persistida
+from compara_prg.services.ranking import top_filas
+from compara_prg.utils.funciones import cubo_cmg, cubo_perdidas
+
+COLOR_LINEA_BASE = "#B0B6BE"
+# Paleta secuencial para las clases de valor de línea (de menor a mayor |valor|)
+COLORES_CLASE = ["#FEE391", "#FEC44F", "#FE9929", "#EC7014", "#CC4C02", "#8C2D04"]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Topología (nodos + líneas con coordenadas)
+# ─────────────────────────────────────────────────────────────────────────────
+def _xml_base() -> Path:
+    return _data_intermedia / DEFAULT_NAME_BASE
+
 
-# 👇 importante: el decorador cachea el resultado
 @st.cache_data(show_spinner="Cargando nodos y líneas...")
-def grafico_chile():
-    PATH_TO_BASE = str(_data_intermedia / DEFAULT_NAME_BASE)  # pasar a str, no Path
-    db, collections, attributes, classes = query_read_base(PATH_TO_BASE)
-
-    # Nodos
-    rows = []
-    for nod in db.GetChildMembers(collections['SystemNodes'], 'SEN'):
-        lat = db.GetAttributeValue(classes['Node'], nod, attributes['Node.Latitude'], 0)[1]
-        lon = db.GetAttributeValue(classes['Node'], nod, attributes['Node.Longitude'], 0)[1]
-        rows.append({"Nodo": nod, "Lat": float(lat) if lat else None, "Lon": float(lon) if lon else None})
-    df_nodes = pd.DataFrame(rows).drop_duplicates(subset=["Nodo"]).reset_index(drop=True)
-
-    # Líneas
-    def parse_mships_line(mships, col_nodo):
-        rows = []
-        for mem in mships:
-            op1 = mem.find('('); cp1 = mem.find(')')
-            op2 = mem.find('(', op1+1); cp2 = mem.find(')', op2+1)
-            linea = mem[op1+2:cp1-1]
-            nodo  = mem[op2+2:cp2-1]
-            rows.append({"Linea": linea, col_nodo: nodo})
-        return pd.DataFrame(rows)
-
-    mships_from = db.GetMemberships(collections['LineNodeFrom'])
-    mships_to   = db.GetMemberships(collections['LineNodeTo'])
-
-    df_from = parse_mships_line(mships_from, "NodoFrom")
-    df_to   = parse_mships_line(mships_to,   "NodoTo")
-
-    df_lines = (
-        pd.merge(df_from, df_to, on="Linea", how="outer")
-        .dropna(subset=["NodoFrom","NodoTo"], how="any")
-        .drop_duplicates(subset=["Linea","NodoFrom","NodoTo"])
-        .reset_index(drop=True)
-    )
+def _topologia_cacheada(xml_path: str, mtime_ns: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # mtime en la clave: si cambia el XML se vuelve a consultar el Parquet
+    return cargar_topologia_persistida(Path(xml_path))
 
-    # Juntar con coordenadas
-    LAT_MIN, LAT_MAX = -56, -17
-    LON_MIN, LON_MAX = -76, -66
 
-    df_from_xy = df_lines.merge(
-        df_nodes.rename(columns={"Nodo": "NodoFrom", "Lat": "LatFrom", "Lon": "LonFrom"}),
-        on="NodoFrom", how="left"
-    )
-    df_lines_xy = df_from_xy.merge(
-        df_nodes.rename(columns={"Nodo": "NodoTo", "Lat": "LatTo", "Lon": "LonTo"}),
-        on="NodoTo", how="left"
-    ).dropna(subset=["LatFrom","LonFrom","LatTo","LonTo"])
+def cargar_topologia() -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Nodos (Nodo, Lat, Lon) y líneas (Linea, NodoFrom, NodoTo, Lat/Lon From/To)
+    del SEN, recortados a la caja de Chile continental. Se leen de la topología
+    persistida (ver io.topologia); la API PLEXOS solo se usa si cambió el XML.
+    """
+    xml = _xml_base()
+    return _topologia_cacheada(str(xml), xml.stat().st_mtime_ns)
+
 
-    df_lines_xy = df_lines_xy.query(
-        "@LAT_MIN <= LatFrom <= @LAT_MAX and @LON_MIN <= LonFrom <= @LON_MAX and \
-         @LAT_MIN <= LatTo   <= @LAT_MAX and @LON_MIN <= LonTo   <= @LON_MAX"
-    ).reset_index(drop=True)
+# ─────────────────────────────────────────────────────────────────────────────
+# Figura (número de trazas constante)
+# ─────────────────────────────────────────────────────────────────────────────
+def _segmentos(df_lines: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Lon/lat de todas las líneas en un solo arreglo, separadas por NaN."""
+    n = len(df_lines)
+    lon = np.full(3 * n, np.nan)
+    lat = np.full(3 * n, np.nan)
+    lon[0::3] = df_lines["LonFrom"].to_numpy(dtype=float)
+    lon[1::3] = df_lines["LonTo"].to_numpy(dtype=float)
+    lat[0::3] = df_lines["LatFrom"].to_numpy(dtype=float)
+    lat[1::3] = df_lines["LatTo"].to_numpy(dtype=float)
+    return lon, lat
 
-    df_nodes_cl = df_nodes.dropna().query(
-        "@LAT_MIN <= Lat <= @LAT_MAX and @LON_MIN <= Lon <= @LON_MAX"
-    ).reset_index(drop=True)
 
-    # Figura
+def _clases(valores: np.ndarray, n_clases: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Clase (0..k-1) de cada |valor| por cuantiles; -1 para líneas sin dato."""
+    abs_v = np.abs(valores)
+    ok = ~np.isnan(abs_v)
+    clase = np.full(len(valores), -1, dtype=np.int64)
+    if not ok.any():
+        return clase, np.array([])
+    bordes = np.unique(np.quantile(abs_v[ok], np.linspace(0, 1, n_clases + 1)))
+    if len(bordes) < 2:
+        clase[ok] = 0
+        return clase, np.array([bordes[0], bordes[0]])
+    clase[ok] = np.clip(np.searchsorted(bordes, abs_v[ok], side="right") - 1, 0, len(bordes) - 2)
+    return clase, bordes
+
+
+def figura_red(
+    df_nodes: pd.DataFrame,
+    df_lines: pd.DataFrame,
+    valores_linea: Optional[Dict[str, float]] = None,
+    valores_nodo: Optional[Dict[str, float]] = None,
+    etiqueta_linea: str = "",
+    etiqueta_nodo: str = "",
+    n_clases: int = 5,
+) -> go.Figure:
+    """
+    Mapa de la red con una traza por clase de línea + capa de hover + nodos.
+
+    Args:
+        df_nodes (DataFrame): Nodo, Lat, Lon
+        df_lines (DataFrame): Linea, NodoFrom, NodoTo, LatFrom, LonFrom, LatTo, LonTo
+        valores_linea (dict): {línea: valor} para colorear líneas (flujo, pérdidas…)
+        valores_nodo (dict): {nodo: valor} para colorear nodos (CMG)
+        etiqueta_linea (str): nombre/unidad del valor de línea (hover y leyenda)
+        etiqueta_nodo (str): nombre/unidad del valor de nodo (hover y barra de color)
+        n_clases (int): número de clases de valor de línea
+
+    Returns:
+        go.Figure
+    """
     fig = go.Figure()
 
-    for _, row in df_lines_xy.iterrows():
+    v_linea = (
+        df_lines["Linea"].map(valores_linea).to_numpy(dtype=float)
+        if valores_linea else np.full(len(df_lines), np.nan)
+    )
+    clase, bordes = _clases(v_linea, min(n_clases, len(COLORES_CLASE)))
+
+    # Líneas: una traza por clase (sin dato = gris base)
+    for k in range(-1, max(len(bordes) - 1, 0)):
+        sel = df_lines[clase == k]
+        if sel.empty:
+            continue
+        lon, lat = _segmentos(sel)
+        if k < 0:
+            color, ancho, nombre = COLOR_LINEA_BASE, 1.5, "Sin dato" if valores_linea else "Líneas"
+        else:
+            color, ancho = COLORES_CLASE[k], 1.5 + k
+            nombre = f"{bordes[k]:,.1f} – {bordes[k + 1]:,.1f}"
         fig.add_trace(go.Scattergeo(
-            lon=[row["LonFrom"], row["LonTo"]],
-            lat=[row["LatFrom"], row["LatTo"]],
+            lon=lon, lat=lat,
             mode="lines",
-            line=dict(width=2, color="#B0B6BE"),
-            customdata=[[row["Linea"], row["NodoFrom"], row["NodoTo"]]],
-            hovertemplate="<b>%{customdata[0]}</b><br>From: %{customdata[1]}<br>To: %{customdata[2]}<extra></extra>",
-            showlegend=False,
+            line=dict(width=ancho, color=color),
+            hoverinfo="skip",
+            name=nombre,
+            showlegend=bool(valores_linea),
+            legendgroup="lineas",
+            legendgrouptitle_text=etiqueta_linea or None,
         ))
 
+    # Hover de líneas: un marcador invisible en el punto medio de cada línea
+    custom = np.column_stack([
+        df_lines["Linea"].to_numpy(), df_lines["NodoFrom"].to_numpy(),
+        df_lines["NodoTo"].to_numpy(), v_linea,
+    ])
+    hover_val = f"<br>{etiqueta_linea}: %{{customdata[3]:,.2f}}" if valores_linea else ""
     fig.add_trace(go.Scattergeo(
-        lon=df_nodes_cl["Lon"], lat=df_nodes_cl["Lat"],
-        text=df_nodes_cl["Nodo"],
+        lon=(df_lines["LonFrom"].to_numpy(dtype=float) + df_lines["LonTo"].to_numpy(dtype=float)) / 2,
+        lat=(df_lines["LatFrom"].to_numpy(dtype=float) + df_lines["LatTo"].to_numpy(dtype=float)) / 2,
         mode="markers",
-        marker=dict(size=5, color="#1F6FEB", line=dict(width=0.5, color="white"), opacity=0.95),
-        hovertemplate="Nodo: %{text}<br>Lat: %{lat:.4f}<br>Lon: %{lon:.4f}<extra></extra>",
+        marker=dict(size=8, opacity=0),
+        customdata=custom,
+        hovertemplate="<b>%{customdata[0]}</b><br>From: %{customdata[1]}<br>To: %{customdata[2]}"
+                      + hover_val + "<extra></extra>",
+        showlegend=False,
+    ))
+
+    # Nodos (coloreados por valor si se entrega)
+    if valores_nodo:
+        v_nodo = df_nodes["Nodo"].map(valores_nodo).to_numpy(dtype=float)
+        marker = dict(
+            size=6, color=v_nodo, colorscale="Viridis", showscale=True,
+            colorbar=dict(title=etiqueta_nodo, thickness=12, len=0.5),
+            line=dict(width=0.5, color="white"), opacity=0.95,
+        )
+        custom_n = v_nodo
+        hover_n = f"<br>{etiqueta_nodo}: %{{customdata:,.2f}}"
+    else:
+        marker = dict(size=5, color="#1F6FEB", line=dict(width=0.5, color="white"), opacity=0.95)
+        custom_n, hover_n = None, ""
+    fig.add_trace(go.Scattergeo(
+        lon=df_nodes["Lon"], lat=df_nodes["Lat"],
+        text=df_nodes["Nodo"],
+        customdata=custom_n,
+        mode="markers",
+        marker=marker,
+        hovertemplate="Nodo: %{text}<br>Lat: %{lat:.4f}<br>Lon: %{lon:.4f}" + hover_n + "<extra></extra>",
         showlegend=False,
     ))
 
@@ -101,8 +177,223 @@ def grafico_chile():
             lataxis=dict(range=[LAT_MIN, LAT_MAX]),
             fitbounds="locations"
         ),
+        legend=dict(x=0.01, y=0.99, bgcolor="rgba(255,255,255,0.8)"),
         margin=dict(l=20, r=20, t=60, b=20),
         height=1000, width=700,
     )
 
     return fig
+
+
+@st.cache_data(show_spinner="Cargando nodos y líneas...")
+def grafico_chile():
+    """Mapa base de la red (sin valores)."""
+    df_nodes, df_lines = cargar_topologia()
+    return figura_red(df_nodes, df_lines)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Valores desde los resultados cargados
+# ─────────────────────────────────────────────────────────────────────────────
+def _valores_hora_ancha(df: Optional[pl.DataFrame], hora: str) -> Dict[str, float]:
+    """{Nombre_PLEXOS: valor} de una tabla ancha (columnas = horas) para una hora."""
+    if df is None or not isinstance(df, pl.DataFrame) or "Nombre_PLEXOS" not in df.columns:
+        return {}
+    df = df.rename({c: str(c) for c in df.columns if isinstance(c, int)})
+    if hora not in df.columns:
+        return {}
+    sub = df.select("Nombre_PLEXOS", pl.col(hora).cast(pl.Float64, strict=False)).drop_nulls()
+    return dict(zip(sub["Nombre_PLEXOS"].to_list(), sub[hora].to_list()))
+
+
+def valores_linea(results: dict, sol: str, variable: str, hora: str) -> Dict[str, float]:
+    """Valores por línea para una solución/hora: 'Flujo' (FLUJOS) o 'Pérdidas' (GENT.losses)."""
+    data = results.get(sol, {})
+    if variable == "Flujo":
+        return _valores_hora_ancha(data.get("FLUJOS"), hora)
+    if variable == "Pérdidas":
+        cubo = cubo_perdidas(results, str(st.session_state.get("DATA_PATH", "default")))
+        if cubo is None or sol not in cubo.soluciones:
+            return {}
+        return cubo.valores_hora(sol, int(hora))
+    return {}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Vista Streamlit
+# ─────────────────────────────────────────────────────────────────────────────
+def mostrar_red_chile(results: dict, SOLUTIONS, HOURS_FULL):
+    """Mapa de la red con flujos/pérdidas por línea y CMG por nodo para una hora."""
+    df_nodes, df_lines = cargar_topologia()
+
+    if not results or not SOLUTIONS:
+        st.plotly_chart(figura_red(df_nodes, df_lines), use_container_width=True)
+        return
+
+    c1, c2, c3, c4 = st.columns([1, 1, 1, 1])
+    with c1:
+        sol = st.selectbox("Solución", list(SOLUTIONS), key="red_sol")
+    with c2:
+        hora = st.select_slider("Hora", options=[str(h) for h in HOURS_FULL], key="red_hora")
+    with c3:
+        var_linea = st.selectbox("Color líneas", ["—", "Flujo", "Pérdidas"], key="red_var_linea")
+    with c4:
+        color_nodos = st.checkbox("CMG en nodos", value=True, key="red_cmg")
+
+    v_linea = valores_linea(results, sol, var_linea, hora) if var_linea != "—" else None
+    v_nodo = _valores_hora_ancha(results.get(sol, {}).get("CMG"), hora) if color_nodos else None
+
+    if var_linea != "—" and not v_linea:
+        st.info(f"La solución {sol} no tiene datos de '{var_linea}' para la hora {hora}.")
+
+    unidad = {"Flujo": "Flujo [MW]", "Pérdidas": "Pérdidas [MW]"}.get(var_linea, "")
+    fig = figura_red(
+        df_nodes, df_lines,
+        valores_linea=v_linea or None,
+        valores_nodo=v_nodo or None,
+        etiqueta_linea=unidad,
+        etiqueta_nodo="CMG [USD/MWh]",
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Diferencias de CMG entre dos soluciones (mapa por hora)
+# ─────────────────────────────────────────────────────────────────────────────
+def _nodos_en_cubo(df_nodes: pd.DataFrame, cubo) -> Tuple[np.ndarray, pd.DataFrame]:
+    """Filas del cubo CMG de los nodos con coordenadas, y esos nodos (mismo orden)."""
+    sel = df_nodes[df_nodes["Nodo"].isin(cubo.idx_nodo.keys())].reset_index(drop=True)
+    return cubo.filas(sel["Nodo"].tolist()), sel
+
+
+def figura_diferencias_cmg(
+    df_nodes: pd.DataFrame,
+    df_lines: pd.DataFrame,
+    cubo,
+    sol_a: str,
+    sol_b: str,
+) -> go.Figure:
+    """
+    Mapa WebGL (Scattergl) con la diferencia CMG(sol_b) − CMG(sol_a) por nodo.
+
+    El arreglo (nodo × hora) del par sale del cubo una sola vez; cada hora es un
+    frame que sólo reemplaza el color de la capa de nodos, así el slider recorre
+    las horas en el navegador sin volver a ejecutar la página.
+
+    Args:
+        df_nodes (DataFrame): Nodo, Lat, Lon
+        df_lines (DataFrame): líneas con coordenadas de extremos (fondo gris)
+        cubo (CuboCMG): cubo CMG del archivo
+        sol_a (str): solución base
+        sol_b (str): solución comparada
+
+    Returns:
+        go.Figure
+    """
+    filas, nodos = _nodos_en_cubo(df_nodes, cubo)
+    dif = cubo.diferencia(sol_a, sol_b)[filas]                       # (n, H)
+    finitos = np.abs(dif[np.isfinite(dif)])
+    lim = float(np.percentile(finitos, 99)) if finitos.size else 1.0
+    lim = lim or 1.0
+    horas = cubo.horas
+
+    lon, lat = _segmentos(df_lines)
+    capa_nodos = dict(
+        size=7, color=dif[:, 0], colorscale="RdBu_r", cmin=-lim, cmax=lim,
+        colorbar=dict(title=f"Δ CMG [USD/MWh]<br>{sol_b} − {sol_a}", thickness=12, len=0.5),
+        line=dict(width=0.5, color="#555"),
+    )
+    fig = go.Figure([
+        go.Scattergl(x=lon, y=lat, mode="lines", line=dict(width=1, color=COLOR_LINEA_BASE),
+                     hoverinfo="skip", showlegend=False),
+        go.Scattergl(
+            x=nodos["Lon"], y=nodos["Lat"], text=nodos["Nodo"], mode="markers", marker=capa_nodos,
+            hovertemplate="Nodo: %{text}<br>Δ CMG: %{marker.color:,.2f}<extra></extra>",
+            showlegend=False,
+        ),
+    ])
+
+    fig.frames = [
+        go.Frame(name=h, data=[go.Scattergl(marker=dict(color=dif[:, k]))], traces=[1])
+        for k, h in enumerate(horas)
+    ]
+    paso = dict(mode="immediate", frame=dict(duration=0, redraw=True), transition=dict(duration=0))
+    fig.update_layout(
+        title=f"<b>Δ CMG {sol_b} − {sol_a}</b>",
+        xaxis=dict(range=[LON_MIN, LON_MAX], visible=False),
+        yaxis=dict(range=[LAT_MIN, LAT_MAX], visible=False, scaleanchor="x", scaleratio=1),
+        plot_bgcolor="#F8F9FA",
+        margin=dict(l=20, r=20, t=60, b=20),
+        height=1000, width=700,
+        sliders=[dict(
+            active=0, currentvalue=dict(prefix="Hora: "), pad=dict(t=30),
+            steps=[dict(label=h, method="animate", args=[[h], paso]) for h in horas],
+        )],
+        updatemenus=[dict(
+            type="buttons", direction="left", x=0.0, y=0.0, xanchor="left", yanchor="top",
+            buttons=[
+                dict(label="▶", method="animate",
+                     args=[None, dict(paso, frame=dict(duration=400, redraw=True), fromcurrent=True)]),
+                dict(label="❚❚", method="animate", args=[[None], paso]),
+            ],
+        )],
+    )
+    return fig
+
+
+def mostrar_diferencias_cmg(results: dict, SOLUTIONS, HOURS_FULL):
+    """Dónde se separan los precios entre dos soluciones (p. ej. PID vs PCP), hora a hora."""
+    st.subheader("Diferencias de CMG sobre la red")
+    results_id = str(st.session_state.get("DATA_PATH", "default"))
+    cubo = cubo_cmg(results, results_id, HOURS_FULL)
+    sols = [s for s in SOLUTIONS if cubo is not None and s in cubo.soluciones]
+    if len(sols) < 2:
+        st.info("Se necesitan al menos 2 soluciones con CMG para comparar.")
+        return
+
+    ref = next((s for s in sols if s.startswith("PCP")), sols[0])
+    otra = next(s for s in sols if s != ref)
+    c1, c2, c3 = st.columns([1, 1, 1])
+    with c1:
+        sol_a = st.selectbox("Solución base", sols, index=sols.index(ref), key="dcmg_a")
+    with c2:
+        sol_b = st.selectbox("Solución comparada", sols, index=sols.index(otra), key="dcmg_b")
+    with c3:
+        umbral = st.number_input("Umbral |Δ| [USD/MWh]", min_value=0.0, value=5.0, step=1.0, key="dcmg_umbral")
+    if sol_a == sol_b:
+        st.info("Elige dos soluciones distintas.")
+        return
+
+    df_nodes, df_lines = cargar_topologia()
+    filas, nodos = _nodos_en_cubo(df_nodes, cubo)
+    if len(filas) == 0:
+        st.warning("Ningún nodo del CMG tiene coordenadas en la topología.")
+        return
+    sin_coord = len(cubo.nodos) - len(filas)
+    if sin_coord:
+        st.caption(f"{sin_coord} nodos del CMG no tienen coordenadas y no se dibujan.")
+
+    st.plotly_chart(figura_diferencias_cmg(df_nodes, df_lines, cubo, sol_a, sol_b), use_container_width=False)
+
+    # Resumen del par sobre el mismo arreglo (nodo × hora)
+    dif = cubo.diferencia(sol_a, sol_b)[filas]
+    dif = np.where(np.isfinite(dif), dif, np.nan)
+    abs_dif = np.abs(dif)
+    # Horas / nodos sin ningún valor quedan en NaN (sin avisos de "All-NaN slice")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        por_hora = pd.DataFrame({
+            "Hora": [int(h) for h in cubo.horas],
+            f"Nodos con |Δ| > {umbral:g}": (abs_dif > umbral).sum(axis=0),
+            "Máx |Δ|": np.nanmax(abs_dif, axis=0),
+        })
+        media = np.nanmean(dif, axis=1)
+    st.markdown("**Separación por hora**")
+    st.line_chart(por_hora, x="Hora")
+
+    idx = [i for i in top_filas(media, 15, "abs") if np.isfinite(media[i])]
+    st.markdown("**Nodos con mayor Δ medio**")
+    st.dataframe(
+        pd.DataFrame({"Nodo": nodos["Nodo"].to_numpy()[idx], "Δ medio [USD/MWh]": media[idx]}),
+        hide_index=True, use_container_width=True,
+    )
@@ -10,10 +10,16 @@ import plotly.graph_objects as go
 from pathlib import Path
 import streamlit as st
 import streamlit.components.v1 as components
-from compara_prg.utils.funciones import normalize_hours, prepara_datos, coerce_schema
+from compara_prg.utils.funciones import normalize_hours, prepara_datos, coerce_schema, _coerce_gent_payload, cubo_categoria, cubo_tabla, cubo_cmg, cubo_perdidas
 import re, json
 # al inicio del archivo:
-from compara_prg.config import COMMENTS_DIR
+from compara_prg.config import COMMENTS_DIR, FILAS_POR_PAGINA, NODO_REFERENCIA_CMG
+from compara_prg.viz.tabla_html import html_tabla_coloreada
+from compara_prg.services.drilldown import consultar_solucion, soluciones_consultables
+from compara_prg.services.ranking import top_filas
+from compara_prg.services.rollups import rollup
+from compara_prg.services.costos import CLAVE_COSTOS, PROPIEDADES_COSTO, PROPIEDAD_TOTAL, comparar_costos, payload_costos
+from compara_prg.services.flujos import CLAVE_FLUJOS, CLAVE_LIMITES, carga_lineas, cubo_flujos, nombres_politica, ranking_desvios, resumen_congestion
 
 def persistent_multiselect(label, options, key):
     import streamlit as st
@@ -97,9 +103,19 @@ def mostrar_totales_por_categoria(results, SOLUTIONS, HOURS_FULL,
             st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)
             continue
 
+        # Agregados precalculados (ROLLUPS): si todas las soluciones los traen,
+        # la lista de centrales y el total sin filtro no tocan las tablas crudas
+        rollups = {s: rollup(results, s, "central_dia") for s in sols}
+        con_rollups = all(r is not None for r in rollups.values())
+
         # Universo de centrales (normaliza/valida)
         centrales_sets = []
         for s in sols:
+            if con_rollups:
+                nombres = rollups[s].filter(pl.col("Categoria") == category).get_column("Nombre_PLEXOS")
+                if not nombres.is_empty():
+                    centrales_sets.append(set(nombres.cast(pl.Utf8).to_list()))
+                continue
             df_cat = normalize_hours(results[s]["GENTABLES"][cat_idx], HOURS_FULL)
             df_cat = coerce_schema(df_cat, HOURS_FULL)
             if df_cat is None or df_cat.is_empty() or "Nombre_PLEXOS" not in df_cat.columns:
@@ -134,19 +150,26 @@ def mostrar_totales_por_categoria(results, SOLUTIONS, HOURS_FULL,
         # -------------- Gráfico --------------
         fig = go.Figure()
         for i, sol in enumerate(sols):
-            df = normalize_hours(results[sol]["GENTABLES"][cat_idx], HOURS_FULL)
-            df = coerce_schema(df, HOURS_FULL)
-            if df is None or df.is_empty() or "Nombre_PLEXOS" not in df.columns:
-                continue
-            if seleccion:
-                df = df.filter(pl.col("Nombre_PLEXOS").is_in(seleccion))
-            if df.is_empty():
-                continue
+            tot = rollup(results, sol, "categoria_hora") if not seleccion else None
+            if tot is not None:
+                tot = tot.filter(pl.col("Categoria") == category).sort("Hora")
+                if tot.is_empty():
+                    continue
+                x, y = tot.get_column("Hora").to_numpy(), tot.get_column("Valor").to_numpy()
+            else:
+                df = normalize_hours(results[sol]["GENTABLES"][cat_idx], HOURS_FULL)
+                df = coerce_schema(df, HOURS_FULL)
+                if df is None or df.is_empty() or "Nombre_PLEXOS" not in df.columns:
+                    continue
+                if seleccion:
+                    df = df.filter(pl.col("Nombre_PLEXOS").cast(pl.Utf8).is_in(seleccion))
+                if df.is_empty():
+                    continue
+                x, y = HOURS_INT, df.select(HOURS_FULL).sum().to_numpy().ravel()
 
-            y = df.select(HOURS_FULL).sum().to_numpy().ravel()
             fig.add_trace(
                 go.Scatter(
-                    x=HOURS_INT, y=y,
+                    x=x, y=y,
                     mode="lines+markers",
                     name=sol,
                     line=dict(color=COLOR[i % len(COLOR)], width=2),
@@ -192,59 +215,88 @@ def mostrar_cmg_nodo(
 ) -> None:
 
     st.subheader("Comparación CMG por nodo")
-
-    available_solutions = [s for s in solutions if "CMG" in results.get(s, {})]
-    if not available_solutions:
+    results_id = str(st.session_state.get("DATA_PATH", "default"))
+
+    # Cubo (solución × nodo × hora): se arma una vez por archivo; cada nodo es un slice
+    cubo = cubo_cmg(results, results_id, hours_full)
+    available_solutions = [s for s in solutions if cubo is not None and s in cubo.soluciones]
+    # Soluciones cuyo zip original sigue accesible: permiten consultar nodos no pre-extraídos
+    data_path = st.session_state.get("DATA_PATH")
+    consultables = soluciones_consultables(data_path) if data_path else []
+    consultables = [s for s in solutions if s in consultables]
+    if not available_solutions and not consultables:
         st.warning("El archivo no contiene CMG para ninguna solución.")
         st.stop()
 
-    # --- NUEVO: normalizar el CMG base para listar nodos
-    cmg0 = coerce_schema(results[available_solutions[0]]["CMG"], hours_full)
-    if cmg0 is None or cmg0.is_empty():
-        st.warning("CMG vacío.")
-        st.stop()
-
-    name_col = "Nombre_PLEXOS"
-    if name_col not in cmg0.columns:
-        # Último recurso: usa la primera columna como nombre
-        name_col = cmg0.columns[0]
-
-    node_list = cmg0.get_column(name_col).to_list()
-    nodes_sorted = sorted(node_list)
-
-    default_node = "Quillota220"
-    default_index = nodes_sorted.index(default_node) if default_node in nodes_sorted else 0
+    nodes_sorted = sorted(cubo.nodos) if cubo is not None else []
+    nodos: list[str] = []
+    if nodes_sorted:
+        default = [NODO_REFERENCIA_CMG] if NODO_REFERENCIA_CMG in cubo.idx_nodo else nodes_sorted[:1]
+        nodos = st.multiselect("Nodos", nodes_sorted, default=default, key="nodes_cmg")
+
+    otro = ""
+    if consultables:
+        otro = st.text_input(
+            "Otro nodo (consulta directa a la solución)",
+            key="node_drill",
+            placeholder="Nombre PLEXOS, p. ej. Quillota220",
+            help="Se consulta sólo este nodo en los .zip originales: "
+                 + ", ".join(consultables),
+        ).strip()
+        if otro and otro not in nodos:
+            nodos = nodos + [otro]
+    if not nodos:
+        st.info("Elige uno o más nodos (o escribe un nodo para consultarlo en la solución).")
+        return
 
-    node = st.selectbox("Nodo", nodes_sorted, index=default_index, key="node")
+    hay_ref = cubo is not None and NODO_REFERENCIA_CMG in cubo.idx_nodo
+    metricas = ["CMG"] + ([f"Spread vs {NODO_REFERENCIA_CMG}"] if hay_ref else [])
+    metrica = st.radio("Métrica", metricas, horizontal=True, key="cmg_metrica")
+    es_spread = metrica != "CMG"
+    datos = cubo.spread() if es_spread else (cubo.valores if cubo is not None else None)
+    x_cubo = [int(h) for h in cubo.horas] if cubo is not None else []
 
-    # Gráfico
+    # Gráfico: color por solución, trazo por nodo
+    dashes = ["solid", "dash", "dot", "dashdot", "longdash", "longdashdot"]
     fig = go.Figure()
-    for i, sol in enumerate(available_solutions):
-        df = normalize_hours(results[sol]["CMG"], hours_full)
-        df = coerce_schema(df, hours_full)
-        if df is None or df.is_empty():
-            continue
-        col_nom = "Nombre_PLEXOS" if "Nombre_PLEXOS" in df.columns else df.columns[0]
-        df_row = df.filter(pl.col(col_nom) == node)
-        if df_row.is_empty():
-            continue
-        y = df_row.select(hours_full).to_numpy().ravel()
-        fig.add_trace(
-            go.Scatter(
-                x=hours_int,
-                y=y,
-                mode="lines+markers",
-                name=sol,
-                line=dict(color=color_palette[i % len(color_palette)], width=2),
+    for i, sol in enumerate(s for s in solutions if s in available_solutions or s in consultables):
+        for j, node in enumerate(nodos):
+            x = y = None
+            if sol in available_solutions and node in cubo.idx_nodo:
+                y = datos[cubo.idx_sol(sol), cubo.idx_nodo[node]]
+                if np.isnan(y).all():
+                    y = None
+                else:
+                    x = x_cubo
+            if y is None and sol in consultables and not es_spread:
+                try:
+                    with st.spinner(f"Consultando {node} en {sol}…"):
+                        serie = consultar_solucion(data_path, sol, "Nodes", "Price", [node])
+                except Exception as e:
+                    st.warning(f"{sol}: no se pudo consultar '{node}' en la solución ({e}).")
+                    continue
+                if not serie.is_empty():
+                    x, y = serie.get_column("Hora").to_numpy(), serie.get_column("Valor").to_numpy()
+            if y is None:
+                continue
+            fig.add_trace(
+                go.Scatter(
+                    x=x,
+                    y=y,
+                    mode="lines+markers" if len(nodos) == 1 else "lines",
+                    name=sol if len(nodos) == 1 else f"{sol} · {node}",
+                    line=dict(color=color_palette[i % len(color_palette)], width=2,
+                              dash=dashes[j % len(dashes)]),
+                )
             )
-        )
 
     if not fig.data:
-        st.info(f"No se encontró el nodo '{node}' en las soluciones elegidas.")
+        st.info(f"No se encontraron los nodos elegidos en las soluciones: {', '.join(nodos)}.")
         return
 
+    titulo = ", ".join(nodos) if len(nodos) <= 3 else f"{len(nodos)} nodos"
     fig.update_layout(
-        title=f"CMG — {node}",
+        title=f"{metrica} — {titulo}",
         xaxis=dict(title="Hora", range=[min_h, min_h+47],
                    dtick=1, rangeslider=dict(visible=True)),
         yaxis_title="USD/MWh",
@@ -253,9 +305,83 @@ def mostrar_cmg_nodo(
     )
     st.plotly_chart(fig, use_container_width=True)
 
+    if cubo is None:
+        return
+    en_cubo = [n for n in nodos if n in cubo.idx_nodo]
+    if en_cubo:
+        st.markdown("**Resumen por nodo** (promedio, punta, fuera de punta y spread medio)")
+        st.dataframe(
+            cubo.resumen(en_cubo).filter(pl.col("Solución").is_in(available_solutions)),
+            use_container_width=True, hide_index=True,
+        )
+
+    with st.expander("Mapa de calor (nodo × hora)"):
+        c1, c2 = st.columns([1, 1])
+        with c1:
+            sol_hm = st.selectbox("Solución", available_solutions, key="cmg_hm_sol")
+        with c2:
+            alcance = st.radio("Nodos", ["Seleccionados", "Todos"], horizontal=True, key="cmg_hm_alcance")
+        filas = cubo.filas(en_cubo) if alcance == "Seleccionados" else np.arange(len(cubo.nodos))
+        if len(filas) == 0:
+            st.info("Ninguno de los nodos elegidos está en el archivo.")
+            return
+        z = datos[cubo.idx_sol(sol_hm)][filas]
+        fig_hm = go.Figure(go.Heatmap(
+            z=z, x=x_cubo, y=[cubo.nodos[k] for k in filas],
+            colorscale="RdBu_r" if es_spread else "Viridis",
+            zmid=0 if es_spread else None,
+            colorbar=dict(title="USD/MWh"),
+        ))
+        fig_hm.update_layout(
+            title=f"{metrica} — {sol_hm}",
+            xaxis_title="Hora",
+            height=max(300, min(1200, 18 * len(filas))),
+            template="simple_white",
+        )
+        st.plotly_chart(fig_hm, use_container_width=True)
+
 
 
 
+@st.fragment
+def _comentario_termicas(comentario_path: Path):
+    """
+    Comentario persistente del análisis de térmicas. Corre como fragmento: editar
+    o guardar el comentario no vuelve a ejecutar la tabla ni el resumen.
+    """
+    st.subheader("¿Deseas incluir un comentario?")
+    if "edit_comentario" not in st.session_state:
+        st.session_state["edit_comentario"] = False
+
+    comentario_inicial = comentario_path.read_text(encoding="utf-8").strip() if comentario_path.exists() else ""
+
+    if comentario_inicial and not st.session_state["edit_comentario"]:
+        st.markdown("### Comentario actual:")
+        st.markdown(
+            f"""
+            <div style='background-color:#eaf4fc; padding: 12px 16px; border-radius: 8px; font-size: 0.92rem; white-space: pre-line;'>
+            {comentario_inicial}
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
+        if st.button("✏️ Editar comentario"):
+            st.session_state["edit_comentario"] = True
+            st.rerun(scope="fragment")
+    else:
+        with st.form("form_comentario_termicas"):
+            comentario = st.text_area(
+                "Comentario (análisis de térmicas)",
+                value=comentario_inicial,
+                height=150,
+            )
+            if st.form_submit_button("Guardar comentario"):
+                comentario_path.write_text(comentario.strip(), encoding="utf-8")
+                st.session_state["edit_comentario"] = False
+                st.success("Comentario guardado correctamente ✅")
+                st.rerun(scope="fragment")
+
+
 def mostrar_analisis_termicas(
     results,
     SOLUTIONS,
@@ -318,6 +444,7 @@ def mostrar_analisis_termicas(
     # -----------------------------
     pivot_pd, resumen_pd, styles_pd = prepara_datos(
         _results=results,
+        results_id=str(st.session_state.get("DATA_PATH", "default")),
         sol_a=sol1,
         sol_b=sol2,
         thermal_idx=THERMAL_IDX,
@@ -327,38 +454,7 @@ def mostrar_analisis_termicas(
     )
 
     nombre_resultado = Path(st.session_state.get("DATA_PATH", "default")).stem
-    comentario_path  = COMMENTS_DIR / f"comentario_termicas__{nombre_resultado}.txt"
-
-    st.subheader("¿Deseas incluir un comentario?")
-    if "edit_comentario" not in st.session_state:
-        st.session_state["edit_comentario"] = False
-
-    comentario_inicial = comentario_path.read_text(encoding="utf-8").strip() if comentario_path.exists() else ""
-
-    if comentario_inicial and not st.session_state["edit_comentario"]:
-        st.markdown("### Comentario actual:")
-        st.markdown(
-            f"""
-            <div style='background-color:#eaf4fc; padding: 12px 16px; border-radius: 8px; font-size: 0.92rem; white-space: pre-line;'>
-            {comentario_inicial}
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
-        if st.button("✏️ Editar comentario"):
-            st.session_state["edit_comentario"] = True
-    else:
-        with st.form("form_comentario_termicas"):
-            comentario = st.text_area(
-                "Comentario (análisis de térmicas)",
-                value=comentario_inicial,
-                height=150,
-            )
-            if st.form_submit_button("Guardar comentario"):
-                comentario_path.write_text(comentario.strip(), encoding="utf-8")
-                st.session_state["edit_comentario"] = False
-                st.success("Comentario guardado correctamente ✅")
-                st.rerun()
+    _comentario_termicas(COMMENTS_DIR / f"comentario_termicas__{nombre_resultado}.txt")
 
     if pivot_pd is None:
         st.info("No se detectaron cambios significativos.")
@@ -369,80 +465,37 @@ def mostrar_analisis_termicas(
     # -----------------------------
     st.subheader("Diferencias hora-a-hora – tabla coloreada")
 
-    styled = (
-        pivot_pd.style
-        .set_properties(**{"text-align": "center"})
-        .apply(lambda _: styles_pd, axis=None)
-        .format(precision=0, na_rep="")
+    # Vista por ventanas: solo viajan al navegador las filas/horas visibles
+    filas, columnas = None, None
+    paginar = st.toggle("Vista por ventanas (tablas grandes)", value=False, key="termicas_paginar")
+    if paginar:
+        p1, p2 = st.columns([1, 2])
+        n_paginas = max(1, -(-len(pivot_pd) // FILAS_POR_PAGINA))
+        with p1:
+            pagina = st.number_input("Página", min_value=1, max_value=n_paginas, value=1, step=1)
+        with p2:
+            horas_cols = [c for c in pivot_pd.columns if c != "Δ Total fila"]
+            if len(horas_cols) > 1:
+                c_ini, c_fin = st.select_slider(
+                    "Horas visibles", options=horas_cols,
+                    value=(horas_cols[0], horas_cols[min(23, len(horas_cols) - 1)]),
+                )
+            else:
+                c_ini = c_fin = horas_cols[0]
+        i0 = (pagina - 1) * FILAS_POR_PAGINA
+        filas = slice(i0, i0 + FILAS_POR_PAGINA)
+        columnas = horas_cols[horas_cols.index(c_ini): horas_cols.index(c_fin) + 1] + ["Δ Total fila"]
+        st.caption(f"Filas {i0 + 1}–{min(i0 + FILAS_POR_PAGINA, len(pivot_pd))} de {len(pivot_pd)}")
+
+    iframe_html, height_px = html_tabla_coloreada(
+        key=(str(st.session_state.get("DATA_PATH", "default")), sol1, sol2, h1, h2, THRESHOLD),
+        pivot_pd=pivot_pd,
+        styles_pd=styles_pd,
+        filas=filas,
+        columnas=columnas,
     )
-
-    # Altura y ancho mínimo para forzar overflow-x
-    height_px            = 80 + 28 * len(pivot_pd)      # ≈28 px por fila
-    tabla_min_width_px   = 220 + 28 * len(hours_range)  # 220 1ª col + 28 por hora
     extra_scrollbar_space = 24
 
-
-
-    css_iframe = f"""
-    <style>
-    html, body {{ margin:0; overflow:hidden; }}   /* sin barra del iframe */
-    .resp-wrap {{
-      width: 100%;
-      overflow-x: auto;
-      overflow-y: hidden;
-      border: 1px solid #ddd;
-      padding: 6px 6px 10px 6px;
-      -webkit-overflow-scrolling: touch;
-      scrollbar-gutter: stable both-edges;
-    }}
-    .styled-table {{
-      width: max-content;
-      min-width: {tabla_min_width_px}px;  /* asegura desborde horizontal */
-      table-layout: fixed;
-      border-collapse: collapse;
-      font-family: 'Segoe UI', sans-serif;
-      font-size: 10px;
-    }}
-    .styled-table, .styled-table * {{ box-sizing: border-box; }}
-    .styled-table th, .styled-table td {{
-      padding: 2px 3px; text-align: center; white-space: nowrap;
-    }}
-    /* Header pegado arriba */
-    .styled-table th {{ position: sticky; top: 0; z-index: 5; background: #f4f4f4; }}
-    /* Primera columna pegada + esquina superior izquierda */
-    .styled-table th:first-child, .styled-table td:first-child {{ width: 220px; text-align: left; }}
-    .styled-table td:first-child {{
-      position: sticky; left: 0; z-index: 4;
-      background: #fff0f0;   /* color destacado */
-    }}
-    .styled-table th:first-child {{
-      position: sticky; top: 0; left: 0; z-index: 6;
-      background: #ffe0e0;   /* color header fijo */
-      box-shadow: 1px 0 0 #ddd;
-    }}
-    /* Columnas de horas */
-    .styled-table th:not(:first-child), .styled-table td:not(:first-child) {{ width: 28px; }}
-    .styled-table thead th:not(:first-child) {{
-      writing-mode: vertical-rl; transform: rotate(180deg);
-      white-space: nowrap; height: 90px; padding: 6px 0;
-    }}
-    /* Zebra/hover opcionales */
-    .styled-table tbody tr:nth-child(even) td {{ background: #fafafa; }}
-    .styled-table tbody tr:nth-child(even) td:first-child {{ background: #f0e0e0; }}
-    .styled-table tbody tr:hover td {{ background: #f9fbff; }}
-    .styled-table tbody tr:hover td:first-child {{ background: #ffdede; }}
-    .styled-table td {{ letter-spacing: 0.2px; }}
-    </style>
-    """
-
-
-    iframe_html = f"""
-    {css_iframe}
-    <div class="resp-wrap">
-      {styled.to_html(classes="styled-table")}
-    </div>
-    """
-
     components.html(
         iframe_html,
         height=height_px + extra_scrollbar_space,
@@ -474,22 +527,259 @@ def mostrar_analisis_termicas(
             step=5,
         )
 
-    df_show = resumen_pd.copy()
-    if orden_sel == "Mayor |Δ|":
-        df_show = df_show.reindex(df_show[diff_col].abs().sort_values(ascending=False).index)
-    elif orden_sel == "Mayor Δ":
-        df_show = df_show.sort_values(diff_col, ascending=False)
+    # Top-N con heap: no se ordena el resumen completo en cada rerun
+    orden = {"Mayor |Δ|": "abs", "Mayor Δ": "desc", "Menor Δ": "asc"}[orden_sel]
+    idx = top_filas(resumen_pd[diff_col].to_numpy(), int(top_n), orden)
+    st.dataframe(resumen_pd.iloc[idx], use_container_width=True)
+
+
+
+
+
+
+
+def mostrar_comparacion_n(
+    results: dict,
+    solutions: list[str],
+    hours_full: list[str],
+    category_labels: list[str],
+) -> None:
+    """
+    Todas las soluciones contra una referencia (p. ej. PCP vs PID1..PID9):
+    qué entidades se desvían más, en cuántas soluciones y con qué dispersión.
+    Sale del cubo de la tabla elegida en una sola pasada.
+    """
+    st.subheader("Comparación de N soluciones contra una referencia")
+    results_id = str(st.session_state.get("DATA_PATH", "default"))
+
+    opciones = [f"GENTABLES · {c}" for c in category_labels] + ["CMG", "COTAS", "BESS", "FLUJOS"]
+    c1, c2, c3 = st.columns([2, 1, 1])
+    with c1:
+        tabla_sel = st.selectbox("Tabla", opciones, index=min(2, len(opciones) - 1), key="n_tabla")
+    if tabla_sel.startswith("GENTABLES"):
+        cubo = cubo_categoria(results, results_id, opciones.index(tabla_sel), hours_full)
     else:
-        df_show = df_show.sort_values(diff_col, ascending=True)
+        cubo = cubo_tabla(results, results_id, tabla_sel, hours_full)
+    if cubo is None or len(cubo.soluciones) < 2:
+        st.info("Se necesitan al menos 2 soluciones con esta tabla para comparar.")
+        return
+
+    sols = [s for s in solutions if s in cubo.soluciones]
+    ref_default = next((s for s in sols if s.startswith("PCP")), sols[0])
+    with c2:
+        referencia = st.selectbox("Referencia", sols, index=sols.index(ref_default), key="n_ref")
+    with c3:
+        umbral = st.number_input("Umbral |Δ| total", min_value=0.0, value=50.0, step=10.0, key="n_umbral")
+
+    horas_int = [int(h) for h in cubo.horas]
+    h1, h2 = st.slider(
+        "Rango horario", min_value=min(horas_int), max_value=max(horas_int),
+        value=(min(horas_int), min(min(horas_int) + 23, max(horas_int))), key="n_rango",
+    )
+    pos = cubo.posiciones([str(h) for h in range(h1, h2 + 1)])
+    if len(pos) == 0:
+        st.warning("El rango seleccionado no existe en los datos cargados.")
+        return
+
+    comp = cubo.comparar(referencia, pos, umbral)
+    tabla = comp.tabla()
+    if tabla.is_empty():
+        st.info(f"Ninguna entidad supera |Δ| > {umbral:g} en ninguna solución.")
+        return
+
+    # Con pocas entidades sobre el umbral no hay nada que recortar
+    if tabla.height > 5:
+        top_n = st.number_input("Top N", min_value=5, max_value=tabla.height,
+                                value=min(30, tabla.height), step=5, key="n_top")
+        tabla = tabla.head(int(top_n))
+
+    # Mapa de calor: entidad × solución (Δ total vs referencia)
+    delta_cols = [f"Δ {s}" for s in comp.soluciones]
+    z = tabla.select(delta_cols).to_numpy()
+    lim = float(np.abs(z).max()) or 1.0
+    fig = go.Figure(go.Heatmap(
+        z=z, x=comp.soluciones, y=tabla.get_column("Nombre_PLEXOS").to_list(),
+        colorscale="RdBu_r", zmin=-lim, zmax=lim, colorbar=dict(title="Δ total"),
+        hovertemplate="%{y}<br>%{x}: %{z:,.1f}<extra></extra>",
+    ))
+    fig.update_layout(
+        height=max(300, 22 * tabla.height + 120),
+        yaxis=dict(autorange="reversed"),
+        margin=dict(l=10, r=10, t=30, b=10),
+        title=f"Δ total ({h1}–{h2}) vs {referencia}",
+    )
+    st.plotly_chart(fig, use_container_width=True)
 
-    st.dataframe(df_show.head(top_n), use_container_width=True)
+    num_cols = [c for c in tabla.columns if c not in ("Nombre_PLEXOS", "Solución más desviada", "N° soluciones desviadas")]
+    st.dataframe(
+        tabla.with_columns(pl.col(num_cols).round(1)).to_pandas(),
+        use_container_width=True, hide_index=True,
+    )
 
 
+def mostrar_flujos(
+    results: dict,
+    solutions: list[str],
+    hours_full: list[str],
+    color_palette: list[str],
+) -> None:
+    """
+    Flujo por línea (FLUJOS) de las soluciones, con límites, horas de congestión
+    y ranking de las líneas cuyo flujo más se desvía de la referencia.
+    """
+    st.subheader("Flujos por línea y congestión")
+    sols = [s for s in solutions if isinstance(results.get(s, {}).get(CLAVE_FLUJOS), pl.DataFrame)]
+    if not sols:
+        st.warning("El archivo no contiene flujos por línea (FLUJOS) para ninguna solución.")
+        return
+    politica = nombres_politica()
+    etiqueta = lambda n: f"{politica[n]} ({n})" if n in politica and politica[n] != n else n
+
+    cubo = cubo_flujos({s: results[s] for s in sols}, hours_full)
+    horas_int = [int(h) for h in cubo.horas]
+    c1, c2 = st.columns([1, 2])
+    with c1:
+        ref_default = next((s for s in sols if s.startswith("PCP")), sols[0])
+        referencia = st.selectbox("Referencia", sols, index=sols.index(ref_default), key="fl_ref")
+    with c2:
+        h1, h2 = st.slider(
+            "Rango horario", min_value=min(horas_int), max_value=max(horas_int),
+            value=(min(horas_int), max(horas_int)), key="fl_rango",
+        )
+    pos = cubo.posiciones([str(h) for h in range(h1, h2 + 1)])
+
+    ranking = ranking_desvios(cubo, referencia, pos, k=20) if len(sols) > 1 else pl.DataFrame()
+    if not ranking.is_empty():
+        st.markdown(f"**Líneas con mayor desvío de flujo vs {referencia}**")
+        st.dataframe(ranking, use_container_width=True, hide_index=True)
+
+    # Líneas a graficar: por defecto las más desviadas
+    por_defecto = list(dict.fromkeys(ranking["Nombre_PLEXOS"].to_list()))[:3] if not ranking.is_empty() else cubo.entidades[:1]
+    lineas = st.multiselect("Líneas", sorted(cubo.entidades), default=por_defecto,
+                            format_func=etiqueta, key="fl_lineas")
+    for linea in lineas:
+        e = cubo.entidades.index(linea)
+        fig = go.Figure()
+        for i, sol in enumerate(sols):
+            s = cubo.idx_sol(sol)
+            if not cubo.presente[s, e]:
+                continue
+            fig.add_trace(go.Scatter(
+                x=horas_int, y=cubo.valores[s, e], mode="lines", name=sol,
+                line=dict(color=color_palette[i % len(color_palette)], width=2),
+            ))
+        lim = results[referencia].get(CLAVE_LIMITES)
+        if isinstance(lim, pl.DataFrame) and not lim.is_empty():
+            lim = lim.filter(pl.col("Nombre_PLEXOS").cast(pl.Utf8) == linea).sort("Hora")
+            for col, signo in (("Export", 1), ("Import", -1)):
+                if col in lim.columns and not lim.is_empty():
+                    fig.add_trace(go.Scatter(
+                        x=lim["Hora"].to_list(), y=(lim[col] * signo).to_list(), mode="lines",
+                        name=f"Límite {col.lower()} ({referencia})",
+                        line=dict(color="#999999", width=1, dash="dash"),
+                    ))
+        fig.update_layout(
+            title=f"Flujo — {etiqueta(linea)}",
+            xaxis=dict(title="Hora", range=[h1, h2]),
+            yaxis_title="MW",
+            template="simple_white",
+            height=340,
+        )
+        st.plotly_chart(fig, use_container_width=True)
 
+    st.markdown("**Congestión por solución**")
+    sol_c = st.selectbox("Solución", sols, key="fl_sol_cong")
+    carga = carga_lineas(results[sol_c][CLAVE_FLUJOS], results[sol_c].get(CLAVE_LIMITES))
+    if carga is None:
+        st.info(f"{sol_c}: sin límites de líneas; no se puede calcular la carga.")
+        return
+    carga = carga.filter(pl.col("Hora").is_between(h1, h2))
+    resumen = resumen_congestion(carga)
+    st.dataframe(
+        resumen.with_columns(pl.col("Nombre_PLEXOS").map_elements(etiqueta, return_dtype=pl.Utf8)),
+        use_container_width=True, hide_index=True,
+    )
 
 
 
 
+def mostrar_costos(
+    results: dict,
+    solutions: list[str],
+    hours_full: list[str],
+    color_palette: list[str],
+) -> None:
+    """
+    Costos de generación (GENC): evolución horaria y totales de sistema por
+    solución, y centrales que explican la diferencia contra la referencia.
+    """
+    st.subheader("Costos de generación")
+    genc = {s: payload_costos(results.get(s, {}).get(CLAVE_COSTOS)) for s in solutions}
+    sols = [s for s, g in genc.items() if g and isinstance(g.get("tabla"), pl.DataFrame)]
+    if not sols:
+        st.warning("El archivo no contiene costos de generación (GENC) para ninguna solución.")
+        return
+
+    horas_int = [int(h) for h in hours_full]
+    etiquetas = list(PROPIEDADES_COSTO.values())
+    c1, c2, c3 = st.columns([1, 1, 2])
+    with c1:
+        ref_default = next((s for s in sols if s.startswith("PCP")), sols[0])
+        referencia = st.selectbox("Referencia", sols, index=sols.index(ref_default), key="gc_ref")
+    with c2:
+        propiedad = st.selectbox("Costo", etiquetas, index=etiquetas.index(PROPIEDAD_TOTAL), key="gc_prop")
+    with c3:
+        h1, h2 = st.slider(
+            "Rango horario", min_value=min(horas_int), max_value=max(horas_int),
+            value=(min(horas_int), max(horas_int)), key="gc_rango",
+        )
+
+    # ---- Evolución horaria (tabla de sistema)
+    fig = go.Figure()
+    for i, sol in enumerate(sols):
+        tabla = genc[sol]["tabla"]
+        fila = tabla.filter(pl.col("Propiedad") == propiedad)
+        if fila.is_empty():
+            continue
+        horas = [c for c in tabla.columns if str(c).isdigit() and h1 <= int(c) <= h2]
+        fig.add_trace(go.Scatter(
+            x=[int(h) for h in horas], y=fila.select(horas).row(0), mode="lines", name=sol,
+            line=dict(color=color_palette[i % len(color_palette)], width=2),
+        ))
+    fig.update_layout(
+        title=f"{propiedad} — sistema", xaxis_title="Hora", yaxis_title="kUSD",
+        template="simple_white", height=360,
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    # ---- Totales y Δ por central (requiere el detalle por central)
+    con_detalle = [s for s in sols if genc[s].get("detalle") is not None]
+    if referencia not in con_detalle:
+        st.info(f"{referencia}: archivo sin detalle de costos por central.")
+        return
+    totales, deltas = comparar_costos(results, con_detalle, referencia, propiedad, horas=(h1, h2))
+
+    st.markdown("**Totales del sistema [kUSD]**")
+    st.dataframe(
+        totales.with_columns(pl.col("Solución").cast(pl.Utf8), pl.col("Propiedad").cast(pl.Utf8))
+        .pivot(values="Costo", index="Propiedad", on="Solución"),
+        use_container_width=True, hide_index=True,
+    )
+
+    otras = [s for s in con_detalle if s != referencia]
+    if not otras:
+        return
+    pos = st.selectbox("Comparar contra la referencia", otras, key="gc_pos")
+    col = f"Δ {pos}"
+    idx = top_filas(deltas[col].to_list(), k=20, orden="abs")
+    st.markdown(f"**Centrales con mayor Δ de {propiedad.lower()} ({pos} − {referencia})**")
+    st.caption(f"Δ total: {deltas[col].sum():,.1f} kUSD")
+    st.dataframe(
+        deltas[idx].select("Nombre_PLEXOS", referencia, pos, col),
+        use_container_width=True, hide_index=True,
+    )
+
+
 def mostrar_totales_sistema(
     results: dict,
     solutions: list[str],
@@ -596,37 +886,16 @@ def mostrar_totales_sistema(
     # =========================
     st.subheader("Pérdidas por línea – comparación entre soluciones")
 
-    # Reúne el universo de líneas disponibles en las soluciones seleccionadas
-    all_lines = set()
-    for sol in sel:
-        gent = _coerce_gent_payload(results[sol]["GENT"])
-        df = gent.get("losses", None)
-        if df is not None and _looks_like_polars_df(df) and not df.is_empty() and "Nombre_PLEXOS" in df.columns:
-            try:
-                all_lines |= set(df.get_column("Nombre_PLEXOS").unique().to_list())
-            except Exception:
-                pass
-    all_lines = sorted(all_lines)
+    # Pérdidas indexadas (solución × línea × hora): una vez por archivo, cada línea es un slice
+    cubo = cubo_perdidas(results, str(st.session_state.get("DATA_PATH", "default")))
+    sel_loss = [s for s in sel if cubo is not None and s in cubo.soluciones]
+    if not sel_loss:
+        st.info("No se encontraron datos de pérdidas por línea para la selección actual.")
+        return
+    all_lines = cubo.lineas
 
     # Sugerencia de líneas por defecto: top-5 por pérdida total en la primera solución seleccionada
-    default_lines = []
-    if sel and all_lines:
-        gent0 = _coerce_gent_payload(results[sel[0]]["GENT"])
-        df0 = gent0.get("losses", None)
-        if df0 is not None and _looks_like_polars_df(df0) and not df0.is_empty():
-            try:
-                default_lines = (
-                    df0.group_by("Nombre_PLEXOS")
-                    .agg(pl.col("Loss").sum().alias("Loss_total"))
-                    .sort("Loss_total", descending=True)
-                    .head(5)
-                    .get_column("Nombre_PLEXOS")
-                    .to_list()
-                )
-            except Exception:
-                pass
-    if not default_lines:
-        default_lines = all_lines[:5]
+    default_lines = cubo.top_lineas(sel_loss[0], 5) or all_lines[:5]
 
     lineas_sel = st.multiselect("Líneas a mostrar", all_lines, default=default_lines, key="loss_lines")
 
@@ -643,10 +912,9 @@ def mostrar_totales_sistema(
 
     for li_idx, linea in enumerate(lineas_sel):
         color = line_colors[li_idx % len(line_colors)]
-        for so_idx, sol in enumerate(sel):
-            gent = _coerce_gent_payload(results[sol]["GENT"])
-            x, y = _losses_line_xy(gent, linea)
-            if x is None or y is None or len(x) == 0:
+        for so_idx, sol in enumerate(sel_loss):
+            x, y = cubo.serie(sol, linea)
+            if x is None or len(x) == 0:
                 continue
 
             fig_lines.add_trace(
@@ -662,8 +930,8 @@ def mostrar_totales_sistema(
                 )
             )
             any_line = True
-            xmin2 = min(xmin2, min(x)) if xmin2 is not None else min(x)
-            xmax2 = max(xmax2, max(x)) if xmax2 is not None else max(x)
+            xmin2 = min(xmin2, int(x[0])) if xmin2 is not None else int(x[0])
+            xmax2 = max(xmax2, int(x[-1])) if xmax2 is not None else int(x[-1])
 
     if any_line:
         fig_lines.update_layout(
@@ -681,53 +949,17 @@ def mostrar_totales_sistema(
         st.plotly_chart(fig_lines, use_container_width=True)
     else:
         st.info("No se encontraron datos de pérdidas por línea para la selección actual.")
+        return
 
-def _losses_line_xy(gent: dict, line_name: str):
-    """
-    Serie de pérdidas por una línea específica desde gent['losses'].
-    Retorna (x, y) con horas (int) y pérdidas (float) sin agregar con otras líneas.
-    """
-    df = gent.get("losses", None)
-    if df is None or not _looks_like_polars_df(df) or df.is_empty():
-        return None, None
-    if not {"Nombre_PLEXOS", "Loss", "Hora"}.issubset(set(df.columns)):
-        return None, None
-
-    try:
-        df2 = (
-            df.filter(pl.col("Nombre_PLEXOS") == line_name)
-              .select(
-                  pl.col("Hora").cast(pl.Int64, strict=False).alias("Hora"),
-                  pl.col("Loss").cast(pl.Float64, strict=False).alias("Loss")
-              )
-              .drop_nulls(["Hora", "Loss"])
-              .sort("Hora")
-        )
-    except Exception:
-        return None, None
-
-    if df2.is_empty():
-        return None, None
-
-    x = df2.get_column("Hora").to_list()
-    y = df2.get_column("Loss").to_numpy().ravel()
-    return x, y
-
+    # Totales diarios precalculados y Δ contra la primera solución seleccionada
+    st.markdown(f"**Pérdidas diarias por línea** (Δ vs {sel_loss[0]})")
+    st.dataframe(
+        cubo.tabla_diaria(sel_loss, lineas_sel, referencia=sel_loss[0] if len(sel_loss) > 1 else None),
+        use_container_width=True, hide_index=True,
+    )
 
 
 
-def _coerce_gent_payload(gent_obj):
-    """
-    Normaliza GENT a {'tabla': DF, 'losses': DF} si viene como:
-      - dict {'tabla':..., 'losses':...}
-      - tuple (tabla, losses)
-    Retorna dict o None.
-    """
-    if isinstance(gent_obj, dict) and "tabla" in gent_obj and "losses" in gent_obj:
-        return gent_obj
-    if isinstance(gent_obj, tuple) and len(gent_obj) == 2:
-        return {"tabla": gent_obj[0], "losses": gent_obj[1]}
-    return None
 
 def _looks_like_polars_df(x):
     """Evita depender de isinstance(pl.DataFrame)."""
@@ -40,9 +40,9 @@ from compara_prg.services.obtener_resultados import generar_resultados_interacti
 from compara_prg.utils.funciones             import infer_hours
 from compara_prg.viz.plots                   import fecha_caption
 from compara_prg.io.readers                  import ruta_por_defecto, load_results,fecha_from_filename
-from compara_prg.viz.plots                   import mostrar_totales_por_categoria, mostrar_cmg_nodo, mostrar_analisis_termicas, mostrar_totales_sistema, mostrar_comparador_cotas
+from compara_prg.viz.plots                   import mostrar_totales_por_categoria, mostrar_cmg_nodo, mostrar_analisis_termicas, mostrar_totales_sistema, mostrar_comparador_cotas, mostrar_comparacion_n, mostrar_flujos, mostrar_costos
 from compara_prg.config                      import RESULTS_DIR, OUTPUT_DIR,DEFAULT_PCP_FOLDER, DEFAULT_PID_FOLDER, COLOR, CATEGORY_LABELS, THERMAL_IDX, THRESHOLD
-from compara_prg.viz.grafico_chile     import grafico_chile
+from compara_prg.viz.grafico_chile     import mostrar_red_chile, mostrar_diferencias_cmg
 from compara_prg.viz.bat_perfil        import bat_perfil
 
 
@@ -80,7 +80,7 @@ if modo_config == "Visualización":
     st.sidebar.title("Modo de gráfico")
     mode = st.sidebar.radio(
         "Selecciona el modo de análisis:",
-        ("Totales por categoría", "Resumen de simulación", "CMG nodo", "Análisis térmicas", "Cotas embalses","Perfil BESS",'Nodos y lineas'),
+        ("Totales por categoría", "Resumen de simulación", "CMG nodo", "Mapa diferencias CMG", "Análisis térmicas", "Comparación N soluciones", "Flujos y congestión", "Costos de generación", "Cotas embalses","Perfil BESS",'Nodos y lineas'),
     )
 else:
     mode = "Configuración"
@@ -215,6 +215,11 @@ elif mode == "CMG nodo":
         HOURS_INT, MIN_H, MAX_H, COLOR
     )
 
+elif mode == "Mapa diferencias CMG":
+    if fecha_lbl:
+        fecha_caption(fecha_lbl)
+    mostrar_diferencias_cmg(results, SOLUTIONS, HOURS_FULL)
+
 # -----------------------------------------------------------------------------
 # MODO 3 — ANÁLISIS TÉRMICAS
 # -----------------------------------------------------------------------------
@@ -226,6 +231,21 @@ elif mode == "Análisis térmicas":
         THRESHOLD, THERMAL_IDX
     )
 
+elif mode == "Comparación N soluciones":
+    if fecha_lbl:
+        fecha_caption(fecha_lbl)
+    mostrar_comparacion_n(results, SOLUTIONS, HOURS_FULL, CATEGORY_LABELS)
+
+elif mode == "Flujos y congestión":
+    if fecha_lbl:
+        fecha_caption(fecha_lbl)
+    mostrar_flujos(results, SOLUTIONS, HOURS_FULL, COLOR)
+
+elif mode == "Costos de generación":
+    if fecha_lbl:
+        fecha_caption(fecha_lbl)
+    mostrar_costos(results, SOLUTIONS, HOURS_FULL, COLOR)
+
 elif mode == "Totales sistema (GENT)":
     if fecha_lbl:
         fecha_caption(fecha_lbl)
@@ -249,8 +269,7 @@ elif mode == "Cotas embalses":
 elif mode == "Nodos y lineas":
     if fecha_lbl:
         fecha_caption(fecha_lbl)
-    fig = grafico_chile()   # 👈 ya cacheado
-    st.plotly_chart(fig, use_container_width=True)
+    mostrar_red_chile(results, SOLUTIONS, HOURS_FULL)
 
 
 
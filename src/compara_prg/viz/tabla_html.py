@@ -0,0 +1,164 @@
+# src/compara_prg/viz/tabla_html.py
+"""
+Render cacheado de la tabla coloreada de térmicas.
+
+El HTML (Styler + CSS) se guarda en un LRU acotado por bytes y compartido entre
+sesiones, con clave (archivo de resultados, par, rango horario, umbral, ventana).
+Un rerun que no cambia la selección (p. ej. editar el comentario) no vuelve a
+construir el Styler ni a serializar la tabla.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+import pandas as pd
+import streamlit as st
+
+from compara_prg.config import MAX_MB_CACHE_HTML
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# LRU acotado por tamaño
+# ─────────────────────────────────────────────────────────────────────────────
+class CacheHTML:
+    """LRU de strings HTML con tope en bytes (se expulsa lo menos usado)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._datos: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            html = self._datos.get(key)
+            if html is not None:
+                self._datos.move_to_end(key)
+            return html
+
+    def put(self, key: Hashable, html: str) -> None:
+        size = len(html.encode("utf-8"))
+        if size > self.max_bytes:
+            return  # no cabe: no se cachea
+        with self._lock:
+            old = self._datos.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.encode("utf-8"))
+            self._datos[key] = html
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._datos:
+                _, expulsado = self._datos.popitem(last=False)
+                self._bytes -= len(expulsado.encode("utf-8"))
+
+
+@st.cache_resource(show_spinner=False)
+def _cache_tablas() -> CacheHTML:
+    return CacheHTML(int(MAX_MB_CACHE_HTML * 1024 * 1024))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# HTML de la tabla
+# ─────────────────────────────────────────────────────────────────────────────
+def _css_tabla(tabla_min_width_px: int) -> str:
+    return f"""
+    <style>
+    html, body {{ margin:0; overflow:hidden; }}   /* sin barra del iframe */
+    .resp-wrap {{
+      width: 100%;
+      overflow-x: auto;
+      overflow-y: hidden;
+      border: 1px solid #ddd;
+      padding: 6px 6px 10px 6px;
+      -webkit-overflow-scrolling: touch;
+      scrollbar-gutter: stable both-edges;
+    }}
+    .styled-table {{
+      width: max-content;
+      min-width: {tabla_min_width_px}px;  /* asegura desborde horizontal */
+      table-layout: fixed;
+      border-collapse: collapse;
+      font-family: 'Segoe UI', sans-serif;
+      font-size: 10px;
+    }}
+    .styled-table, .styled-table * {{ box-sizing: border-box; }}
+    .styled-table th, .styled-table td {{
+      padding: 2px 3px; text-align: center; white-space: nowrap;
+    }}
+    /* Header pegado arriba */
+    .styled-table th {{ position: sticky; top: 0; z-index: 5; background: #f4f4f4; }}
+    /* Primera columna pegada + esquina superior izquierda */
+    .styled-table th:first-child, .styled-table td:first-child {{ width: 220px; text-align: left; }}
+    .styled-table td:first-child {{
+      position: sticky; left: 0; z-index: 4;
+      background: #fff0f0;   /* color destacado */
+    }}
+    .styled-table th:first-child {{
+      position: sticky; top: 0; left: 0; z-index: 6;
+      background: #ffe0e0;   /* color header fijo */
+      box-shadow: 1px 0 0 #ddd;
+    }}
+    /* Columnas de horas */
+    .styled-table th:not(:first-child), .styled-table td:not(:first-child) {{ width: 28px; }}
+    .styled-table thead th:not(:first-child) {{
+      writing-mode: vertical-rl; transform: rotate(180deg);
+      white-space: nowrap; height: 90px; padding: 6px 0;
+    }}
+    /* Zebra/hover opcionales */
+    .styled-table tbody tr:nth-child(even) td {{ background: #fafafa; }}
+    .styled-table tbody tr:nth-child(even) td:first-child {{ background: #f0e0e0; }}
+    .styled-table tbody tr:hover td {{ background: #f9fbff; }}
+    .styled-table tbody tr:hover td:first-child {{ background: #ffdede; }}
+    .styled-table td {{ letter-spacing: 0.2px; }}
+    </style>
+    """
+
+
+def html_tabla_coloreada(
+    key: Hashable,
+    pivot_pd: pd.DataFrame,
+    styles_pd: pd.DataFrame,
+    filas: Optional[slice] = None,
+    columnas: Optional[list] = None,
+) -> tuple[str, int]:
+    """
+    HTML listo para `components.html` y su altura en px.
+
+    Args:
+        key (tuple): clave de selección (archivo, par, rango, umbral); la ventana
+            `filas`/`columnas` se agrega a la clave internamente
+        pivot_pd (DataFrame): tabla de diferencias (centrales × horas + total)
+        styles_pd (DataFrame): estilos con la misma forma que pivot_pd
+        filas (slice): ventana de filas a enviar al navegador (None = todas)
+        columnas (list): columnas a enviar al navegador (None = todas)
+
+    Returns:
+        (html, alto_px)
+    """
+    filas = filas or slice(None)
+    columnas = list(pivot_pd.columns) if columnas is None else columnas
+    sub = pivot_pd.iloc[filas][columnas]
+
+    alto = 80 + 28 * len(sub)                    # ≈28 px por fila
+    clave = (key, filas.start, filas.stop, tuple(columnas))
+
+    cache = _cache_tablas()
+    html = cache.get(clave)
+    if html is None:
+        sub_styles = styles_pd.iloc[filas][columnas]
+        styled = (
+            sub.style
+            .set_properties(**{"text-align": "center"})
+            .apply(lambda _: sub_styles, axis=None)
+            .format(precision=0, na_rep="")
+        )
+        tabla_min_width_px = 220 + 28 * len(columnas)   # 220 1ª col + 28 por hora
+        html = f"""
+    {_css_tabla(tabla_min_width_px)}
+    <div class="resp-wrap">
+      {styled.to_html(classes="styled-table")}
+    </div>
+    """
+        cache.put(clave, html)
+    return html, alto
@@ -0,0 +1,30 @@
+import numpy as np
+import polars as pl
+
+from compara_prg.io.resultados_columnar import cargar_columnar, guardar_columnar, normalizar_resultados
+from compara_prg.utils.funciones import infer_hours, prepara_datos
+
+HORAS = [str(h) for h in range(1, 49)]
+
+
+def _gentables(rng, n_centrales):
+    # Gen_Bruta con resolución 0.1 MW: muchos totales diarios caen justo en .5
+    valores = rng.integers(0, 3000, size=(n_centrales, len(HORAS))) / 10
+    tabla = pl.DataFrame({"Nombre_PLEXOS": [f"C{i:03d}" for i in range(n_centrales)]}).with_columns(
+        pl.Series(h, valores[:, j]) for j, h in enumerate(HORAS)
+    )
+    return tuple(tabla for _ in range(5))
+
+
+def test_perfil_compacto_no_cambia_resumen(tmp_path):
+    rng = np.random.default_rng(20250721)
+    results, _ = normalizar_resultados({sol: {"GENTABLES": _gentables(rng, 300)} for sol in ("PCP", "PID1")})
+    guardar_columnar(results, tmp_path / "res", perfil="compacto")
+    reabierto = cargar_columnar(tmp_path / "res")
+
+    assert reabierto["PCP"]["GENTABLES"][2].schema["1"] == pl.Float64
+    hours_full = [str(h) for h in infer_hours(results)]
+    for idx in range(5):
+        _, original, _ = prepara_datos(results, "pickle", "PCP", "PID1", idx, hours_full, hours_full[:24], 1.0)
+        _, columnar, _ = prepara_datos(reabierto, "columnar", "PCP", "PID1", idx, hours_full, hours_full[:24], 1.0)
+        assert original.equals(columnar)
@@ -0,0 +1,32 @@
+from compara_prg.services.tecnologias import Tecnologia, cargar_mapa, tabla_codigos
+
+
+def test_exactas_y_reglas(tmp_path, capsys):
+    ruta = tmp_path / "categorias.csv"
+    ruta.write_text(
+        "# version: 7\n"
+        "categoria,regla,codigo\n"
+        "Thermal,exacta,2\n"
+        "Solar Thermal,exacta,3\n"
+        "Thermal,contiene,2\n"
+        "Solar,contiene,3\n",
+        encoding="utf-8",
+    )
+    mapa = cargar_mapa(ruta)
+    assert mapa.version == 7
+
+    codigos = dict(tabla_codigos(["Thermal", "Solar Thermal", "Solar Norte", "Thermal Solar", "Wind"], mapa).iter_rows())
+    assert codigos == {
+        "Thermal": Tecnologia.TERMICA,
+        "Solar Thermal": Tecnologia.SOLAR,        # fila exacta gana a las reglas
+        "Solar Norte": Tecnologia.SOLAR,
+        "Thermal Solar": Tecnologia.TERMICA,      # ambigua: primera regla
+    }
+    salida = capsys.readouterr().out
+    assert "'Wind'" in salida and "'Thermal Solar' calza con" in salida
+
+
+def test_mapa_del_repo_tiene_filas_exactas():
+    mapa = cargar_mapa()
+    exactas = dict(mapa.exactas.iter_rows())
+    assert exactas == {"Hydro Gen Group A": 0, "Hydro Ficticias": 1, "Thermal": 2, "Solar": 3, "Wind": 4}
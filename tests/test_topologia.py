@@ -0,0 +1,42 @@
+import pandas as pd
+
+import compara_prg.io.topologia as topologia
+
+
+def _extractor(llamadas):
+    def extraer(xml_path):
+        llamadas.append(xml_path)
+        nodos = pd.DataFrame({"Nodo": ["A", "B"], "Lat": [-33.4, -23.6], "Lon": [-70.6, -70.4]})
+        lineas = pd.DataFrame({"Linea": ["A->B"], "NodoFrom": ["A"], "NodoTo": ["B"]})
+        return nodos, lineas
+    return extraer
+
+
+def test_cargar_topologia_reutiliza_hash_y_parquet(tmp_path, monkeypatch):
+    xml = tmp_path / "base.xml"
+    xml.write_text("<MasterDataSet/>", encoding="utf-8")
+    cache = tmp_path / "topologia"
+
+    hashes = []
+    hash_original = topologia.hash_archivo
+    monkeypatch.setattr(topologia, "hash_archivo", lambda p: hashes.append(p) or hash_original(p))
+    llamadas = []
+    extractor = _extractor(llamadas)
+
+    nodos, lineas = topologia.cargar_topologia(xml, extractor=extractor, cache_dir=cache)
+    assert len(llamadas) == 1 and len(hashes) == 1
+    assert list(lineas["Linea"]) == ["A->B"]
+
+    # Mismo XML: ni se re-hashea ni se extrae; se leen los Parquet
+    nodos2, lineas2 = topologia.cargar_topologia(xml, extractor=extractor, cache_dir=cache)
+    assert len(llamadas) == 1 and len(hashes) == 1
+    pd.testing.assert_frame_equal(nodos, nodos2)
+    pd.testing.assert_frame_equal(lineas, lineas2)
+
+    # XML modificado: nuevo hash y nueva extracción
+    xml.write_text("<MasterDataSet><t/></MasterDataSet>", encoding="utf-8")
+    topologia.cargar_topologia(xml, extractor=extractor, cache_dir=cache)
+    assert len(llamadas) == 2 and len(hashes) == 2
+
+    assert not list(cache.glob("*.tmp"))
+    assert len(list(cache.glob("nodos_*.parquet"))) == 2
@@ -0,0 +1,30 @@
+import polars as pl
+
+from compara_prg.services.warehouse import desvio_mensual, escribir_resultados
+
+
+def _gentables(horas, valor):
+    termicas = pl.DataFrame({"Nombre_PLEXOS": ["T1"], **{str(h): [valor] for h in horas}})
+    vacia = pl.DataFrame({"Nombre_PLEXOS": []}, schema={"Nombre_PLEXOS": pl.Utf8})
+    return (vacia, vacia, termicas, vacia, vacia)
+
+
+def test_desvio_mensual_un_dia_suma_un_dia(tmp_path):
+    # Dos periodos PID de la misma fecha con ventanas de 48 h traslapadas;
+    # el PCP cubre una hora más que el PID
+    for periodo, hini in ((3, 3), (16, 16)):
+        results = {
+            "PCP": {"GENTABLES": _gentables(range(hini, hini + 49), 1.0)},
+            "PID1": {"GENTABLES": _gentables(range(hini, hini + 48), 2.0)},
+        }
+        escribir_resultados(results, "20250417", periodo, raiz=tmp_path)
+
+    df = desvio_mensual("PCP", "PID1", raiz=tmp_path)
+    fila = df.row(0, named=True)
+    # Periodo 3 → horas 3..24 del día
+    assert fila["PCP"] == 22.0
+    assert fila["PID1"] == 44.0
+    assert fila["Delta"] == 22.0
+
+    fila = desvio_mensual("PCP", "PID1", periodo=16, raiz=tmp_path).row(0, named=True)
+    assert fila["PCP"] == 9.0